@@ -1,10 +1,55 @@
+import time
+_INICIO_PROCESO = time.perf_counter()  # Referencia para el modo --medir-arranque
 import tkinter as tk
-from tkinter import messagebox
-import mysql.connector
-from datetime import date, datetime
-import urllib.request
+import tkinter.font as tkfont
+from tkinter import messagebox, filedialog
+from datetime import date, datetime, timedelta
 import io
-from PIL import Image, ImageTk
+import os
+import json
+import csv
+import random
+import argparse
+import unicodedata
+import hashlib
+import hmac
+import weakref
+from array import array
+import bisect
+import inspect
+import sqlite3
+import threading
+import traceback
+import weakref
+import queue
+import sys
+import importlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+
+# Los módulos pesados (mysql.connector, numpy, PIL, urllib.request) no se importan al arrancar:
+# la ventana de inicio de sesión aparece antes y se cargan la primera vez que hacen falta.
+
+
+class _ModuloDiferido:
+    """
+    Sustituto de un módulo que lo importa al usarse por primera vez. Después se reemplaza a sí
+    mismo por el módulo real en las variables globales, así que los usos siguientes no pasan por aquí.
+    """
+
+    def __init__(self, nombre, alias):
+        self._nombre = nombre
+        self._alias = alias
+
+    def __getattr__(self, atributo):
+        modulo = importlib.import_module(self._nombre)
+        globals()[self._alias] = modulo
+        return getattr(modulo, atributo)
+
+
+np = _ModuloDiferido("numpy", "np")
 
 # Diccionario de configuración de la base de datos
 # Aquí se guardan las credenciales para conectarse a tu base de datos MySQL.
@@ -17,21 +62,2729 @@ DB_CONFIG = {
     "database": "recursos_humanos"
 }
 
-# URL para la imagen del logo de la aplicación
-# Esta URL apunta a una imagen alojada en línea que se utilizará como logo de la aplicación.
-IMAGE_URL = "https://i.postimg.cc/HWFwDC49/logo-124x124.png"
+# URL para la imagen del logo de la aplicación
+# Esta URL apunta a una imagen alojada en línea que se utilizará como logo de la aplicación.
+# RRHH_LOGO_URL permite apuntar a otro servidor (por ejemplo, uno local para pruebas).
+IMAGE_URL = os.environ.get("RRHH_LOGO_URL", "https://i.postimg.cc/HWFwDC49/logo-124x124.png")
+LOGO_ANCHO = 150  # Ancho en píxeles con el que se muestra el logo
+
+# Directorio donde la aplicación guarda sus archivos locales (logo en caché, etc.)
+CACHE_DIR = os.environ.get("RRHH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".rrhh_cache"))
+
+# Configuración del pool de conexiones
+# Las conexiones se reutilizan entre operaciones para no pagar el handshake TCP y de autenticación cada vez.
+POOL_CONFIG = {
+    "tamano_maximo": 5,              # Número máximo de conexiones abiertas a la vez
+    "tiempo_espera": 10.0,           # Segundos que se espera por una conexión libre antes de fallar
+    "inactividad_maxima": 300.0,     # Segundos tras los cuales se cierra una conexión ociosa
+    "intervalo_verificacion": 30.0   # Segundos sin uso a partir de los cuales se comprueba la conexión antes de entregarla
+}
+
+# Modo de prueba: con RRHH_MODO_PRUEBA=1 se usa una base SQLite local en lugar del servidor MySQL.
+# RRHH_BD_PRUEBA permite indicar el archivo de la base de prueba.
+MODO_PRUEBA = os.environ.get("RRHH_MODO_PRUEBA") == "1"
+BD_PRUEBA = os.environ.get("RRHH_BD_PRUEBA", "rrhh_prueba.db")
+
+# Esquema de la base de prueba. Reproduce las columnas que la aplicación usa en MySQL.
+ESQUEMA_PRUEBA = """
+CREATE TABLE IF NOT EXISTS empleados (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    apellido TEXT NOT NULL,
+    puesto TEXT NOT NULL,
+    salario REAL NOT NULL,
+    fecha_ingreso DATE NOT NULL,
+    username TEXT UNIQUE,
+    password TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS empleados_cambios (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    empleado_id INTEGER NOT NULL,
+    operacion TEXT NOT NULL,
+    momento TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_empleados_cambios_momento ON empleados_cambios (momento);
+"""
+
+# Sincronización entre varios operadores
+# Cada escritura incrementa empleados.version y anota en empleados_cambios qué empleado cambió
+# ('A' alta, 'M' modificación, 'B' baja), en la misma transacción. En MySQL, la columna y la tabla
+# las crea `python Proyecto_final.py --migrar` (ver MIGRACIONES).
+SINCRONIZACION_INTERVALO = 5000  # Milisegundos entre consultas de cambios de otros operadores
+SINCRONIZACION_SOLAPE = 100      # Cambios anteriores a la marca que se vuelven a leer por si se confirmaron tarde
+SINCRONIZACION_LOTE = 1000       # Cambios que se traen como máximo en cada consulta
+# Las anotaciones más antiguas que la retención se borran al migrar y, en cada sesión, cada hora.
+# Quien tenga una marca anterior a lo borrado recarga la lista entera en vez de leer cambios.
+CAMBIOS_RETENCION_DIAS = 7
+CAMBIOS_PODA_TRAMO = 10000       # Anotaciones que se borran por transacción
+CAMBIOS_PODA_INTERVALO = 3600000 # Milisegundos entre podas desde la aplicación
+
+# Ajuste masivo de salarios: un UPDATE por tramo de IDs, cada uno en su propia transacción corta,
+# con una pausa entre tramos para que las escrituras de otros operadores no esperen a que termine.
+AJUSTE_TRAMO = 500    # IDs que abarca cada tramo
+AJUSTE_PAUSA = 0.01   # Segundos de pausa entre tramos
+
+# SQLite guarda las fechas como texto ISO; estos adaptadores devuelven objetos date como hace MySQL.
+sqlite3.register_adapter(date, lambda valor: valor.isoformat())
+sqlite3.register_converter("DATE", lambda valor: date.fromisoformat(valor.decode()))
+
+
+class PoolAgotadoError(Exception):
+    """Se lanza cuando no hay una conexión libre dentro del tiempo de espera del pool."""
+
+
+class ConflictoVersionError(Exception):
+    """
+    Otro operador modificó o borró al empleado después de que se leyera.
+
+    `actual` es el registro vigente en el servidor, o None si ya no existe.
+    """
+
+    def __init__(self, empleado_id, actual):
+        super().__init__(f"El empleado {empleado_id} fue modificado por otro usuario.")
+        self.empleado_id = empleado_id
+        self.actual = actual
+
+
+class AjusteInterrumpidoError(Exception):
+    """
+    Un ajuste masivo de salarios se detuvo a medias por un error de la base de datos.
+
+    Los tramos anteriores a `siguiente_id` ya quedaron confirmados (`ajustados` empleados);
+    para terminar el ajuste hay que reanudarlo desde ahí, no repetirlo entero.
+    """
+
+    def __init__(self, ajustados, siguiente_id, causa):
+        super().__init__(f"El ajuste se detuvo tras ajustar {ajustados} empleados: {causa}")
+        self.ajustados = ajustados
+        self.siguiente_id = siguiente_id
+        self.causa = causa
+
+
+class _CursorPrueba:
+    """Cursor de SQLite con la interfaz de mysql.connector que usa la aplicación (%s, dictionary=True)."""
+
+    def __init__(self, conexion, dictionary=False):
+        self._cursor = conexion.cursor()
+        self._dictionary = dictionary
+        self._primer_id = None  # ID de la primera fila del último executemany de un INSERT
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid if self._primer_id is None else self._primer_id
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, sql, params=()):
+        self._primer_id = None
+        self._cursor.execute(sql.replace("%s", "?"), tuple(params))
+
+    def executemany(self, sql, seq_params):
+        self._primer_id = None
+        self._cursor.executemany(sql.replace("%s", "?"), (tuple(p) for p in seq_params))
+        # mysql.connector envía un solo INSERT con todas las filas y lastrowid es el ID de la primera;
+        # sqlite3 no lo actualiza en executemany, así que se deduce del último ID y las filas insertadas
+        if sql.lstrip().upper().startswith("INSERT") and self._cursor.rowcount > 0:
+            ultimo = self._cursor.connection.execute("SELECT last_insert_rowid()").fetchone()[0]
+            self._primer_id = ultimo - self._cursor.rowcount + 1
+
+    def _convertir(self, fila):
+        if fila is None or not self._dictionary:
+            return fila
+        return {col[0]: valor for col, valor in zip(self._cursor.description, fila)}
+
+    def fetchone(self):
+        return self._convertir(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._convertir(fila) for fila in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._convertir(fila) for fila in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class _ConexionPrueba:
+    """Conexión a la base SQLite local que sustituye a MySQL en el modo de prueba."""
+
+    def __init__(self, ruta):
+        self._conexion = sqlite3.connect(ruta, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+                                         uri=ruta.startswith("file:"))
+        self._abierta = True
+        nueva = self._conexion.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'empleados'").fetchone() is None
+        self._conexion.executescript(ESQUEMA_PRUEBA)
+        columnas = [fila[1] for fila in self._conexion.execute("PRAGMA table_info(empleados)")]
+        if "version" not in columnas:
+            # Bases de prueba creadas antes de que existiera la columna
+            self._conexion.execute("ALTER TABLE empleados ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        if nueva:
+            # Usuario inicial para poder iniciar sesión en una base de prueba vacía
+            self._conexion.execute(
+                "INSERT INTO empleados (nombre, apellido, puesto, salario, fecha_ingreso, username, password) "
+                "VALUES ('Admin', 'Prueba', 'Administrador', 0, ?, 'admin', 'admin')", (date.today(),))
+            self._conexion.commit()
+
+    def cursor(self, dictionary=False, **kwargs):
+        # Los demás argumentos de mysql.connector (buffered, prepared...) no aplican en SQLite
+        return _CursorPrueba(self._conexion, dictionary=dictionary)
+
+    def commit(self):
+        self._conexion.commit()
+
+    def rollback(self):
+        self._conexion.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._conexion.in_transaction
+
+    def is_connected(self):
+        if not self._abierta:
+            return False
+        try:
+            self._conexion.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self._abierta = False
+        self._conexion.close()
+
+
+def _crear_conexion():#Abre una conexión nueva contra MySQL o, en modo de prueba, contra la base SQLite local.
+    if MODO_PRUEBA:
+        return _ConexionPrueba(BD_PRUEBA)
+    import mysql.connector  # Se importa con la primera conexión, normalmente al precalentar el pool
+    return mysql.connector.connect(**DB_CONFIG)
+
+
+def _errores_bd():#Devuelve las clases de error de base de datos que pueden aparecer.
+    #Si mysql.connector no se ha importado todavía, ninguna de sus excepciones puede haberse lanzado.
+    conector = sys.modules.get("mysql.connector")
+    return (sqlite3.Error,) if conector is None else (conector.Error, sqlite3.Error)
+
+
+class PoolConexiones:
+    """
+    Pool acotado de conexiones reutilizables.
+
+    Entrega primero la conexión usada más recientemente, comprueba las que llevan tiempo sin usarse,
+    cierra las que superan la inactividad máxima y espera como mucho `tiempo_espera` segundos
+    cuando todas están ocupadas. Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, fabrica, tamano_maximo=5, tiempo_espera=10.0, inactividad_maxima=300.0, intervalo_verificacion=30.0):
+        self._fabrica = fabrica
+        self.tamano_maximo = tamano_maximo
+        self.tiempo_espera = tiempo_espera
+        self.inactividad_maxima = inactividad_maxima
+        self.intervalo_verificacion = intervalo_verificacion
+        self._libres = []   # Pila de (conexion, instante del último uso); la más reciente al final
+        self._abiertas = 0  # Conexiones creadas, libres o prestadas
+        self._condicion = threading.Condition()
+        # Contadores: aciertos = conexión reutilizada, fallos = conexión nueva
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartadas = 0
+        self.al_cerrar = []  # Funciones a las que se avisa, con la conexión, justo antes de cerrarla
+
+    def _expulsar_inactivas(self, ahora):
+        # Las conexiones más antiguas están al principio de la pila
+        expulsadas = []
+        while self._libres and ahora - self._libres[0][1] > self.inactividad_maxima:
+            expulsadas.append(self._libres.pop(0)[0])
+        self._abiertas -= len(expulsadas)
+        self.descartadas += len(expulsadas)
+        return expulsadas
+
+    def obtener(self):
+        """Devuelve una conexión del pool, abriendo una nueva si hace falta y hay capacidad."""
+        limite = time.monotonic() + self.tiempo_espera
+        while True:
+            candidata = None
+            expulsadas = []
+            with self._condicion:
+                while True:
+                    ahora = time.monotonic()
+                    expulsadas.extend(self._expulsar_inactivas(ahora))
+                    if self._libres:
+                        candidata, ultimo_uso = self._libres.pop()
+                        break
+                    if self._abiertas < self.tamano_maximo:
+                        self._abiertas += 1
+                        self.fallos += 1
+                        break
+                    restante = limite - ahora
+                    if restante <= 0:
+                        raise PoolAgotadoError(f"No hay conexiones libres tras esperar {self.tiempo_espera} s.")
+                    self._condicion.wait(restante)
+            for conexion in expulsadas:
+                self._cerrar(conexion)
+
+            if candidata is None:
+                try:
+                    return self._fabrica()
+                except Exception:
+                    with self._condicion:
+                        self._abiertas -= 1
+                        self._condicion.notify()
+                    raise
+
+            # Solo se verifica la conexión si lleva un rato sin usarse
+            if time.monotonic() - ultimo_uso < self.intervalo_verificacion or candidata.is_connected():
+                with self._condicion:
+                    self.aciertos += 1
+                return candidata
+            self.descartar(candidata)
+
+    def liberar(self, conexion):
+        """Devuelve una conexión al pool deshaciendo la transacción pendiente, si la hay."""
+        try:
+            # Cierra la transacción abierta para que el próximo uso no vea una instantánea antigua.
+            # Si no hay ninguna (lo normal tras un commit) se ahorra el viaje al servidor.
+            if conexion.in_transaction:
+                conexion.rollback()
+        except Exception:
+            self.descartar(conexion)
+            return
+        with self._condicion:
+            self._libres.append((conexion, time.monotonic()))
+            self._condicion.notify()
+
+    def descartar(self, conexion):
+        """Cierra una conexión prestada que ya no se puede reutilizar."""
+        self._cerrar(conexion)
+        with self._condicion:
+            self._abiertas -= 1
+            self.descartadas += 1
+            self._condicion.notify()
+
+    def _cerrar(self, conexion):
+        for aviso in self.al_cerrar:
+            aviso(conexion)
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def cerrar_todo(self):
+        """Cierra todas las conexiones libres; las prestadas se cerrarán al descartarse."""
+        with self._condicion:
+            libres, self._libres = self._libres, []
+            self._abiertas -= len(libres)
+        for conexion, _ in libres:
+            self._cerrar(conexion)
+
+    def estadisticas(self):
+        """Devuelve los contadores del pool."""
+        with self._condicion:
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "descartadas": self.descartadas,
+                "abiertas": self._abiertas,
+                "libres": len(self._libres)
+            }
+
+
+# Pool compartido por todas las ventanas de la aplicación
+POOL = PoolConexiones(_crear_conexion, **POOL_CONFIG)
+
+# Caché del logo en disco
+# Se guarda el PNG ya redimensionado junto con las cabeceras ETag/Last-Modified para revalidarlo.
+
+def _rutas_logo():#Devuelve las rutas del PNG y de sus metadatos dentro del directorio de caché.
+    return os.path.join(CACHE_DIR, "logo.png"), os.path.join(CACHE_DIR, "logo.json")
+
+def leer_logo_cache():#Devuelve (bytes del PNG, metadatos) del logo guardado, o (None, {}) si no hay o es de otra URL.
+    ruta_png, ruta_meta = _rutas_logo()
+    try:
+        with open(ruta_meta, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("url") != IMAGE_URL:
+            return None, {}
+        with open(ruta_png, "rb") as f:
+            return f.read(), meta
+    except (OSError, ValueError):
+        return None, {}
+
+def _escribir_atomico(ruta, datos):#Escribe un archivo completo de una vez para no dejar nunca uno a medias.
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+def revalidar_logo(meta):#Pide el logo al servidor solo si cambió desde la copia en caché.
+    #Devuelve los bytes del PNG nuevo ya redimensionado, o None si la copia en caché sigue vigente.
+    #Lanza urllib.error.URLError u OSError si no se pudo descargar o procesar.
+    import urllib.request
+    import urllib.error
+    peticion = urllib.request.Request(IMAGE_URL)
+    if meta.get("etag"):
+        peticion.add_header("If-None-Match", meta["etag"])
+    if meta.get("last_modified"):
+        peticion.add_header("If-Modified-Since", meta["last_modified"])
+    try:
+        with urllib.request.urlopen(peticion, timeout=10) as u:
+            raw_data = u.read()
+            cabeceras = u.headers
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None # No ha cambiado
+        raise
+
+    from PIL import Image  # Solo hace falta cuando el logo cambió
+    original_image = Image.open(io.BytesIO(raw_data))
+    width = LOGO_ANCHO
+    height = int(original_image.height * (width / original_image.width))
+    resized_image = original_image.resize((width, height), Image.Resampling.LANCZOS)
+    salida = io.BytesIO()
+    resized_image.save(salida, format="PNG")
+    png = salida.getvalue()
+
+    ruta_png, ruta_meta = _rutas_logo()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _escribir_atomico(ruta_png, png)
+    meta = {"url": IMAGE_URL, "etag": cabeceras.get("ETag"), "last_modified": cabeceras.get("Last-Modified")}
+    _escribir_atomico(ruta_meta, json.dumps(meta).encode("utf-8"))
+    return png
+
+
+# Número de empleados que se piden al servidor en cada página de la lista
+TAMANO_PAGINA = 200
+# Filas que se traen como máximo en cada petición cuando hace falta cargar mucho de una vez (por
+# ejemplo, al buscar en una lista a medio cargar): cada tanda llega a la ventana por separado
+CARGA_TANDA = 5000
+
+def formatear_empleado(emp):#Devuelve la línea que muestra a un empleado en la lista.
+    # Formatea la fecha a cadena para la visualización
+    fecha_str = emp['fecha_ingreso'].strftime("%Y-%m-%d") if isinstance(emp['fecha_ingreso'], date) else str(emp['fecha_ingreso'])
+    return f"ID: {emp['id']:<4} | {emp['nombre']:<15} | {emp['apellido']:<15} | {emp['puesto']:<15} | ${emp['salario']:.2f} | {fecha_str}"
+
+
+# Instrumentación
+# Con RRHH_METRICAS=1 se mide cada operación del repositorio por fases (conectar, ejecutar, leer,
+# confirmar) y el dibujado de la lista (formatear, insertar en Tk). Se guardan las últimas duraciones
+# de cada fase para calcular percentiles, las operaciones más lentas que el umbral se anotan en un
+# registro JSON Lines y el resumen se exporta a un archivo al salir o desde el panel de métricas.
+# Desactivada, las operaciones no se envuelven y las fases son un contexto vacío.
+METRICAS_CONFIG = {
+    "activa": os.environ.get("RRHH_METRICAS") == "1",
+    "umbral_lento": float(os.environ.get("RRHH_UMBRAL_LENTO", "0.5")),  # Segundos a partir de los cuales se anota una operación
+    "muestras": 1000,                                                   # Duraciones recientes que se conservan por fase
+    "registro_lento": os.path.join(CACHE_DIR, "operaciones_lentas.jsonl"),
+    "archivo": os.environ.get("RRHH_METRICAS_ARCHIVO", os.path.join(CACHE_DIR, "metricas.json"))
+}
+
+
+class _Medicion:
+    """Contexto que mide una operación o una de sus fases y entrega la duración a Metricas."""
+
+    __slots__ = ("metricas", "nombre", "es_operacion", "inicio", "anterior")
+
+    def __init__(self, metricas, nombre, es_operacion):
+        self.metricas = metricas
+        self.nombre = nombre
+        self.es_operacion = es_operacion
+
+    def __enter__(self):
+        if self.es_operacion:
+            local = self.metricas._local
+            # Las operaciones pueden anidarse (actualizar consulta con obtener al detectar un conflicto)
+            self.anterior = (getattr(local, "operacion", None), getattr(local, "fases", None))
+            local.operacion, local.fases = self.nombre, {}
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        duracion = time.perf_counter() - self.inicio
+        local = self.metricas._local
+        if self.es_operacion:
+            fases = local.fases
+            local.operacion, local.fases = self.anterior
+            self.metricas.registrar(self.nombre, duracion, fases, error=tipo is not None)
+        else:
+            operacion = getattr(local, "operacion", None)
+            if operacion is None:
+                self.metricas.registrar(self.nombre, duracion)
+            else:
+                local.fases[self.nombre] = local.fases.get(self.nombre, 0.0) + duracion
+                self.metricas.registrar(f"{operacion}.{self.nombre}", duracion)
+        return False
+
+
+class Metricas:
+    """
+    Duraciones recientes por operación y fase, con percentiles y registro de operaciones lentas.
+
+    Se puede usar desde cualquier hilo. Las claves son el nombre de la operación ("listar") y el
+    de cada fase dentro de ella ("listar.ejecutar").
+    """
+
+    def __init__(self, activa, umbral_lento, muestras, registro_lento, archivo):
+        self.activa = activa
+        self.umbral_lento = umbral_lento
+        self.muestras = muestras
+        self.registro_lento = registro_lento
+        self.archivo = archivo
+        self.lentas = 0                 # Operaciones anotadas en el registro de lentas
+        self._duraciones = {}           # clave -> deque con las últimas duraciones
+        self._totales = {}              # clave -> número de mediciones desde el arranque
+        self._bloqueo = threading.Lock()
+        self._local = threading.local()
+
+    def operacion(self, nombre):
+        """Mide una operación completa (un contexto with)."""
+        return _Medicion(self, nombre, True) if self.activa else nullcontext()
+
+    def fase(self, nombre):
+        """Mide una fase de la operación en curso en este hilo."""
+        return _Medicion(self, nombre, False) if self.activa else nullcontext()
+
+    def medida(self, nombre):
+        """
+        Decorador que mide cada llamada a la función como la operación `nombre`.
+        Con las métricas desactivadas devuelve la función sin tocar.
+        """
+        def decorar(funcion):
+            if not self.activa:
+                return funcion
+            if inspect.isgeneratorfunction(funcion):
+                # Un generador se mide mientras se consume, no solo al crearlo
+                def envoltura(*args, **kwargs):
+                    with self.operacion(nombre):
+                        yield from funcion(*args, **kwargs)
+            else:
+                def envoltura(*args, **kwargs):
+                    with self.operacion(nombre):
+                        return funcion(*args, **kwargs)
+            envoltura.__name__, envoltura.__doc__ = funcion.__name__, funcion.__doc__
+            return envoltura
+        return decorar
+
+    def registrar(self, clave, duracion, fases=None, error=False):
+        with self._bloqueo:
+            recientes = self._duraciones.get(clave)
+            if recientes is None:
+                recientes = self._duraciones[clave] = deque(maxlen=self.muestras)
+            recientes.append(duracion)
+            self._totales[clave] = self._totales.get(clave, 0) + 1
+            if fases is None or duracion < self.umbral_lento:
+                return
+            self.lentas += 1
+        linea = {"momento": datetime.now().isoformat(timespec="milliseconds"), "operacion": clave,
+                 "segundos": round(duracion, 6), "error": error,
+                 "fases": {fase: round(segundos, 6) for fase, segundos in fases.items()}}
+        try:
+            os.makedirs(os.path.dirname(self.registro_lento), exist_ok=True)
+            with open(self.registro_lento, "a", encoding="utf-8") as archivo:
+                archivo.write(json.dumps(linea, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"No se pudo anotar la operación lenta: {e}")
+
+    def resumen(self):
+        """Devuelve {clave: {n, recientes, p50, p90, p99, max}} con las duraciones en milisegundos."""
+        with self._bloqueo:
+            copia = {clave: (self._totales[clave], list(recientes)) for clave, recientes in self._duraciones.items()}
+        resumen = {}
+        for clave, (total, recientes) in sorted(copia.items()):
+            recientes.sort()
+            percentil = lambda p: recientes[min(len(recientes) - 1, int(p / 100 * len(recientes)))] * 1000
+            resumen[clave] = {"n": total, "recientes": len(recientes), "p50": percentil(50), "p90": percentil(90),
+                              "p99": percentil(99), "max": recientes[-1] * 1000}
+        return resumen
+
+    def texto(self):
+        """Tabla legible del resumen, para el panel de métricas."""
+        lineas = [f"{'Operación / fase':<32}{'n':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'máx ms':>10}"]
+        for clave, r in self.resumen().items():
+            sangria = "  " if "." in clave else ""
+            lineas.append(f"{sangria + clave:<32}{r['n']:>8}{r['p50']:>10.2f}{r['p90']:>10.2f}{r['p99']:>10.2f}{r['max']:>10.2f}")
+        lineas.append("")
+        lineas.append(f"Operaciones de más de {self.umbral_lento * 1000:.0f} ms: {self.lentas} (registro: {self.registro_lento})")
+        return "\n".join(lineas)
+
+    def exportar(self, ruta=None):
+        """Escribe el resumen en un archivo JSON y devuelve su ruta."""
+        ruta = ruta or self.archivo
+        datos = {"momento": datetime.now().isoformat(timespec="seconds"), "umbral_lento": self.umbral_lento,
+                 "lentas": self.lentas, "metricas": self.resumen()}
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        _escribir_atomico(ruta, json.dumps(datos, ensure_ascii=False, indent=2).encode("utf-8"))
+        return ruta
+
+
+METRICAS = Metricas(**METRICAS_CONFIG)
+
+
+class _CursorMedido:
+    """Cursor que mide las fases ejecutar y leer. Solo se usa con las métricas activas."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, *args, **kwargs):
+        with METRICAS.fase("ejecutar"):
+            return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        with METRICAS.fase("ejecutar"):
+            return self._cursor.executemany(*args, **kwargs)
+
+    def fetchone(self):
+        with METRICAS.fase("leer"):
+            return self._cursor.fetchone()
+
+    def fetchmany(self, *args, **kwargs):
+        with METRICAS.fase("leer"):
+            return self._cursor.fetchmany(*args, **kwargs)
+
+    def fetchall(self):
+        with METRICAS.fase("leer"):
+            return self._cursor.fetchall()
+
+
+class _ConexionMedida:
+    """Conexión que entrega cursores medidos y mide la fase confirmar."""
+
+    def __init__(self, conexion):
+        self._conexion = conexion
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def cursor(self, *args, **kwargs):
+        return _CursorMedido(self._conexion.cursor(*args, **kwargs))
+
+    def commit(self):
+        with METRICAS.fase("confirmar"):
+            return self._conexion.commit()
+
+
+class ErrorConexion(Exception):
+    """No se pudo obtener una conexión a la base de datos."""
+
+
+def obtener_conexion(pool=None):#Obtiene una conexión del pool indicado o, si no se indica, del pool compartido.
+    #Si la conexión falla, imprime un error y lanza ErrorConexion. Se puede llamar desde cualquier hilo.
+    try:
+        conexion = (pool or POOL).obtener()
+        return conexion
+    except _errores_bd() + (PoolAgotadoError,) as err:
+        print(f"Error al obtener la conexión: {err}")
+        raise ErrorConexion(err) from err
+
+@contextmanager
+def conexion_bd(pool=None):#Presta una conexión del pool durante un bloque with y la devuelve al salir.
+    pool = pool or POOL
+    with METRICAS.fase("conectar"):
+        conexion = obtener_conexion(pool)
+    try:
+        yield _ConexionMedida(conexion) if METRICAS.activa else conexion
+    finally:
+        pool.liberar(conexion)
+
+def precalentar_conexion(pool=None):#Abre una conexión y la deja libre en el pool para la primera consulta.
+    with conexion_bd(pool):
+        pass
+
+def mostrar_error_bd(titulo, error, mensaje="Ocurrió un error"):#Muestra el error de una operación de base de datos. Solo desde el hilo de Tk.
+    if isinstance(error, ErrorConexion):
+        messagebox.showerror("Error de Conexión", f"No se pudo conectar a la base de datos: {error}\n"
+                                                    "Asegúrate de que MySQL esté corriendo y las credenciales sean correctas.")
+    else:
+        messagebox.showerror(titulo, f"{mensaje}: {error}")
+
+
+# Acceso a datos
+# El repositorio no toca la interfaz, así que se puede usar desde los hilos del EjecutorFondo,
+# desde scripts o desde el modo benchmark, contra MySQL o contra la base SQLite de prueba.
+
+# Consultas de la aplicación. Las ejecuta el repositorio (y la importación y el panel de nómina)
+# y las revisa --verificar-indices (CONSULTAS_APLICACION) a partir de estas mismas constantes.
+# {donde} se sustituye por " WHERE ..." y {y_filtro} por " AND ..." con las condiciones de
+# RepositorioEmpleados._filtro; {marcas} por tantos %s como IDs.
+SQL_SELECT_EMPLEADO = "SELECT id, nombre, apellido, puesto, salario, fecha_ingreso, version FROM empleados"
+SQL_CONTAR = "SELECT COUNT(*) FROM empleados"
+SQL_LISTAR = SQL_SELECT_EMPLEADO + " WHERE id > %s ORDER BY id ASC LIMIT %s"
+SQL_OBTENER = SQL_SELECT_EMPLEADO + " WHERE id = %s"
+SQL_EMPLEADOS_EN = SQL_SELECT_EMPLEADO + " WHERE id IN ({marcas})"
+SQL_INSERTAR = "INSERT INTO empleados (nombre, apellido, puesto, salario, fecha_ingreso) VALUES (%s, %s, %s, %s, %s)"
+SQL_ACTUALIZAR = ("UPDATE empleados SET nombre = %s, apellido = %s, puesto = %s, salario = %s, fecha_ingreso = %s, "
+                  "version = version + 1 WHERE id = %s")
+SQL_ELIMINAR = "DELETE FROM empleados WHERE id = %s"
+SQL_SI_VERSION = " AND version = %s"  # Se añade a SQL_ACTUALIZAR o SQL_ELIMINAR para el control de versión
+SQL_ANOTAR_CAMBIO = "INSERT INTO empleados_cambios (empleado_id, operacion) VALUES (%s, %s)"
+SQL_MARCA = "SELECT COALESCE(MAX(seq), 0) FROM empleados_cambios"
+SQL_PRIMERA_MARCA = "SELECT COALESCE(MIN(seq), 0) FROM empleados_cambios"
+SQL_CAMBIOS_DESDE = "SELECT seq, empleado_id FROM empleados_cambios WHERE seq > %s ORDER BY seq LIMIT %s"
+SQL_PODA_LIMITES = "SELECT COALESCE(MIN(seq), 0), COALESCE(MAX(seq), 0) FROM empleados_cambios WHERE momento < %s"
+SQL_PODA_TRAMO = "DELETE FROM empleados_cambios WHERE seq >= %s AND seq < %s"
+SQL_CREDENCIALES = "SELECT id, password FROM empleados WHERE username = %s"
+SQL_NOMBRE_DE = "SELECT id, nombre, apellido FROM empleados WHERE id = %s"
+SQL_GUARDAR_CONTRASENA = "UPDATE empleados SET password = %s WHERE id = %s AND password = %s"
+SQL_ANCHO_CONTRASENA = ("SELECT CHARACTER_MAXIMUM_LENGTH FROM information_schema.COLUMNS "
+                        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'empleados' AND COLUMN_NAME = 'password'")
+SQL_RECORRER = "SELECT id, nombre, apellido, puesto, salario, fecha_ingreso FROM empleados{donde} ORDER BY id ASC"
+# Salario después del ajuste: porcentaje y después importe fijo, redondeado a céntimos
+SQL_SALARIO_AJUSTADO = "ROUND(salario * %s + %s, 2)"
+SQL_AJUSTE_RESUMEN = (f"SELECT COUNT(*) AS empleados, COALESCE(SUM(salario), 0) AS nomina_actual, "
+                      f"COALESCE(SUM({SQL_SALARIO_AJUSTADO}), 0) AS nomina_nueva, "
+                      f"MIN({SQL_SALARIO_AJUSTADO}) AS minimo_nuevo FROM empleados{{donde}}")
+SQL_AJUSTE_MUESTRA = (f"SELECT id, nombre, apellido, puesto, salario, {SQL_SALARIO_AJUSTADO} AS salario_nuevo "
+                      "FROM empleados{donde} ORDER BY id LIMIT %s")
+SQL_AJUSTE_LIMITES = "SELECT MIN(id), MAX(id) FROM empleados WHERE id >= %s{y_filtro}"
+SQL_AJUSTE_TRAMO = (f"UPDATE empleados SET salario = {SQL_SALARIO_AJUSTADO}, version = version + 1 "
+                    "WHERE id >= %s AND id < %s{y_filtro}")
+SQL_AJUSTE_ANOTAR = "INSERT INTO empleados_cambios (empleado_id, operacion) SELECT id, 'M' FROM empleados WHERE id >= %s AND id < %s{y_filtro}"
+SQL_COLUMNAS_NOMINA = "SELECT id, puesto, salario, fecha_ingreso FROM empleados"
+
+class RepositorioEmpleados:
+    """
+    Operaciones sobre la tabla empleados, independientes de Tkinter.
+
+    Cada método toma una conexión de su pool, hace su trabajo y la devuelve. Los errores de
+    conexión llegan como ErrorConexion; los de la consulta, tal como los lanza el conector.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        # id(conexión) -> cursor preparado de credenciales. El cursor mantiene viva su conexión, así que
+        # no sirve una referencia débil: la entrada se quita cuando el pool cierra la conexión.
+        self._preparados = {}
+        pool.al_cerrar.append(self._olvidar_preparado)
+        self._ancho_contrasena = False  # Caracteres que caben en empleados.password (None: sin límite); False: sin consultar
+
+    @classmethod
+    def en_memoria(cls, nombre="rrhh"):
+        """Crea un repositorio sobre una base SQLite en memoria, compartida por las conexiones de su pool."""
+        ruta = f"file:{nombre}?mode=memory&cache=shared"
+        # La base en memoria desaparece al cerrarse la última conexión: nunca se expulsan por inactividad
+        return cls(PoolConexiones(lambda: _ConexionPrueba(ruta), inactividad_maxima=float("inf")))
+
+    def conexion(self):
+        """Presta una conexión del pool del repositorio durante un bloque with."""
+        return conexion_bd(self.pool)
+
+    @METRICAS.medida("contar")
+    def contar(self):
+        """Devuelve el número de empleados de la tabla."""
+        with self.conexion() as conexion:
+            cursor = conexion.cursor()
+            try:
+                cursor.execute(SQL_CONTAR)
+                return cursor.fetchone()[0]
+            finally:
+                cursor.close()
+
+    @METRICAS.medida("listar")
+    def listar(self, ultimo_id=0, cantidad=TAMANO_PAGINA):
+        """
+        Trae al menos `cantidad` empleados con ID mayor que `ultimo_id`, en orden de ID.
+
+        Usa paginación por clave (WHERE id > último id) para que cada página cueste lo mismo
+        sin importar cuántas filas se hayan cargado antes.
+
+        Returns:
+            tuple: (filas, fin) donde fin indica que se llegó al final de la tabla.
+        """
+        filas = []
+        with self.conexion() as conexion:
+            cursor = conexion.cursor(dictionary=True)
+            try:
+                while len(filas) < cantidad:
+                    cursor.execute(SQL_LISTAR, (ultimo_id, TAMANO_PAGINA))
+                    pagina = cursor.fetchall()
+                    filas.extend(pagina)
+                    if len(pagina) < TAMANO_PAGINA:
+                        return filas, True
+                    ultimo_id = pagina[-1]['id']
+                return filas, False
+            finally:
+                cursor.close()
+
+    @METRICAS.medida("obtener")
+    def obtener(self, empleado_id):
+        """Devuelve el empleado con ese ID, o None si no existe."""
+        with self.conexion() as conexion:
+            cursor = conexion.cursor(dictionary=True)
+            try:
+                cursor.execute(SQL_OBTENER, (empleado_id,))
+                return cursor.fetchone()
+            finally:
+                cursor.close()
+
+    @METRICAS.medida("insertar")
+    def insertar(self, nombre, apellido, puesto, salario, fecha_ingreso):
+        """Inserta un empleado y devuelve el ID asignado."""
+        with self.conexion() as conexion:
+            cursor = conexion.cursor()
+            try:
+                cursor.execute(SQL_INSERTAR, (nombre, apellido, puesto, salario, fecha_ingreso))
+                nuevo_id = cursor.lastrowid
+                self._anotar_cambio(cursor, nuevo_id, 'A')
+                conexion.commit() # Confirma los cambios en la base de datos
+                return nuevo_id
+            finally:
+                cursor.close()
+
+    @METRICAS.medida("actualizar")
+    def actualizar(self, empleado_id, nombre, apellido, puesto, salario, fecha_ingreso, version=None):
+        """
+        Actualiza los datos de un empleado y devuelve su nueva versión.
+
+        Si se indica `version`, solo se actualiza cuando la fila sigue en esa versión; si otro
+        operador la cambió o la borró antes, no se toca y se lanza ConflictoVersionError.
+        """
+        with self.conexion() as conexion:
+            cursor = conexion.cursor()
+            try:
+                sql = SQL_ACTUALIZAR
+                valores = (nombre, apellido, puesto, salario, fecha_ingreso, empleado_id)
+                if version is not None:
+                    sql += SQL_SI_VERSION
+                    valores += (version,)
+                cursor.execute(sql, valores)
+                if cursor.rowcount == 0 and version is not None:
+                    conexion.rollback()
+                    raise ConflictoVersionError(empleado_id, self.obtener(empleado_id))
+                self._anotar_cambio(cursor, empleado_id, 'M')
+                conexion.commit()
+            finally:
+                cursor.close()
+        return None if version is None else version + 1
+
+    @METRICAS.medida("eliminar")
+    def eliminar(self, empleado_id, version=None):
+        """
+        Elimina un empleado por su ID. Devuelve False si ya no existía.
+
+        Si se indica `version`, solo se borra cuando la fila sigue en esa versión; si otro
+        operador la cambió antes, no se toca y se lanza ConflictoVersionError. Que otro ya la
+        hubiera borrado no es un conflicto: el resultado es el que se quería.
+        """
+        with self.conexion() as conexion:
+            cursor = conexion.cursor()
+            try:
+                sql, valores = SQL_ELIMINAR, (empleado_id,)
+                if version is not None:
+                    sql += SQL_SI_VERSION
+                    valores += (version,)
+                cursor.execute(sql, valores)
+                if cursor.rowcount == 0:
+                    conexion.rollback()
+                    actual = self.obtener(empleado_id) if version is not None else None
+                    if actual is not None:
+                        raise ConflictoVersionError(empleado_id, actual)
+                    return False # Sin fila borrada no hay baja que anotar
+                self._anotar_cambio(cursor, empleado_id, 'B')
+                conexion.commit()
+            finally:
+                cursor.close()
+        return True
+
+    def _anotar_cambio(self, cursor, empleado_id, operacion):
+        # Se ejecuta dentro de la transacción de la escritura: el cambio y su anotación se confirman juntos
+        cursor.execute(SQL_ANOTAR_CAMBIO, (empleado_id, operacion))
+
+    @METRICAS.medida("marca_sincronizacion")
+    def marca_sincronizacion(self):
+        """Devuelve la marca (último seq) a partir de la cual se pedirán cambios."""
+        with self.conexion() as conexion:
+            cursor = conexion.cursor()
+            try:
+                cursor.execute(SQL_MARCA)
+                return cursor.fetchone()[0]
+            finally:
+                cursor.close()
+
+    def primera_marca(self):
+        """Devuelve el seq más antiguo que sigue anotado (0 si no hay ninguno)."""
+        with self.conexion() as conexion:
+            cursor = conexion.cursor()
+            try:
+                cursor.execute(SQL_PRIMERA_MARCA)
+                return cursor.fetchone()[0]
+            finally:
+                cursor.close()
+
+    @METRICAS.medida("podar_cambios")
+    def podar_cambios(self, dias=CAMBIOS_RETENCION_DIAS, tramo=CAMBIOS_PODA_TRAMO):
+        """
+        Borra las anotaciones de empleados_cambios con más de `dias` días, por tramos de seq
+        de `tramo` anotaciones, cada uno en su propia transacción. Nunca borra la última
+        anotación, para que la marca de sincronización siga avanzando desde ella.
+
+        Returns:
+            int: Número de anotaciones borradas.
+        """
+        borradas = 0
+        with self.conexion() as conexion:
+            cursor = conexion.cursor()
+            try:
+                # La hora se toma del servidor, que es quien rellena `momento`
+                cursor.execute("SELECT CURRENT_TIMESTAMP")
+                ahora = cursor.fetchone()[0]
+                if isinstance(ahora, str):
+                    ahora = datetime.fromisoformat(ahora)
+                cursor.execute(SQL_PODA_LIMITES, ((ahora - timedelta(days=dias)).strftime("%Y-%m-%d %H:%M:%S"),))
+                primera, limite = cursor.fetchone()
+                cursor.execute(SQL_MARCA)
+                limite = min(limite, cursor.fetchone()[0] - 1)
+                conexion.commit() # Cierra la instantánea de lectura antes de borrar
+                for desde in range(primera, limite + 1, tramo):
+                    cursor.execute(SQL_PODA_TRAMO, (desde, min(desde + tramo, limite + 1)))
+                    borradas += cursor.rowcount
+                    conexion.commit()
+            finally:
+                cursor.close()
+        return borradas
+
+    def novedades(self, marca):
+        """
+        Devuelve lo que cambió después de la marca `marca` para una sesión que sincroniza.
+
+        Returns:
+            tuple o None: (nueva_marca, cambios, total) como cambios_desde, con total el número
+            de empleados si hubo cambios; o None si la marca ya no sirve y la sesión tiene que
+            recargar la lista entera: la base es otra o se restauró, o se podaron anotaciones
+            posteriores a la marca que esa sesión no llegó a leer.
+        """
+        actual = self.marca_sincronizacion()
+        if actual < marca:
+            return None
+        if actual == marca:
+            return marca, [], None
+        if marca < self.primera_marca() - 1:
+            return None
+        nueva_marca, cambios = self.cambios_desde(marca)
+        return nueva_marca, cambios, self.contar() if cambios else None
+
+    @METRICAS.medida("cambios_desde")
+    def cambios_desde(self, marca, limite=SINCRONIZACION_LOTE):
+        """
+        Devuelve los empleados que cambiaron después de la marca `marca`.
+
+        También relee los SINCRONIZACION_SOLAPE cambios anteriores a la marca, por si alguna
+        transacción con un seq menor se confirmó más tarde; aplicar dos veces el mismo cambio
+        no tiene efecto.
+
+        Returns:
+            tuple: (nueva_marca, cambios), donde cambios es una lista de (empleado_id, registro)
+            y registro es None para los empleados borrados (lápidas).
+        """
+        with self.conexion() as conexion:
+            cursor = conexion.cursor()
+            try:
+                cursor.execute(SQL_CAMBIOS_DESDE, (max(0, marca - SINCRONIZACION_SOLAPE), limite + SINCRONIZACION_SOLAPE))
+                anotaciones = cursor.fetchall()
+                if not anotaciones or anotaciones[-1][0] <= marca:
+                    return marca, [] # Nada nuevo desde la última consulta
+                nueva_marca = max(marca, anotaciones[-1][0])
+                ids = list(dict.fromkeys(empleado_id for _, empleado_id in anotaciones))
+
+                # Estado actual de los empleados afectados; los que no aparecen fueron borrados
+                actuales = {}
+                cursor.close()
+                cursor = conexion.cursor(dictionary=True)
+                for desde in range(0, len(ids), 500):
+                    grupo = ids[desde:desde + 500]
+                    cursor.execute(SQL_EMPLEADOS_EN.format(marcas=", ".join(["%s"] * len(grupo))), grupo)
+                    for fila in cursor.fetchall():
+                        actuales[fila['id']] = fila
+                return nueva_marca, [(empleado_id, actuales.get(empleado_id)) for empleado_id in ids]
+            finally:
+                cursor.close()
+
+    @METRICAS.medida("aplicar_lote")
+    def aplicar_lote(self, operaciones):
+        """
+        Aplica en una sola transacción (un solo commit) una lista de escrituras diferidas.
+
+        Las modificaciones y las bajas solo se aplican si el empleado sigue en la versión con la
+        que se hicieron; si no, se rechazan sin detener el resto del lote. Un error de la base
+        en una operación concreta también la rechaza; si se pierde la conexión, el lote entero
+        se deshace y el error se propaga.
+
+        Args:
+            operaciones (list): Tuplas (operacion, empleado_id, datos, version) donde operacion es
+                'A' (alta, con un ID temporal negativo), 'M' (modificación) o 'B' (baja) y datos es
+                un diccionario con nombre, apellido, puesto, salario y fecha_ingreso. Los IDs
+                temporales de altas anteriores del mismo lote se traducen al ID asignado.
+
+        Returns:
+            list: Por cada operación, (True, id, nueva_version) si se aplicó o
+            (False, motivo, registro_actual) si se rechazó (registro_actual es None si no existe).
+        """
+        resultados = []
+        equivalencias = {}  # ID temporal -> ID asignado en este lote
+        with self.conexion() as conexion:
+            cursor = conexion.cursor()
+            lector = conexion.cursor(dictionary=True)
+            try:
+                def actual(empleado_id):
+                    lector.execute(SQL_OBTENER, (empleado_id,))
+                    return lector.fetchone()
+
+                for operacion, empleado_id, datos, version in operaciones:
+                    empleado_id = equivalencias.get(empleado_id, empleado_id)
+                    if empleado_id < 0 and operacion != 'A':
+                        resultados.append((False, "El alta de este empleado fue rechazada", None))
+                        continue
+                    try:
+                        if operacion == 'A':
+                            cursor.execute(SQL_INSERTAR, (datos['nombre'], datos['apellido'], datos['puesto'],
+                                                          datos['salario'], datos['fecha_ingreso']))
+                            # Se guarda ya: tras anotar el cambio, lastrowid es el seq de la anotación
+                            nuevo_id = cursor.lastrowid
+                            equivalencias[empleado_id] = nuevo_id
+                            self._anotar_cambio(cursor, nuevo_id, 'A')
+                            resultados.append((True, nuevo_id, 0))
+                        elif operacion == 'M':
+                            cursor.execute(SQL_ACTUALIZAR + SQL_SI_VERSION,
+                                           (datos['nombre'], datos['apellido'], datos['puesto'], datos['salario'],
+                                            datos['fecha_ingreso'], empleado_id, version))
+                            if cursor.rowcount == 0:
+                                registro = actual(empleado_id)
+                                motivo = "Otro usuario lo modificó" if registro else "Otro usuario lo eliminó"
+                                resultados.append((False, motivo, registro))
+                                continue
+                            self._anotar_cambio(cursor, empleado_id, 'M')
+                            resultados.append((True, empleado_id, version + 1))
+                        else:
+                            cursor.execute(SQL_ELIMINAR + SQL_SI_VERSION, (empleado_id, version))
+                            if cursor.rowcount == 0:
+                                registro = actual(empleado_id)
+                                if registro is not None:
+                                    resultados.append((False, "Otro usuario lo modificó", registro))
+                                    continue
+                                # Ya estaba borrado: el resultado es el que se quería
+                            else:
+                                self._anotar_cambio(cursor, empleado_id, 'B')
+                            resultados.append((True, empleado_id, None))
+                    except _errores_bd() as e:
+                        if not conexion.is_connected():
+                            raise
+                        resultados.append((False, str(e), actual(empleado_id) if empleado_id > 0 else None))
+                conexion.commit()
+            finally:
+                lector.close()
+                cursor.close()
+        return resultados
+
+    @METRICAS.medida("credenciales")
+    def credenciales(self, username):
+        """
+        Devuelve (id, contraseña guardada) del usuario, o None si no existe.
+
+        Es la consulta de cada intento de inicio de sesión: lee solo esas dos columnas por el
+        índice único de username, con una sentencia preparada que se guarda junto a cada conexión
+        del pool, así que se prepara una vez por conexión y no una vez por intento.
+        """
+        with self.conexion() as conexion:
+            propia = conexion._conexion if isinstance(conexion, _ConexionMedida) else conexion
+            cursor = self._preparados.get(id(propia))
+            if cursor is None:
+                cursor = self._preparados[id(propia)] = conexion.cursor(prepared=True)
+            try:
+                cursor.execute(SQL_CREDENCIALES, (username,))
+                filas = cursor.fetchall()
+            except BaseException:
+                self._preparados.pop(id(propia), None)
+                raise
+        if not filas:
+            return None
+        empleado_id, guardada = filas[0]
+        if isinstance(guardada, (bytes, bytearray)):
+            guardada = guardada.decode("utf-8")
+        return empleado_id, guardada
+
+    def _olvidar_preparado(self, conexion):
+        # El pool va a cerrar la conexión: su cursor preparado ya no sirve (y su id se puede reutilizar)
+        cursor = self._preparados.pop(id(conexion), None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    @METRICAS.medida("nombre_de")
+    def nombre_de(self, empleado_id):
+        """Devuelve {'id', 'nombre', 'apellido'} del empleado, o None si no existe."""
+        with self.conexion() as conexion:
+            cursor = conexion.cursor(dictionary=True)
+            try:
+                cursor.execute(SQL_NOMBRE_DE, (empleado_id,))
+                return cursor.fetchone()
+            finally:
+                cursor.close()
+
+    @METRICAS.medida("guardar_contrasena")
+    def guardar_contrasena(self, empleado_id, anterior, nueva):
+        """
+        Sustituye la contraseña guardada de un usuario si sigue siendo `anterior`.
+        Devuelve False si otro proceso la cambió mientras tanto.
+        """
+        with self.conexion() as conexion:
+            cursor = conexion.cursor()
+            try:
+                cursor.execute(SQL_GUARDAR_CONTRASENA, (nueva, empleado_id, anterior))
+                conexion.commit()
+                return cursor.rowcount == 1
+            finally:
+                cursor.close()
+
+    def ancho_contrasena(self):
+        """
+        Devuelve cuántos caracteres caben en la columna password, o None si no tiene límite.
+        Se consulta una vez; si la columna se ensancha (--migrar), se nota al reiniciar.
+        """
+        if self._ancho_contrasena is False:
+            with self.conexion() as conexion:
+                if _es_sqlite(conexion):
+                    self._ancho_contrasena = None
+                else:
+                    cursor = conexion.cursor()
+                    try:
+                        cursor.execute(SQL_ANCHO_CONTRASENA)
+                        fila = cursor.fetchone()
+                        self._ancho_contrasena = fila[0] if fila else None
+                    finally:
+                        cursor.close()
+        return self._ancho_contrasena
+
+    @METRICAS.medida("recorrer")
+    def recorrer(self, puesto=None, desde=None, hasta=None, lote=None):
+        """
+        Genera las filas de empleados (tuplas) en orden de ID sin traerlas todas a memoria.
+
+        Usa un cursor sin búfer (el servidor envía las filas a medida que se leen) y fetchmany por
+        lotes. Opcionalmente filtra por puesto y por rango de fecha_ingreso (ambos extremos incluidos).
+        """
+        condiciones, parametros = self._filtro(puesto, desde, hasta)
+        sql = SQL_RECORRER.format(donde=" WHERE " + " AND ".join(condiciones) if condiciones else "")
+
+        with self.conexion() as conexion:
+            cursor = conexion.cursor(buffered=False)
+            try:
+                cursor.execute(sql, parametros)
+                while True:
+                    filas = cursor.fetchmany(lote or EXPORTACION_LOTE)
+                    if not filas:
+                        break
+                    yield from filas
+            finally:
+                try:
+                    cursor.close()
+                except Exception:
+                    # Si se abandonó el recorrido a medias quedan filas sin leer; la conexión se
+                    # descarta al devolverla al pool porque no admite el rollback
+                    pass
+
+    @staticmethod
+    def _filtro(puesto=None, desde=None, hasta=None):
+        # Condiciones (y sus parámetros) para filtrar por puesto y por rango de fecha_ingreso
+        condiciones, parametros = [], []
+        if puesto:
+            condiciones.append("puesto = %s")
+            parametros.append(puesto)
+        if desde:
+            condiciones.append("fecha_ingreso >= %s")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("fecha_ingreso <= %s")
+            parametros.append(hasta)
+        return condiciones, parametros
+
+    @METRICAS.medida("previsualizar_ajuste")
+    def previsualizar_ajuste(self, porcentaje=0.0, importe=0.0, puesto=None, desde=None, hasta=None, muestra=50):
+        """
+        Calcula, sin modificar nada, el efecto de un ajuste masivo de salarios.
+
+        Returns:
+            dict: empleados afectados, nomina_actual y nomina_nueva (sumas de salarios), minimo_nuevo
+            (el menor salario resultante) y muestra (las primeras filas afectadas con su salario_nuevo).
+        """
+        condiciones, parametros = self._filtro(puesto, desde, hasta)
+        donde = " WHERE " + " AND ".join(condiciones) if condiciones else ""
+        ajuste = [1 + porcentaje / 100, importe]
+        with self.conexion() as conexion:
+            cursor = conexion.cursor(dictionary=True)
+            try:
+                cursor.execute(SQL_AJUSTE_RESUMEN.format(donde=donde), ajuste + ajuste + parametros)
+                resumen = cursor.fetchone()
+                cursor.execute(SQL_AJUSTE_MUESTRA.format(donde=donde), ajuste + parametros + [muestra])
+                filas = cursor.fetchall()
+            finally:
+                cursor.close()
+        return {"empleados": resumen['empleados'], "nomina_actual": float(resumen['nomina_actual']),
+                "nomina_nueva": float(resumen['nomina_nueva']),
+                "minimo_nuevo": None if resumen['minimo_nuevo'] is None else float(resumen['minimo_nuevo']),
+                "muestra": filas}
+
+    @METRICAS.medida("ajustar_salarios")
+    def ajustar_salarios(self, porcentaje=0.0, importe=0.0, puesto=None, desde=None, hasta=None,
+                         desde_id=None, tramo=AJUSTE_TRAMO, pausa=AJUSTE_PAUSA, al_progresar=None):
+        """
+        Aplica un ajuste masivo de salarios con UPDATE por tramos de IDs.
+
+        Cada tramo (id entre a y a + tramo) se actualiza con un solo UPDATE que sube la versión,
+        anota sus filas en empleados_cambios y se confirma enseguida, así que los bloqueos sobre
+        empleados duran lo que tarda un tramo y no el ajuste entero. Si un tramo falla, los
+        anteriores quedan confirmados y se lanza AjusteInterrumpidoError con el ID desde el que
+        hay que reanudar (`desde_id`).
+
+        Args:
+            al_progresar (callable, optional): al_progresar(ajustados, fraccion) tras cada tramo,
+                desde el hilo que ejecuta el ajuste.
+
+        Returns:
+            int: Número de empleados ajustados.
+        """
+        condiciones, parametros = self._filtro(puesto, desde, hasta)
+        y_filtro = "".join(f" AND {condicion}" for condicion in condiciones)
+        ajuste = [1 + porcentaje / 100, importe]
+        ajustados = 0
+        with self.conexion() as conexion:
+            cursor = conexion.cursor()
+            try:
+                cursor.execute(SQL_AJUSTE_LIMITES.format(y_filtro=y_filtro), [desde_id or 0] + parametros)
+                primero, ultimo = cursor.fetchone()
+                conexion.commit() # Cierra la transacción de lectura antes de empezar a escribir
+                if primero is None:
+                    return 0
+                inicio = primero
+                while inicio <= ultimo:
+                    fin = inicio + tramo
+                    try:
+                        cursor.execute(SQL_AJUSTE_TRAMO.format(y_filtro=y_filtro), ajuste + [inicio, fin] + parametros)
+                        en_tramo = max(cursor.rowcount, 0)
+                        if en_tramo:
+                            cursor.execute(SQL_AJUSTE_ANOTAR.format(y_filtro=y_filtro), [inicio, fin] + parametros)
+                        conexion.commit()
+                    except _errores_bd() as e:
+                        raise AjusteInterrumpidoError(ajustados, inicio, e) from e
+                    ajustados += en_tramo
+                    inicio = fin
+                    if al_progresar:
+                        al_progresar(ajustados, min(1.0, (inicio - primero) / (ultimo - primero + 1)))
+                    if pausa and inicio <= ultimo:
+                        time.sleep(pausa)
+            finally:
+                cursor.close()
+        return ajustados
+
+
+# Repositorio compartido por las ventanas de la aplicación
+REPOSITORIO = RepositorioEmpleados(POOL)
+
+
+# Autenticación
+# Las contraseñas se guardan como "algoritmo$coste$sal$hash" (PBKDF2-SHA256 o scrypt, con sal
+# aleatoria). Las que siguen en claro o con un coste menor que el configurado se vuelven a
+# guardar con el hash actual la próxima vez que su usuario inicia sesión correctamente.
+# RRHH_HASH elige el algoritmo y RRHH_HASH_COSTE el coste (iteraciones de PBKDF2 o N de scrypt).
+COSTES_HASH = {"pbkdf2_sha256": 300000, "scrypt": 2 ** 14}
+AUTENTICACION_CONFIG = {
+    "algoritmo": os.environ.get("RRHH_HASH", "pbkdf2_sha256"),
+    "coste": int(os.environ.get("RRHH_HASH_COSTE", "0")) or None,  # None: el de COSTES_HASH
+    "intentos": 5,       # Fallos seguidos que se permiten a un usuario dentro de la ventana
+    "ventana": 300.0     # Segundos que cuenta un fallo; pasado ese tiempo se olvida
+}
+
+
+class AccesoBloqueadoError(Exception):
+    """Un usuario superó los intentos fallidos permitidos y debe esperar `segundos` antes de reintentar."""
+
+    def __init__(self, username, segundos):
+        super().__init__(f"Demasiados intentos fallidos para {username}. Espere {segundos:.0f} segundos.")
+        self.username = username
+        self.segundos = segundos
+
+
+def _derivar(algoritmo, password, sal, coste):#Calcula el hash de una contraseña con el algoritmo y el coste indicados.
+    if algoritmo == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), sal, coste)
+    if algoritmo == "scrypt":
+        return hashlib.scrypt(password.encode("utf-8"), salt=sal, n=coste, r=8, p=1, maxmem=256 * coste * 8 + 2 ** 20)
+    raise ValueError(f"Algoritmo de hash desconocido: {algoritmo}")
+
+def hashear_contrasena(password, algoritmo="pbkdf2_sha256", coste=None):#Devuelve la contraseña lista para guardar, con una sal nueva.
+    coste = coste or COSTES_HASH[algoritmo]
+    sal = os.urandom(16)
+    return f"{algoritmo}${coste}${sal.hex()}${_derivar(algoritmo, password, sal, coste).hex()}"
+
+def verificar_contrasena(password, guardada, algoritmo="pbkdf2_sha256", coste=None):#Comprueba una contraseña contra la guardada.
+    #Devuelve (válida, hay_que_rehacer): hay que rehacer el hash si estaba en claro o con otro algoritmo o un coste menor.
+    coste = coste or COSTES_HASH[algoritmo]
+    if not guardada:
+        return False, False
+    partes = guardada.split("$")
+    if len(partes) != 4 or partes[0] not in COSTES_HASH:
+        # Contraseña de antes de los hashes, guardada en claro
+        return hmac.compare_digest(password.encode("utf-8"), guardada.encode("utf-8")), True
+    guardado_con, coste_guardado, sal, esperado = partes
+    calculado = _derivar(guardado_con, password, bytes.fromhex(sal), int(coste_guardado))
+    valida = hmac.compare_digest(calculado, bytes.fromhex(esperado))
+    return valida, valida and (guardado_con != algoritmo or int(coste_guardado) < coste)
+
+
+class ServicioAutenticacion:
+    """
+    Inicio de sesión con contraseñas con hash y límite de intentos por usuario.
+
+    Cada intento hace una sola consulta estrecha (username -> id y hash, con sentencia preparada
+    sobre las conexiones del pool); el nombre se lee después y solo si la contraseña es válida.
+    Los fallos se cuentan por usuario en memoria: tras `intentos` fallos dentro de `ventana`
+    segundos, los siguientes intentos se rechazan sin consultar la base ni calcular el hash.
+    Es seguro usarlo desde varios hilos a la vez.
+    """
+
+    def __init__(self, repositorio, algoritmo="pbkdf2_sha256", coste=None, intentos=5, ventana=300.0):
+        self.repositorio = repositorio
+        self.algoritmo = algoritmo
+        self.coste = coste or COSTES_HASH[algoritmo]
+        self.intentos = intentos
+        self.ventana = ventana
+        self._fallos = {}        # Usuario (en minúsculas) -> deque con los instantes de sus fallos recientes
+        self._cerrojo = threading.Lock()
+        self._hash_ficticio = None  # Para tardar lo mismo con usuarios que no existen
+
+    def _comprobar_bloqueo(self, clave, ahora):
+        with self._cerrojo:
+            fallos = self._fallos.get(clave)
+            if not fallos:
+                return
+            while fallos and fallos[0] <= ahora - self.ventana:
+                fallos.popleft()
+            if len(fallos) >= self.intentos:
+                raise AccesoBloqueadoError(clave, fallos[0] + self.ventana - ahora)
+
+    def _anotar_fallo(self, clave, ahora):
+        with self._cerrojo:
+            if len(self._fallos) > 10000:
+                # Olvida a los usuarios cuyos fallos ya caducaron para que el diccionario no crezca sin límite
+                self._fallos = {usuario: fallos for usuario, fallos in self._fallos.items() if fallos and fallos[-1] > ahora - self.ventana}
+            self._fallos.setdefault(clave, deque(maxlen=self.intentos)).append(ahora)
+
+    @METRICAS.medida("autenticar")
+    def autenticar(self, username, password):
+        """
+        Devuelve {'id', 'nombre', 'apellido'} si las credenciales son válidas, o None si no.
+
+        Lanza AccesoBloqueadoError si el usuario agotó sus intentos. Si la contraseña guardada
+        estaba en claro o con un hash más débil que el configurado, se guarda con el actual.
+        """
+        clave = username.strip().lower()
+        ahora = time.monotonic()
+        self._comprobar_bloqueo(clave, ahora)
+        fila = self.repositorio.credenciales(username)
+        if fila is None:
+            if self._hash_ficticio is None:
+                self._hash_ficticio = hashear_contrasena("", self.algoritmo, self.coste)
+            verificar_contrasena(password, self._hash_ficticio, self.algoritmo, self.coste)
+            valida = False
+        else:
+            empleado_id, guardada = fila
+            valida, rehacer = verificar_contrasena(password, guardada, self.algoritmo, self.coste)
+        if not valida:
+            self._anotar_fallo(clave, ahora)
+            return None
+        with self._cerrojo:
+            self._fallos.pop(clave, None)
+        if rehacer:
+            nueva = hashear_contrasena(password, self.algoritmo, self.coste)
+            try:
+                ancho = self.repositorio.ancho_contrasena()
+                if ancho is not None and len(nueva) > ancho:
+                    # Una columna estrecha de antes de los hashes lo truncaría o lo rechazaría
+                    print(f"No se actualiza la contraseña guardada de {username}: el hash ocupa {len(nueva)} caracteres "
+                          f"y la columna password admite {ancho} (ejecuta --migrar para ensancharla).")
+                else:
+                    self.repositorio.guardar_contrasena(empleado_id, guardada, nueva)
+            except _errores_bd() as e:
+                # El acceso no depende de esto: se volverá a intentar en el próximo inicio de sesión
+                print(f"No se pudo actualizar la contraseña guardada de {username}: {e}")
+        return self.repositorio.nombre_de(empleado_id)
+
+
+# Servicio de inicio de sesión de la aplicación
+AUTENTICACION = ServicioAutenticacion(REPOSITORIO, **AUTENTICACION_CONFIG)
+
+
+# Importación masiva de empleados desde CSV
+IMPORTACION_LOTE = 1000  # Filas que se insertan en cada transacción
+COLUMNAS_IMPORTACION = ("nombre", "apellido", "puesto", "salario", "fecha_ingreso")
+
+@METRICAS.medida("importar_csv")
+def importar_csv(ruta, al_progresar=None, tamano_lote=IMPORTACION_LOTE):#Importa empleados desde un CSV sin cargarlo entero en memoria.
+    #El archivo debe tener cabecera con las columnas nombre, apellido, puesto, salario y fecha_ingreso.
+    #Cada fila se valida con las mismas reglas que el formulario; las válidas se insertan con executemany
+    #en lotes de `tamano_lote` filas, cada lote en su propia transacción. Las rechazadas se escriben,
+    #con el número de línea y el motivo, en un archivo "<ruta>.rechazos.csv".
+    #al_progresar(importadas, rechazadas) se llama tras cada lote desde el hilo que ejecuta la importación.
+    #Devuelve un diccionario con los totales y la ruta del archivo de rechazos (None si no hubo).
+    ruta_rechazos = ruta + ".rechazos.csv"
+    importadas = rechazadas = 0
+    archivo_rechazos = escritor_rechazos = None
+    lote = []
+
+    with open(ruta, newline="", encoding="utf-8-sig") as archivo, conexion_bd() as conexion:
+        muestra = archivo.read(4096)
+        archivo.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.DictReader(archivo, dialect=dialecto)
+        faltantes = [c for c in COLUMNAS_IMPORTACION if c not in (lector.fieldnames or [])]
+        if faltantes:
+            raise ValueError(f"Faltan columnas en el CSV: {', '.join(faltantes)}")
+
+        cursor = conexion.cursor()
+
+        def insertar_lote():
+            # El lote y su anotación en empleados_cambios van en la misma transacción.
+            # executemany envía un único INSERT de varias filas: InnoDB le da IDs consecutivos (sin
+            # huecos en un INSERT con un número de filas conocido) y lastrowid es el de la primera.
+            # Así se anotan solo los IDs de este lote, no los que otras sesiones inserten a la vez.
+            cursor.executemany(SQL_INSERTAR, lote)
+            primero = cursor.lastrowid
+            cursor.executemany(SQL_ANOTAR_CAMBIO, [(empleado_id, 'A') for empleado_id in range(primero, primero + len(lote))])
+            conexion.commit()
+
+        try:
+            for fila in lector:
+                valores = [(fila.get(c) or "").strip() for c in COLUMNAS_IMPORTACION]
+                nombre, apellido, puesto, salario_str, fecha_ingreso_str = valores
+                try:
+                    if not all(valores):
+                        raise ValueError("Campos vacíos")
+                    salario, fecha_ingreso = convertir_datos_empleado(salario_str, fecha_ingreso_str)
+                except ValueError as e:
+                    if escritor_rechazos is None:
+                        archivo_rechazos = open(ruta_rechazos, "w", newline="", encoding="utf-8")
+                        escritor_rechazos = csv.writer(archivo_rechazos)
+                        escritor_rechazos.writerow(("linea", "motivo") + COLUMNAS_IMPORTACION)
+                    escritor_rechazos.writerow([lector.line_num, str(e)] + valores)
+                    rechazadas += 1
+                    continue
+
+                lote.append((nombre, apellido, puesto, salario, fecha_ingreso))
+                if len(lote) >= tamano_lote:
+                    insertar_lote()
+                    importadas += len(lote)
+                    lote.clear()
+                    if al_progresar:
+                        al_progresar(importadas, rechazadas)
+
+            if lote:
+                insertar_lote()
+                importadas += len(lote)
+            if al_progresar:
+                al_progresar(importadas, rechazadas)
+        finally:
+            cursor.close()
+            if archivo_rechazos is not None:
+                archivo_rechazos.close()
+
+    return {"importadas": importadas, "rechazadas": rechazadas,
+            "archivo_rechazos": ruta_rechazos if rechazadas else None}
+
+
+# Exportación de empleados
+EXPORTACION_LOTE = 2000  # Filas que se piden al servidor en cada fetchmany
+COLUMNAS_EXPORTACION = ("id", "nombre", "apellido", "puesto", "salario", "fecha_ingreso")
+
+def _lineas_csv(filas):#Convierte filas en líneas CSV, empezando por la cabecera.
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(COLUMNAS_EXPORTACION)
+    for fila in filas:
+        escritor.writerow(fila)
+        yield salida.getvalue()
+        salida.seek(0)
+        salida.truncate()
+    yield salida.getvalue()
+
+def _lineas_jsonl(filas):#Convierte filas en líneas JSON (un objeto por línea).
+    for empleado_id, nombre, apellido, puesto, salario, fecha_ingreso in filas:
+        yield json.dumps({"id": empleado_id, "nombre": nombre, "apellido": apellido, "puesto": puesto,
+                          "salario": float(salario), "fecha_ingreso": str(fecha_ingreso)}, ensure_ascii=False) + "\n"
+
+def exportar_empleados(ruta, formato="csv", puesto=None, desde=None, hasta=None, al_progresar=None):#Exporta la tabla empleados a un archivo CSV o JSON Lines.
+    #Las filas pasan del cursor al archivo a través de generadores, así que la memoria no crece
+    #con el tamaño de la tabla. Se escribe en un archivo temporal que sustituye al destino al terminar.
+    #al_progresar(filas) se llama cada EXPORTACION_LOTE filas desde el hilo que exporta.
+    #Devuelve el número de filas exportadas.
+    exportadas = 0
+
+    def contar(filas):
+        nonlocal exportadas
+        for fila in filas:
+            yield fila
+            exportadas += 1
+            if al_progresar and exportadas % EXPORTACION_LOTE == 0:
+                al_progresar(exportadas)
+
+    filas = contar(REPOSITORIO.recorrer(puesto, desde, hasta))
+    lineas = _lineas_jsonl(filas) if formato == "jsonl" else _lineas_csv(filas)
+    temporal = ruta + ".tmp"
+    try:
+        with open(temporal, "w", newline="", encoding="utf-8", buffering=1024 * 1024) as archivo:
+            archivo.writelines(lineas)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return exportadas
+
+
+# Analítica de nómina
+TRAMOS_ANTIGUEDAD = [0, 1, 2, 5, 10, 20, float("inf")]  # Límites en años de los tramos de antigüedad
+PERCENTILES_NOMINA = [25, 50, 75, 90]
+_EPOCA = date(1970, 1, 1)
+
+@METRICAS.medida("bd_columnas_nomina")
+def bd_columnas_nomina(lote=EXPORTACION_LOTE):#Carga id, puesto, salario y fecha_ingreso de todos los empleados en una AnaliticaNomina.
+    #Lee con un cursor sin búfer y fetchmany, guardando cada columna en un array compacto.
+    ids, puestos, salarios, fechas = array("q"), [], array("d"), array("q")
+    with conexion_bd() as conexion:
+        cursor = conexion.cursor(buffered=False)
+        try:
+            cursor.execute(SQL_COLUMNAS_NOMINA)
+            while True:
+                filas = cursor.fetchmany(lote)
+                if not filas:
+                    break
+                for empleado_id, puesto, salario, fecha_ingreso in filas:
+                    ids.append(empleado_id)
+                    puestos.append(puesto)
+                    salarios.append(float(salario))
+                    fechas.append((fecha_ingreso - _EPOCA).days)
+        finally:
+            cursor.close()
+    analitica = AnaliticaNomina()
+    analitica.cargar(ids, puestos, salarios, fechas)
+    return analitica
+
+
+class AnaliticaNomina:
+    """
+    Columnas de salario, fecha de ingreso y puesto en arrays de NumPy para calcular la nómina.
+
+    Los cálculos son operaciones vectorizadas o agrupadas sobre las columnas completas. Los cambios
+    de un solo empleado se aplican en su posición (las bajas mueven el último empleado al hueco),
+    así que no hace falta volver a leer la tabla tras cada alta, modificación o baja.
+    """
+
+    def __init__(self):
+        self.n = 0                                    # Empleados cargados
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.salarios = np.zeros(0, dtype=np.float64)
+        self.fechas = np.zeros(0, dtype=np.int64)     # Días desde 1970-01-01
+        self.codigos = np.zeros(0, dtype=np.int32)    # Índice del puesto en self.puestos
+        self.puestos = []                             # Código -> nombre del puesto
+        self._codigos_puesto = {}                     # Nombre del puesto -> código
+        self._posiciones = {}                         # ID -> posición en los arrays
+
+    def _codigo(self, puesto):
+        codigo = self._codigos_puesto.get(puesto)
+        if codigo is None:
+            codigo = self._codigos_puesto[puesto] = len(self.puestos)
+            self.puestos.append(puesto)
+        return codigo
+
+    def cargar(self, ids, puestos, salarios, fechas):
+        """Sustituye todos los datos por las columnas dadas (secuencias del mismo largo)."""
+        self.n = len(ids)
+        self.ids = np.array(ids, dtype=np.int64)
+        self.salarios = np.array(salarios, dtype=np.float64)
+        self.fechas = np.array(fechas, dtype=np.int64)
+        self.puestos = []
+        self._codigos_puesto = {}
+        self.codigos = np.fromiter((self._codigo(p) for p in puestos), dtype=np.int32, count=self.n)
+        self._posiciones = {int(empleado_id): i for i, empleado_id in enumerate(self.ids)}
+
+    def _asegurar_capacidad(self):
+        if self.n < len(self.ids):
+            return
+        capacidad = max(16, 2 * len(self.ids))
+        for nombre in ("ids", "salarios", "fechas", "codigos"):
+            actual = getattr(self, nombre)
+            nuevo = np.zeros(capacidad, dtype=actual.dtype)
+            nuevo[:self.n] = actual[:self.n]
+            setattr(self, nombre, nuevo)
+
+    def alta(self, registro):
+        """Añade un empleado (o lo actualiza si ya estaba)."""
+        if registro['id'] in self._posiciones:
+            self.modificacion(registro)
+            return
+        self._asegurar_capacidad()
+        posicion = self.n
+        self.n += 1
+        self.ids[posicion] = registro['id']
+        self._posiciones[registro['id']] = posicion
+        self._escribir(posicion, registro)
+
+    def modificacion(self, registro):
+        """Actualiza el salario, la fecha y el puesto de un empleado ya cargado."""
+        posicion = self._posiciones.get(registro['id'])
+        if posicion is None:
+            self.alta(registro)
+        else:
+            self._escribir(posicion, registro)
+
+    def _escribir(self, posicion, registro):
+        self.salarios[posicion] = float(registro['salario'])
+        self.fechas[posicion] = (registro['fecha_ingreso'] - _EPOCA).days
+        self.codigos[posicion] = self._codigo(registro['puesto'])
+
+    def baja(self, empleado_id):
+        """Quita a un empleado moviendo el último a su posición."""
+        posicion = self._posiciones.pop(empleado_id, None)
+        if posicion is None:
+            return
+        ultimo = self.n - 1
+        if posicion != ultimo:
+            for columna in (self.ids, self.salarios, self.fechas, self.codigos):
+                columna[posicion] = columna[ultimo]
+            self._posiciones[int(self.ids[posicion])] = posicion
+        self.n = ultimo
+
+    def resumen(self, hoy=None):
+        """
+        Calcula los indicadores de la nómina.
+
+        Returns:
+            dict: empleados, nomina_total, salario_medio, salario_mediano, por_puesto
+            (empleados, total, media y percentiles de cada puesto), ingresos_por_anio
+            (año -> altas) y antiguedad (tramo -> empleados).
+        """
+        hoy = hoy or date.today()
+        n = self.n
+        if n == 0:
+            return {"empleados": 0, "nomina_total": 0.0, "salario_medio": 0.0, "salario_mediano": 0.0,
+                    "por_puesto": {}, "ingresos_por_anio": {}, "antiguedad": {}}
+        salarios = self.salarios[:n]
+        fechas = self.fechas[:n]
+        codigos = self.codigos[:n]
+
+        # Agrupa por puesto ordenando por (puesto, salario): cada grupo queda contiguo y ordenado
+        orden = np.lexsort((salarios, codigos))
+        codigos_ordenados = codigos[orden]
+        salarios_ordenados = salarios[orden]
+        cortes = np.flatnonzero(np.diff(codigos_ordenados)) + 1
+        por_puesto = {}
+        for codigo, grupo in zip(codigos_ordenados[np.r_[0, cortes]], np.split(salarios_ordenados, cortes)):
+            por_puesto[self.puestos[codigo]] = {
+                "empleados": len(grupo),
+                "total": float(grupo.sum()),
+                "media": float(grupo.mean()),
+                "percentiles": dict(zip(PERCENTILES_NOMINA, np.percentile(grupo, PERCENTILES_NOMINA).tolist()))
+            }
+
+        anios = fechas.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64) + 1970
+        anios_unicos, altas = np.unique(anios, return_counts=True)
+
+        antiguedad = np.clip(((hoy - _EPOCA).days - fechas) / 365.25, 0, None)
+        conteos, _ = np.histogram(antiguedad, bins=TRAMOS_ANTIGUEDAD)
+        tramos = [f"{a}-{b} años" if b != float("inf") else f"{a}+ años"
+                  for a, b in zip(TRAMOS_ANTIGUEDAD[:-1], TRAMOS_ANTIGUEDAD[1:])]
+
+        return {
+            "empleados": n,
+            "nomina_total": float(salarios.sum()),
+            "salario_medio": float(salarios.mean()),
+            "salario_mediano": float(np.median(salarios)),
+            "por_puesto": por_puesto,
+            "ingresos_por_anio": dict(zip(anios_unicos.tolist(), altas.tolist())),
+            "antiguedad": dict(zip(tramos, conteos.tolist()))
+        }
+
+
+class EjecutorFondo:
+    """
+    Ejecuta funciones en un pool de hilos y entrega sus resultados al bucle de eventos de Tk.
+
+    Los hilos nunca tocan los widgets: dejan el resultado en una cola que el hilo de Tk revisa
+    periódicamente con `master.after`. Las peticiones enviadas con la misma `clave` se sustituyen
+    entre sí: solo se entrega el resultado de la más reciente y las anteriores se cancelan si aún
+    no habían empezado.
+    """
+
+    def __init__(self, master, hilos=4, intervalo=25, al_cambiar_ocupado=None):
+        self.master = master
+        self.intervalo = intervalo               # Milisegundos entre revisiones de la cola
+        self.al_cambiar_ocupado = al_cambiar_ocupado
+        self.pendientes = 0                      # Peticiones enviadas cuyo resultado aún no se entregó
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="rrhh")
+        self._resultados = queue.SimpleQueue()
+        self._vigentes = {}                      # clave -> (número de la petición vigente, futuro)
+        self._contador = 0
+        self._activo = True
+        self.master.after(self.intervalo, self._revisar)
+
+    def enviar(self, funcion, *args, al_terminar=None, al_fallar=None, clave=None, ocupa=True):
+        """
+        Ejecuta `funcion(*args)` en segundo plano.
+
+        `al_terminar(resultado)` o `al_fallar(error)` se llaman después en el hilo de Tk.
+        Con `ocupa=False` la petición no cuenta para el indicador de ocupado (tareas periódicas).
+        """
+        self._contador += 1
+        numero = self._contador
+        if clave is not None:
+            anterior = self._vigentes.get(clave)
+            if anterior is not None and anterior[1].cancel() and anterior[2]:
+                # No llegó a empezar: no habrá resultado que entregar
+                self._cambiar_pendientes(-1)
+        futuro = self._pool.submit(self._ejecutar, funcion, args, al_terminar, al_fallar, clave, numero, ocupa)
+        if clave is not None:
+            self._vigentes[clave] = (numero, futuro, ocupa)
+        if ocupa:
+            self._cambiar_pendientes(1)
+
+    def cancelar(self, clave):
+        """Descarta la petición vigente con esa clave."""
+        anterior = self._vigentes.pop(clave, None)
+        if anterior is not None and anterior[1].cancel() and anterior[2]:
+            self._cambiar_pendientes(-1)
+
+    def en_hilo_principal(self, funcion, *args):
+        """Programa `funcion(*args)` en el hilo de Tk. Se puede llamar desde cualquier hilo."""
+        self._resultados.put((funcion, args, None, None, False))
+
+    def _ejecutar(self, funcion, args, al_terminar, al_fallar, clave, numero, ocupa):
+        try:
+            resultado = funcion(*args)
+        except Exception as e:
+            self._resultados.put((al_fallar, (e,), clave, numero, ocupa))
+        else:
+            self._resultados.put((al_terminar, (resultado,), clave, numero, ocupa))
+
+    def _revisar(self):
+        try:
+            while True:
+                try:
+                    funcion, args, clave, numero, ocupa = self._resultados.get_nowait()
+                except queue.Empty:
+                    break
+                if numero is not None:
+                    if ocupa:
+                        self._cambiar_pendientes(-1)
+                    if clave is not None:
+                        vigente = self._vigentes.get(clave)
+                        if vigente is None or vigente[0] != numero:
+                            continue # Otra petición más reciente la sustituyó
+                        del self._vigentes[clave]
+                if funcion is not None:
+                    try:
+                        funcion(*args)
+                    except Exception as e:
+                        # Un fallo en una respuesta no puede dejar sin entregar las demás
+                        print(f"Error al entregar un resultado de segundo plano a {getattr(funcion, '__qualname__', funcion)}: {e}")
+                        traceback.print_exc()
+                if not self._activo:
+                    return
+        finally:
+            # Se vuelve a programar pase lo que pase: si no, la cola no se revisaría nunca más
+            if self._activo:
+                try:
+                    self.master.after(self.intervalo, self._revisar)
+                except tk.TclError:
+                    self._activo = False # La ventana ya se cerró
+
+    def _cambiar_pendientes(self, cambio):
+        antes = self.pendientes
+        self.pendientes += cambio
+        if self.al_cambiar_ocupado and (antes == 0) != (self.pendientes == 0):
+            self.al_cambiar_ocupado(self.pendientes > 0)
+
+    def cerrar(self):
+        """Deja de entregar resultados y libera los hilos sin esperar a que terminen."""
+        self._activo = False
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def convertir_datos_empleado(salario_str, fecha_ingreso_str):#Convierte el salario y la fecha de ingreso escritos por el usuario.
+    #Devuelve (salario, fecha_ingreso) o lanza ValueError si el salario no es un número
+    #o la fecha no tiene el formato YYYY-MM-DD.
+    return float(salario_str), datetime.strptime(fecha_ingreso_str, "%Y-%m-%d").date()
+
+
+class ModeloEmpleados:
+    """
+    Empleados cargados en memoria, mantenidos en orden de ID y guardados por columnas.
+
+    Cada campo numérico es un array compacto (ID, salario, fecha de ingreso como ordinal, código
+    de puesto, versión), los puestos se guardan una sola vez y el nombre y el apellido van juntos,
+    en UTF-8, en un único búfer de bytes. Los registros (diccionarios) se construyen al pedirlos,
+    normalmente solo para las filas visibles, así que cada empleado ocupa unas decenas de bytes
+    en lugar de un diccionario con sus propios objetos.
+
+    Permite aplicar un alta, una modificación o una baja sin volver a leer la tabla; cada una se
+    avisa a los métodos registrados con `observar` como `observador(cambio, indice)` ('A', 'M',
+    'B' o 'pagina', con la posición de la fila o de la primera fila añadida). `ultimo_id` es la frontera de la paginación por clave: las filas con un ID mayor
+    todavía no se han traído del servidor, salvo que `completo` sea True.
+    """
+
+    def __init__(self):
+        self.generacion = 0             # Aumenta con cada cambio; las vistas la usan para saber si siguen vigentes
+        self.observadores = []          # weakref.WeakMethod de los métodos a los que se avisa de cada cambio (vaciar no se avisa)
+        self.vaciar()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def vaciar(self):
+        self.generacion += 1
+        self.ids = array('q')           # IDs cargados, en orden ascendente
+        self.salarios = array('d')
+        self.fechas = array('i')        # fecha_ingreso.toordinal()
+        self.codigos = array('I')       # Posición del puesto en self.puestos
+        self.versiones = array('q')     # -1 si no se conoce la versión
+        self.inicios = array('Q')       # Posición de "nombre\x1fapellido" en self.textos
+        self.longitudes = array('H')
+        self.textos = bytearray()
+        self._basura = 0                # Bytes de self.textos que ya no usa ninguna fila
+        self.puestos = []               # Puestos distintos, en orden de aparición
+        self._codigos = {}              # Puesto -> código
+        self.ultimo_id = 0              # Mayor ID pedido al servidor hasta ahora
+        self.completo = False           # True cuando ya se cargó hasta el final de la tabla
+
+    def _codigo(self, puesto):
+        codigo = self._codigos.get(puesto)
+        if codigo is None:
+            codigo = self._codigos[puesto] = len(self.puestos)
+            self.puestos.append(puesto)
+        return codigo
+
+    def _columnas(self, registro):
+        # Valores de cada columna para un registro, en el orden de _COLUMNAS.
+        # El texto se añade al final del búfer; lo que sustituye se cuenta como basura.
+        fecha = registro['fecha_ingreso']
+        if not isinstance(fecha, date):
+            fecha = date.fromisoformat(str(fecha))
+        version = registro.get('version')
+        texto = f"{registro['nombre']}\x1f{registro['apellido']}".encode("utf-8")
+        inicio = len(self.textos)
+        self.textos += texto
+        return (registro['id'], float(registro['salario']), fecha.toordinal(), self._codigo(registro['puesto']),
+                -1 if version is None else version, inicio, len(texto))
+
+    _COLUMNAS = ("ids", "salarios", "fechas", "codigos", "versiones", "inicios", "longitudes")
+
+    def observar(self, metodo):
+        """Registra un método para que se le avise de cada cambio. La referencia es débil: si el
+        objeto deja de usarse, se da de baja solo sin que haga falta desregistrarlo."""
+        self.observadores.append(weakref.WeakMethod(metodo))
 
-def obtener_conexion():#Establece y devuelve una conexión a la base de datos MySQL.
-    #Si la conexión falla, imprime un error y muestra un cuadro de mensaje.
-    try:
-        conexion = mysql.connector.connect(**DB_CONFIG)
-        return conexion
-    except mysql.connector.Error as err:
-        print(f"Error al obtener la conexión: {err}")
-        messagebox.showerror("Error de Conexión", f"No se pudo conectar a la base de datos: {err}\n"
-                                                    "Asegúrate de que MySQL esté corriendo y las credenciales sean correctas.")
+    def _avisar(self, cambio, indice):
+        vivos = []
+        for referencia in self.observadores:
+            observador = referencia()
+            if observador is not None:
+                observador(cambio, indice)
+                vivos.append(referencia)
+        self.observadores = vivos
+
+    def _descartar_texto(self, indice):
+        # Marca como basura el texto de una fila y compacta el búfer cuando la basura supera la mitad
+        descartado = self.longitudes[indice]
+        self._basura += descartado
+        if self._basura * 2 <= len(self.textos):
+            return
+        textos, inicios = bytearray(), array('Q')
+        for inicio, longitud in zip(self.inicios, self.longitudes):
+            inicios.append(len(textos))
+            textos += self.textos[inicio:inicio + longitud]
+        # La fila descartada todavía se copia (quien llama la sustituye o la quita después): sigue siendo basura
+        self.textos, self.inicios, self._basura = textos, inicios, descartado
+
+    def agregar_pagina(self, filas):
+        """Añade una página traída con paginación por clave (IDs mayores que `ultimo_id`)."""
+        self.generacion += 1
+        primera = len(self.ids)
+        columnas = [getattr(self, nombre) for nombre in self._COLUMNAS]
+        for fila in filas:
+            for columna, valor in zip(columnas, self._columnas(fila)):
+                columna.append(valor)
+        if filas:
+            self.ultimo_id = filas[-1]['id']
+        self._avisar("pagina", primera)
+
+    def en(self, indice):
+        """Devuelve el registro que ocupa la posición `indice` de la lista."""
+        version = self.versiones[indice]
+        inicio = self.inicios[indice]
+        nombre, apellido = self.textos[inicio:inicio + self.longitudes[indice]].decode("utf-8").split("\x1f", 1)
+        return {'id': self.ids[indice], 'nombre': nombre, 'apellido': apellido,
+                'puesto': self.puestos[self.codigos[indice]], 'salario': self.salarios[indice],
+                'fecha_ingreso': date.fromordinal(self.fechas[indice]), 'version': None if version < 0 else version}
+
+    def obtener(self, empleado_id):
+        indice = self.indice_de(empleado_id)
+        return None if indice is None else self.en(indice)
+
+    def columna_texto(self, campo):
+        """Devuelve los valores de 'nombre' o 'apellido' de todas las filas, en orden de ID."""
+        parte = 0 if campo == 'nombre' else 1
+        textos = self.textos
+        return [textos[inicio:inicio + longitud].decode("utf-8").split("\x1f", 1)[parte]
+                for inicio, longitud in zip(self.inicios, self.longitudes)]
+
+    def indice_de(self, empleado_id):
+        """Devuelve la posición del empleado en la lista, o None si no está cargado."""
+        indice = bisect.bisect_left(self.ids, empleado_id)
+        if indice < len(self.ids) and self.ids[indice] == empleado_id:
+            return indice
         return None
 
+    def insertar(self, registro):
+        """
+        Incorpora un empleado recién creado.
+
+        Returns:
+            int o None: La posición que ocupa, o None si cae más allá de lo cargado
+            (llegará con la página correspondiente).
+        """
+        empleado_id = registro['id']
+        if empleado_id > self.ultimo_id and not self.completo:
+            return None
+        indice = bisect.bisect_left(self.ids, empleado_id)
+        self.generacion += 1
+        for nombre, valor in zip(self._COLUMNAS, self._columnas(registro)):
+            getattr(self, nombre).insert(indice, valor)
+        self.ultimo_id = max(self.ultimo_id, empleado_id)
+        self._avisar("A", indice)
+        return indice
+
+    def actualizar(self, registro):
+        """Sustituye los datos de un empleado cargado. Devuelve su posición o None si no está cargado."""
+        indice = self.indice_de(registro['id'])
+        if indice is not None:
+            self.generacion += 1
+            # Primero se descarta el texto anterior: si eso compacta el búfer, el nuevo se añade después
+            self._descartar_texto(indice)
+            for nombre, valor in zip(self._COLUMNAS, self._columnas(registro)):
+                getattr(self, nombre)[indice] = valor
+            self._avisar("M", indice)
+        return indice
+
+    def eliminar(self, empleado_id):
+        """Quita a un empleado. Devuelve la posición que ocupaba o None si no estaba cargado."""
+        indice = self.indice_de(empleado_id)
+        if indice is not None:
+            self.generacion += 1
+            self._descartar_texto(indice)
+            for nombre in self._COLUMNAS:
+                del getattr(self, nombre)[indice]
+            self._avisar("B", indice)
+        return indice
+
+
+# Copia local de la lista de empleados
+# La ventana principal se dibuja al instante desde esta copia y después pide al servidor solo los
+# cambios posteriores a su marca de sincronización. RRHH_SIN_INSTANTANEA=1 la desactiva.
+INSTANTANEA_ACTIVA = os.environ.get("RRHH_SIN_INSTANTANEA") != "1"
+INSTANTANEA_TANDA = 5000  # Filas que se pasan de la copia a la lista en cada tanda
+ESQUEMA_INSTANTANEA = """
+CREATE TABLE IF NOT EXISTS empleados (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    apellido TEXT NOT NULL,
+    puesto TEXT NOT NULL,
+    salario REAL NOT NULL,
+    fecha_ingreso DATE NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS estado (
+    clave TEXT PRIMARY KEY,
+    valor
+);
+"""
+
+
+def ruta_local(prefijo):#Devuelve un archivo local de CACHE_DIR propio de la base de datos de origen.
+    origen = f"prueba_{os.path.abspath(BD_PRUEBA)}" if MODO_PRUEBA else f"{DB_CONFIG['host']}_{DB_CONFIG['database']}"
+    return os.path.join(CACHE_DIR, f"{prefijo}_" + "".join(c if c.isalnum() else "_" for c in origen) + ".db")
+
+def ruta_instantanea():#Devuelve el archivo de la copia local, uno por cada base de datos de origen.
+    return ruta_local("empleados")
+
+
+class InstantaneaLocal:
+    """
+    Copia en disco (SQLite) de los empleados cargados en la lista y de la marca de sincronización
+    hasta la que están al día.
+
+    Guarda lo mismo que ModeloEmpleados: un prefijo de la tabla por orden de ID hasta `ultimo_id`
+    (o la tabla entera si `completo`). Se puede usar desde cualquier hilo; las escrituras se serializan.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._bloqueo = threading.Lock()
+        self._conexion = None
+
+    def _abrir(self):
+        if self._conexion is None:
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            self._conexion = sqlite3.connect(self.ruta, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("PRAGMA synchronous=NORMAL")
+            self._conexion.executescript(ESQUEMA_INSTANTANEA)
+        return self._conexion
+
+    def cargar(self, cantidad):
+        """
+        Lee el estado de la copia y sus primeras `cantidad` filas; el resto se pide con leer().
+
+        Returns:
+            dict o None: {"marca", "ultimo_id", "completo", "total", "filas"}, o None si no hay
+            copia utilizable (nunca se guardó o el archivo está dañado, en cuyo caso se descarta).
+        """
+        with self._bloqueo:
+            try:
+                conexion = self._abrir()
+                estado = dict(conexion.execute("SELECT clave, valor FROM estado"))
+                if "marca" not in estado:
+                    return None
+                filas = self._leer(conexion, 0, cantidad)
+            except sqlite3.DatabaseError as e:
+                print(f"Se descarta la copia local de empleados: {e}")
+                self._descartar()
+                return None
+        return {"marca": estado["marca"], "ultimo_id": estado["ultimo_id"], "completo": bool(estado["completo"]),
+                "total": estado["total"], "filas": filas}
+
+    def leer(self, ultimo_id, cantidad):
+        """Devuelve hasta `cantidad` filas guardadas con ID mayor que `ultimo_id`, en orden de ID."""
+        with self._bloqueo:
+            return self._leer(self._abrir(), ultimo_id, cantidad)
+
+    def _leer(self, conexion, ultimo_id, cantidad):
+        cursor = conexion.execute("SELECT id, nombre, apellido, puesto, salario, fecha_ingreso, version "
+                                  "FROM empleados WHERE id > ? ORDER BY id LIMIT ?", (ultimo_id, cantidad))
+        columnas = [col[0] for col in cursor.description]
+        filas = [dict(zip(columnas, fila)) for fila in cursor]
+        for fila in filas:
+            if fila['version'] < 0:
+                fila['version'] = None
+        return filas
+
+    def guardar(self, cambios, marca, ultimo_id, completo, total, reiniciar=False):
+        """
+        Escribe en una sola transacción las filas que cambiaron y el estado de la lista.
+
+        Args:
+            cambios (dict): ID -> registro, o None si el empleado ya no está en la lista.
+            marca (int): Marca de sincronización que corresponde a estos datos.
+            reiniciar (bool): Si es True se borra antes todo lo guardado (la lista se recargó desde cero).
+        """
+        with self._bloqueo:
+            conexion = self._abrir()
+            with conexion:
+                if reiniciar:
+                    conexion.execute("DELETE FROM empleados")
+                conexion.executemany(
+                    "INSERT OR REPLACE INTO empleados (id, nombre, apellido, puesto, salario, fecha_ingreso, version) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    # -1 si no se conoce la versión (como en ModeloEmpleados); al leer vuelve a ser None
+                    [(r['id'], r['nombre'], r['apellido'], r['puesto'], float(r['salario']), r['fecha_ingreso'],
+                      -1 if r.get('version') is None else r['version'])
+                     for r in cambios.values() if r is not None])
+                conexion.executemany("DELETE FROM empleados WHERE id = ?",
+                                     [(empleado_id,) for empleado_id, r in cambios.items() if r is None])
+                conexion.executemany("INSERT OR REPLACE INTO estado (clave, valor) VALUES (?, ?)",
+                                     [("marca", marca), ("ultimo_id", ultimo_id), ("completo", int(completo)), ("total", total)])
+
+    def _descartar(self):
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+        for sufijo in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.ruta + sufijo)
+            except OSError:
+                pass
+
+    def cerrar(self):
+        with self._bloqueo:
+            if self._conexion is not None:
+                self._conexion.close()
+                self._conexion = None
+
+
+# Diario de escrituras pendientes
+# Las altas, modificaciones y bajas que no se pueden enviar al servidor (sin conexión) se guardan
+# en un archivo SQLite local y se aplican en la lista al momento; un reproductor en segundo plano
+# las envía por lotes, cada lote en una sola transacción, cuando vuelve la conexión.
+# Con RRHH_ESCRITURA_DIFERIDA=1 todas las escrituras pasan por el diario aunque haya conexión.
+DIARIO_CONFIG = {
+    "siempre": os.environ.get("RRHH_ESCRITURA_DIFERIDA") == "1",
+    "lote": 200,      # Escrituras que se envían en cada transacción
+    "retardo": 500    # Milisegundos que se espera tras una escritura para agruparla con las siguientes
+}
+ESQUEMA_DIARIO = """
+CREATE TABLE IF NOT EXISTS pendientes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    operacion TEXT NOT NULL,
+    empleado_id INTEGER NOT NULL,
+    datos TEXT,
+    version INTEGER,
+    momento TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS equivalencias (
+    temporal INTEGER PRIMARY KEY,
+    asignado INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rechazadas (
+    seq INTEGER PRIMARY KEY,
+    operacion TEXT NOT NULL,
+    empleado_id INTEGER NOT NULL,
+    datos TEXT,
+    motivo TEXT NOT NULL,
+    momento TEXT NOT NULL
+);
+"""
+
+
+class DiarioEscrituras:
+    """
+    Cola persistente de escrituras pendientes de enviar al servidor, en orden de llegada.
+
+    Las altas reciben un ID temporal negativo (-seq) hasta que el servidor les asigna uno; las
+    escrituras posteriores sobre ese empleado se traducen al ID asignado en cuanto se conoce.
+    Se puede usar desde cualquier hilo. Una escritura puede llegar a enviarse dos veces si la
+    aplicación se cierra justo entre el commit en el servidor y el borrado en el diario.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._bloqueo = threading.Lock()
+        self._conexion = None
+
+    def _abrir(self):
+        if self._conexion is None:
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.executescript(ESQUEMA_DIARIO)
+        return self._conexion
+
+    def anotar(self, operacion, empleado_id, datos=None, version=None):
+        """
+        Añade una escritura al final del diario y la deja en disco antes de volver.
+
+        Returns:
+            int: El ID con el que quedó anotada: el temporal de un alta, o el asignado por el servidor
+            si `empleado_id` era un temporal ya enviado.
+        """
+        datos_json = None
+        if datos is not None:
+            datos_json = json.dumps({**datos, 'salario': float(datos['salario']),
+                                     'fecha_ingreso': datos['fecha_ingreso'].isoformat()}, ensure_ascii=False)
+        with self._bloqueo:
+            conexion = self._abrir()
+            with conexion:
+                if empleado_id is not None and empleado_id < 0:
+                    fila = conexion.execute("SELECT asignado FROM equivalencias WHERE temporal = ?", (empleado_id,)).fetchone()
+                    if fila is not None:
+                        empleado_id = fila[0]
+                cursor = conexion.execute(
+                    "INSERT INTO pendientes (operacion, empleado_id, datos, version, momento) VALUES (?, ?, ?, ?, ?)",
+                    (operacion, empleado_id or 0, datos_json, version, datetime.now().isoformat(timespec="seconds")))
+                if operacion == 'A':
+                    empleado_id = -cursor.lastrowid
+                    conexion.execute("UPDATE pendientes SET empleado_id = ? WHERE seq = ?", (empleado_id, cursor.lastrowid))
+        return empleado_id
+
+    def pendientes(self, limite=-1):
+        """Devuelve las escrituras pendientes más antiguas como diccionarios (todas si no se indica límite)."""
+        with self._bloqueo:
+            filas = self._abrir().execute("SELECT seq, operacion, empleado_id, datos, version FROM pendientes "
+                                          "ORDER BY seq LIMIT ?", (limite,)).fetchall()
+        entradas = []
+        for seq, operacion, empleado_id, datos_json, version in filas:
+            datos = json.loads(datos_json) if datos_json else None
+            if datos is not None:
+                datos['fecha_ingreso'] = date.fromisoformat(datos['fecha_ingreso'])
+            entradas.append({"seq": seq, "operacion": operacion, "empleado_id": empleado_id, "datos": datos, "version": version})
+        return entradas
+
+    def __len__(self):
+        with self._bloqueo:
+            return self._abrir().execute("SELECT COUNT(*) FROM pendientes").fetchone()[0]
+
+    def reproducir(self, repositorio, lote=DIARIO_CONFIG["lote"]):
+        """
+        Envía las escrituras pendientes al servidor, `lote` por transacción, hasta vaciar el diario
+        o perder la conexión. Las aplicadas se borran del diario y las rechazadas pasan a la tabla
+        rechazadas con su motivo.
+
+        Returns:
+            dict: {"aplicadas": [...], "rechazadas": [...], "error": excepción o None}. Cada entrada es
+            la escritura del diario con "asignado" (ID definitivo) y "version", o con "motivo" y "actual".
+        """
+        resultado = {"aplicadas": [], "rechazadas": [], "error": None}
+        while True:
+            entradas = self.pendientes(lote)
+            if not entradas:
+                return resultado
+            try:
+                respuestas = repositorio.aplicar_lote([(e['operacion'], e['empleado_id'], e['datos'], e['version'])
+                                                       for e in entradas])
+            except (ErrorConexion,) + _errores_bd() as e:
+                resultado["error"] = e
+                return resultado
+
+            momento = datetime.now().isoformat(timespec="seconds")
+            with self._bloqueo:
+                conexion = self._abrir()
+                with conexion:
+                    for entrada, (aplicada, valor, extra) in zip(entradas, respuestas):
+                        conexion.execute("DELETE FROM pendientes WHERE seq = ?", (entrada['seq'],))
+                        if aplicada:
+                            resultado["aplicadas"].append({**entrada, "asignado": valor, "version": extra})
+                            if entrada['operacion'] == 'A':
+                                conexion.execute("INSERT OR REPLACE INTO equivalencias (temporal, asignado) VALUES (?, ?)",
+                                                 (entrada['empleado_id'], valor))
+                                conexion.execute("UPDATE pendientes SET empleado_id = ? WHERE empleado_id = ?",
+                                                 (valor, entrada['empleado_id']))
+                        else:
+                            resultado["rechazadas"].append({**entrada, "motivo": valor, "actual": extra})
+                            datos = entrada['datos'] and {**entrada['datos'], 'fecha_ingreso': entrada['datos']['fecha_ingreso'].isoformat()}
+                            conexion.execute("INSERT OR REPLACE INTO rechazadas (seq, operacion, empleado_id, datos, motivo, momento) "
+                                             "VALUES (?, ?, ?, ?, ?, ?)", (entrada['seq'], entrada['operacion'], entrada['empleado_id'],
+                                                                           datos and json.dumps(datos, ensure_ascii=False), valor, momento))
+
+    def cerrar(self):
+        with self._bloqueo:
+            if self._conexion is not None:
+                self._conexion.close()
+                self._conexion = None
+
+
+# Caché de registros de empleados: cuántos se guardan y cuántos segundos se consideran vigentes
+CACHE_CONFIG = {
+    "capacidad": 5000,
+    "vigencia": 120.0
+}
+
+
+class CacheLRU:
+    """
+    Caché acotada de registros de empleados, indexada por ID.
+
+    Cuando se llena descarta el registro usado hace más tiempo. Un registro deja de ser
+    válido al pasar `vigencia` segundos desde que se leyó del servidor o al invalidarse
+    tras una escritura.
+    """
+
+    def __init__(self, capacidad=5000, vigencia=120.0):
+        self.capacidad = capacidad
+        self.vigencia = vigencia
+        self._entradas = OrderedDict()   # ID -> (registro, instante de lectura)
+
+    def obtener(self, empleado_id):
+        """Devuelve el registro si está en caché y vigente; si no, None."""
+        entrada = self._entradas.get(empleado_id)
+        if entrada is None:
+            return None
+        registro, leido = entrada
+        if time.monotonic() - leido > self.vigencia:
+            del self._entradas[empleado_id]
+            return None
+        self._entradas.move_to_end(empleado_id)
+        return registro
+
+    def guardar(self, registro, leido=None):
+        """Guarda un registro recién leído del servidor."""
+        self._entradas[registro['id']] = (registro, time.monotonic() if leido is None else leido)
+        self._entradas.move_to_end(registro['id'])
+        while len(self._entradas) > self.capacidad:
+            self._entradas.popitem(last=False)
+
+    def invalidar(self, empleado_id):
+        self._entradas.pop(empleado_id, None)
+
+    def vaciar(self):
+        self._entradas.clear()
+
+
+def normalizar_texto(texto):#Pasa un texto a minúsculas y sin acentos para comparar nombres en español.
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+@lru_cache(maxsize=65536)
+def _palabras(texto):#Divide un texto normalizado en palabras (los guiones también separan).
+    #Se guarda en caché porque los nombres, apellidos y puestos se repiten mucho.
+    return tuple(normalizar_texto(texto).replace("-", " ").split())
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido en memoria para buscar empleados por nombre, apellido y puesto mientras se escribe.
+
+    Cada palabra normalizada apunta al conjunto de IDs que la contienen, y el vocabulario se
+    mantiene ordenado: las palabras que empiezan por un prefijo forman un tramo contiguo que se
+    localiza con bisect. Las palabras nuevas se acumulan y se ordenan juntas en la siguiente
+    búsqueda, para que cargar miles de filas no reordene el vocabulario en cada página.
+    """
+
+    def __init__(self):
+        self._vocabulario = []  # Palabras distintas, ordenadas
+        self._nuevas = []       # Palabras añadidas que aún no están en _vocabulario
+        self._postings = {}     # Palabra -> conjunto de IDs que la contienen
+        self._palabras = {}     # ID -> palabras con las que está indexado
+
+    def __len__(self):
+        return len(self._palabras)
+
+    def vaciar(self):
+        self._vocabulario = []
+        self._nuevas = []
+        self._postings = {}
+        self._palabras = {}
+
+    def agregar(self, registros):
+        """Indexa empleados nuevos (o vuelve a indexar los que ya estaban)."""
+        for registro in registros:
+            empleado_id = registro['id']
+            if empleado_id in self._palabras:
+                self.quitar(empleado_id)
+            palabras = tuple(set(_palabras(registro['nombre']) + _palabras(registro['apellido']) + _palabras(registro['puesto'])))
+            self._palabras[empleado_id] = palabras
+            for palabra in palabras:
+                ids = self._postings.get(palabra)
+                if ids is None:
+                    ids = self._postings[palabra] = set()
+                    self._nuevas.append(palabra)
+                ids.add(empleado_id)
+
+    def quitar(self, empleado_id):
+        """Elimina a un empleado del índice."""
+        for palabra in self._palabras.pop(empleado_id, ()):
+            ids = self._postings[palabra]
+            ids.discard(empleado_id)
+            if not ids:
+                del self._postings[palabra]
+                self._ordenar()
+                del self._vocabulario[bisect.bisect_left(self._vocabulario, palabra)]
+
+    def _ordenar(self):
+        if self._nuevas:
+            self._vocabulario.extend(self._nuevas)
+            self._nuevas = []
+            self._vocabulario.sort()
+
+    def buscar(self, consulta):
+        """
+        Devuelve, ordenados, los IDs de los empleados en los que cada palabra de la consulta
+        es el comienzo de alguna palabra de su nombre, apellido o puesto.
+        """
+        self._ordenar()
+        resultado = None
+        # Las palabras más largas son las más selectivas: se procesan primero
+        for palabra in sorted(set(_palabras(consulta)), key=len, reverse=True):
+            inicio = bisect.bisect_left(self._vocabulario, palabra)
+            fin = bisect.bisect_left(self._vocabulario, palabra + "￿", inicio)
+            ids = set()
+            for coincidencia in self._vocabulario[inicio:fin]:
+                ids.update(self._postings[coincidencia])
+            resultado = ids if resultado is None else resultado & ids
+            if not resultado:
+                return []
+        return sorted(resultado) if resultado else []
+
+
+COLUMNAS_ORDEN = {"id": "ID", "nombre": "Nombre", "apellido": "Apellido", "puesto": "Puesto",
+                  "salario": "Salario", "fecha_ingreso": "Ingreso"}
+
+class VistaOrdenada:
+    """
+    Orden por columnas y filtros sobre los empleados de un ModeloEmpleados, sin consultar al servidor.
+
+    Cada columna tiene una clave numérica precalculada (los textos se sustituyen por su rango en
+    orden alfabético sin acentos, con huecos entre rangos para poder intercalar valores nuevos) y
+    la permutación de cada orden pedido se guarda hasta que el modelo cambia, así que volver a un
+    orden ya usado solo cuesta indexar. Cuando cambia una fila solo se actualiza su posición en
+    las claves ya calculadas y se descartan las permutaciones. El orden por varias
+    columnas es estable (np.lexsort) y los empates quedan por ID. Los filtros de salario, fecha
+    de ingreso y puesto se combinan como máscaras booleanas sobre las columnas.
+    """
+
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.orden = []        # [(columna, descendente)], de la principal a la última en desempatar
+        self.filtros = {}      # 'salario': (mínimo, máximo), 'fecha_ingreso': (desde, hasta), 'puesto': texto
+        self._generacion = None
+        self._claves = {}
+        self._rangos = {}      # Columna de texto -> (valores distintos ordenados como (normalizado, valor), {valor: rango})
+        self._permutaciones = {}
+        modelo.observar(self._al_cambiar)
+
+    _HUECO = 1 << 20           # Distancia inicial entre los rangos de dos textos consecutivos
+    _ATRIBUTOS = {"id": "ids", "salario": "salarios", "fecha_ingreso": "fechas", "codigo_puesto": "codigos"}
+
+    @property
+    def activa(self):
+        return bool(self.orden or self.filtros)
+
+    def _vigente(self):
+        # Descarta las claves y permutaciones calculadas si el modelo cambió sin avisar (al vaciarse)
+        if self._generacion != self.modelo.generacion:
+            self._generacion = self.modelo.generacion
+            self._claves = {}
+            self._rangos = {}
+            self._permutaciones = {}
+
+    def _al_cambiar(self, cambio, indice):
+        # Lleva el cambio de una fila a las claves ya calculadas; las permutaciones se rehacen al pedirlas
+        self._permutaciones = {}
+        if self._generacion != self.modelo.generacion - 1:
+            return # Se perdió algún cambio: _vigente lo recalculará todo
+        self._generacion = self.modelo.generacion
+        for columna, clave in list(self._claves.items()):
+            if cambio == "B":
+                self._claves[columna] = np.delete(clave, indice)
+                continue
+            if cambio == "pagina":
+                if columna in self._ATRIBUTOS:
+                    nuevas = np.array(getattr(self.modelo, self._ATRIBUTOS[columna])[indice:], dtype=clave.dtype)
+                    self._claves[columna] = np.concatenate([clave, nuevas])
+                else:
+                    # Una página trae muchos textos nuevos: sale más a cuenta recalcular la columna
+                    del self._claves[columna]
+                    self._rangos.pop(columna, None)
+                continue
+            valor = self._clave_fila(columna, indice)
+            if valor is None:
+                del self._claves[columna] # No queda hueco para el texto nuevo: se recalcula al pedirla
+                self._rangos.pop(columna, None)
+            elif cambio == "A":
+                self._claves[columna] = np.insert(clave, indice, valor)
+            else:
+                clave[indice] = valor
+
+    def _clave_fila(self, columna, indice):
+        # Clave de una sola fila; None si es un texto nuevo que no cabe entre los rangos existentes
+        modelo = self.modelo
+        if columna in self._ATRIBUTOS:
+            return getattr(modelo, self._ATRIBUTOS[columna])[indice]
+        valor = modelo.puestos[modelo.codigos[indice]] if columna == "puesto" else modelo.en(indice)[columna]
+        ordenados, rangos = self._rangos[columna]
+        rango = rangos.get(valor)
+        if rango is None and not ordenados:
+            rango = rangos[valor] = 0
+            ordenados.append((normalizar_texto(valor), valor))
+        elif rango is None:
+            orden = (normalizar_texto(valor), valor)
+            posicion = bisect.bisect_left(ordenados, orden)
+            anterior = rangos[ordenados[posicion - 1][1]] if posicion else rangos[ordenados[0][1]] - 2 * self._HUECO
+            siguiente = rangos[ordenados[posicion][1]] if posicion < len(ordenados) else anterior + 2 * self._HUECO
+            rango = (anterior + siguiente) // 2
+            if rango in (anterior, siguiente):
+                return None
+            ordenados.insert(posicion, orden)
+            rangos[valor] = rango
+        return rango
+
+    def clave(self, columna):
+        """Devuelve la clave de orden de `columna` para todas las filas del modelo."""
+        self._vigente()
+        clave = self._claves.get(columna)
+        if clave is None:
+            clave = self._claves[columna] = self._calcular_clave(columna)
+        return clave
+
+    def _calcular_clave(self, columna):
+        modelo = self.modelo
+        if columna == "id":
+            return np.array(modelo.ids, dtype=np.int64)
+        if columna == "salario":
+            return np.array(modelo.salarios, dtype=np.float64)
+        if columna == "fecha_ingreso":
+            return np.array(modelo.fechas, dtype=np.int64)
+        if columna == "codigo_puesto":
+            return np.array(modelo.codigos, dtype=np.int64)
+        if columna == "puesto":
+            distintos, codigos = modelo.puestos, self.clave("codigo_puesto")
+        else:
+            # Se ordenan solo los valores distintos y cada fila recibe el rango del suyo
+            posiciones = {}
+            codigos = np.array([posiciones.setdefault(texto, len(posiciones)) for texto in modelo.columna_texto(columna)],
+                               dtype=np.int64)
+            distintos = list(posiciones)
+        ordenados = sorted((normalizar_texto(texto), texto) for texto in distintos)
+        rango_de = {texto: posicion * self._HUECO for posicion, (_, texto) in enumerate(ordenados)}
+        self._rangos[columna] = (ordenados, rango_de)
+        rangos = np.array([rango_de[texto] for texto in distintos], dtype=np.int64)
+        return rangos[codigos] if len(codigos) else codigos
+
+    def _permutacion(self):
+        self._vigente()
+        orden = tuple(self.orden)
+        permutacion = self._permutaciones.get(orden)
+        if permutacion is None:
+            # np.lexsort ordena por la última clave: se le pasan al revés
+            claves = [-self.clave(columna) if descendente else self.clave(columna) for columna, descendente in reversed(orden)]
+            permutacion = self._permutaciones[orden] = np.lexsort(claves) if len(claves) > 1 else np.argsort(claves[0], kind="stable")
+        return permutacion
+
+    def _mascara(self):
+        mascara = np.ones(len(self.modelo), dtype=bool)
+        minimo, maximo = self.filtros.get("salario", (None, None))
+        if minimo is not None:
+            mascara &= self.clave("salario") >= minimo
+        if maximo is not None:
+            mascara &= self.clave("salario") <= maximo
+        desde, hasta = self.filtros.get("fecha_ingreso", (None, None))
+        if desde is not None:
+            mascara &= self.clave("fecha_ingreso") >= desde.toordinal()
+        if hasta is not None:
+            mascara &= self.clave("fecha_ingreso") <= hasta.toordinal()
+        puesto = self.filtros.get("puesto")
+        if puesto is not None:
+            # Se compara sin mayúsculas ni acentos, como la búsqueda
+            puesto = normalizar_texto(puesto)
+            codigos = [codigo for codigo, texto in enumerate(self.modelo.puestos) if normalizar_texto(texto) == puesto]
+            mascara &= np.isin(self.clave("codigo_puesto"), codigos)
+        return mascara
+
+    def ids(self, seleccion=None):
+        """
+        Devuelve los IDs de las filas que pasan los filtros, en el orden de la vista.
+
+        Args:
+            seleccion (list, optional): Si se indica (por ejemplo, los resultados de una búsqueda),
+                solo se consideran esos IDs.
+        """
+        self._vigente()
+        ids = self.clave("id")
+        mascara = self._mascara() if self.filtros else None
+        if seleccion is not None:
+            seleccion = np.asarray(seleccion, dtype=np.int64)
+            posiciones = np.searchsorted(ids, seleccion)
+            dentro = posiciones < len(ids)
+            posiciones, seleccion = posiciones[dentro], seleccion[dentro]
+            en_seleccion = np.zeros(len(ids), dtype=bool)
+            en_seleccion[posiciones[ids[posiciones] == seleccion]] = True
+            mascara = en_seleccion if mascara is None else mascara & en_seleccion
+        if self.orden:
+            posiciones = self._permutacion()
+            if mascara is not None:
+                posiciones = posiciones[mascara[posiciones]]
+        else:
+            posiciones = np.flatnonzero(mascara) if mascara is not None else np.arange(len(ids))
+        return ids[posiciones].tolist()
+
+
+class ListaVirtual:
+    """
+    Listbox virtual: solo contiene las filas que caben en pantalla.
+
+    La lista completa puede tener cientos de miles de filas; el Listbox nunca guarda más de
+    `visibles` elementos y se redibuja al desplazarse. Las filas se piden al propietario con
+    `texto_fila(indice)` y, cuando el usuario se acerca al final de lo cargado, se avisa con
+    `al_necesitar_filas(hasta)` para que traiga la siguiente página antes de que haga falta.
+    `al_seleccionar(event)` se llama cuando el usuario selecciona una fila.
+    """
+
+    def __init__(self, master, texto_fila, al_necesitar_filas, al_seleccionar, margen=TAMANO_PAGINA, **opciones):
+        self._texto_fila = texto_fila
+        self._al_necesitar_filas = al_necesitar_filas
+        self._al_seleccionar = al_seleccionar
+        self.margen = margen     # Filas de antelación con las que se pide la siguiente página
+        self.total = 0           # Filas que tiene la lista completa (cargadas o no)
+        self.cargadas = 0        # Filas disponibles en memoria
+        self.inicio = 0          # Índice absoluto de la primera fila visible
+        self.visibles = 1        # Filas que caben en el Listbox
+        self.seleccion = None    # Índice absoluto de la fila seleccionada
+
+        self.lista = tk.Listbox(master, exportselection=False, **opciones)
+        self.lista.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # La barra de desplazamiento representa la lista completa, no los elementos del Listbox
+        self.scrollbar = tk.Scrollbar(master, orient="vertical", command=self._desplazar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self._alto_linea = tkfont.Font(font=self.lista.cget("font")).metrics("linespace")
+        self.lista.bind("<Configure>", self._recalcular_visibles)
+        self.lista.bind("<<ListboxSelect>>", self._registrar_seleccion)
+        self.lista.bind("<MouseWheel>", lambda event: self._rueda(-1 if event.delta > 0 else 1))
+        self.lista.bind("<Button-4>", lambda event: self._rueda(-1))
+        self.lista.bind("<Button-5>", lambda event: self._rueda(1))
+        self.lista.bind("<Up>", lambda event: self._mover_seleccion(-1))
+        self.lista.bind("<Down>", lambda event: self._mover_seleccion(1))
+        self.lista.bind("<Prior>", lambda event: self._mover_seleccion(-self.visibles))
+        self.lista.bind("<Next>", lambda event: self._mover_seleccion(self.visibles))
+
+    def actualizar(self, total, cargadas):
+        """Informa de cuántas filas hay en total y cuántas están ya en memoria, y redibuja."""
+        self.total = total
+        self.cargadas = cargadas
+        if self.seleccion is not None and self.seleccion >= total:
+            self.seleccion = None
+        self._ir_a(self.inicio)
+
+    def reiniciar(self):
+        """Vuelve al principio de la lista y olvida la selección."""
+        self.inicio = 0
+        self.seleccion = None
+        self.actualizar(0, 0)
+
+    def deseleccionar(self):
+        self.seleccion = None
+        self.lista.selection_clear(0, tk.END)
+
+    def refrescar_fila(self, indice):
+        """Vuelve a escribir una sola línea del Listbox si la fila está a la vista."""
+        if not (self.inicio <= indice < min(self.inicio + self.visibles, self.cargadas)):
+            return
+        posicion = indice - self.inicio
+        self.lista.delete(posicion)
+        self.lista.insert(posicion, self._texto_fila(indice))
+        if self.seleccion == indice:
+            self.lista.selection_set(posicion)
+
+    def fila_insertada(self, indice):
+        """
+        Registra una fila nueva en la posición `indice` (None si no está cargada todavía).
+        Solo se redibuja si la fila cae dentro de la parte visible.
+        """
+        self.total += 1
+        if indice is None:
+            self._actualizar_barra()
+            return
+        self.cargadas += 1
+        if self.seleccion is not None and indice <= self.seleccion:
+            self.seleccion += 1
+        if indice < self.inicio:
+            # Mantiene a la vista las mismas filas que antes
+            self.inicio += 1
+            self._actualizar_barra()
+        elif indice < self.inicio + self.visibles:
+            self._dibujar()
+        else:
+            self._actualizar_barra()
+
+    def fila_eliminada(self, indice):
+        """Registra que desapareció la fila de la posición `indice` (None si no estaba cargada)."""
+        self.total = max(0, self.total - 1)
+        if indice is None:
+            self._actualizar_barra()
+            return
+        self.cargadas -= 1
+        if self.seleccion is not None:
+            if self.seleccion == indice:
+                self.seleccion = None
+            elif indice < self.seleccion:
+                self.seleccion -= 1
+        if indice < self.inicio:
+            self.inicio -= 1
+            self._actualizar_barra()
+        elif indice < self.inicio + self.visibles:
+            self._ir_a(self.inicio)
+        else:
+            self._actualizar_barra()
+
+    def _actualizar_barra(self):
+        if self.total:
+            self.scrollbar.set(self.inicio / self.total, min(self.inicio + self.visibles, self.total) / self.total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _recalcular_visibles(self, event=None):
+        bordes = 2 * (int(self.lista.cget("borderwidth")) + int(self.lista.cget("highlightthickness")))
+        visibles = max(1, (self.lista.winfo_height() - bordes) // self._alto_linea)
+        if visibles != self.visibles:
+            self.visibles = visibles
+            self._ir_a(self.inicio)
+
+    def _ir_a(self, inicio):
+        self.inicio = max(0, min(inicio, self.total - self.visibles))
+        self._dibujar()
+
+    def _dibujar(self):
+        fin = min(self.inicio + self.visibles, self.total)
+        with METRICAS.operacion("dibujar_lista"):
+            with METRICAS.fase("formatear"):
+                textos = [self._texto_fila(i) if i < self.cargadas else "Cargando..." for i in range(self.inicio, fin)]
+            with METRICAS.fase("insertar_tk"):
+                self.lista.delete(0, tk.END)
+                if textos:
+                    self.lista.insert(0, *textos)
+        if self.seleccion is not None and self.inicio <= self.seleccion < fin:
+            self.lista.selection_set(self.seleccion - self.inicio)
+            self.lista.activate(self.seleccion - self.inicio)
+
+        self._actualizar_barra()
+
+        # Pide la siguiente página con antelación para que al desplazarse ya esté cargada
+        if self.cargadas < self.total and fin + self.margen > self.cargadas:
+            self.lista.after_idle(self._al_necesitar_filas, fin + self.margen)
+
+    def _desplazar(self, accion, cantidad, unidad=None):
+        if accion == "moveto":
+            self._ir_a(int(float(cantidad) * self.total))
+        elif accion == "scroll":
+            paso = self.visibles if unidad == "pages" else 1
+            self._ir_a(self.inicio + int(cantidad) * paso)
+
+    def _rueda(self, sentido):
+        self._ir_a(self.inicio + sentido * 3)
+        return "break"
+
+    def _registrar_seleccion(self, event=None):
+        seleccion = self.lista.curselection()
+        if seleccion:
+            indice = self.inicio + seleccion[0]
+            if indice >= self.cargadas:
+                # Las filas que aún se están cargando no se pueden seleccionar
+                self.lista.selection_clear(0, tk.END)
+                return
+            self.seleccion = indice
+        else:
+            self.seleccion = None
+        self._al_seleccionar(event)
+
+    def _mover_seleccion(self, paso):
+        if self.cargadas == 0:
+            return "break"
+        actual = self.seleccion if self.seleccion is not None else self.inicio - 1
+        nueva = max(0, min(actual + paso, self.cargadas - 1))
+        if nueva < self.inicio:
+            self._ir_a(nueva)
+        elif nueva >= self.inicio + self.visibles:
+            self._ir_a(nueva - self.visibles + 1)
+        self.lista.selection_clear(0, tk.END)
+        self.lista.selection_set(nueva - self.inicio)
+        self.lista.activate(nueva - self.inicio)
+        self.lista.event_generate("<<ListboxSelect>>")
+        return "break"
+
+
 class LoginApp:#Gestiona la interfaz de inicio de sesión del usuario y la autenticación.
     def __init__(self, master):#Inicializa la aplicación de inicio de sesión (LoginApp).
 
@@ -48,38 +2801,14 @@ class LoginApp:#Gestiona la interfaz de inicio de sesión del usuario y la auten
         main_frame = tk.Frame(master, padx=20, pady=20)
         main_frame.pack(expand=True)
 
+        # El logo nunca retrasa la ventana: se muestra la copia en disco si existe (o el texto
+        # de respaldo) y en segundo plano se comprueba si hay una versión nueva en el servidor.
         self.tk_logo_image = None
-        # Intenta cargar la imagen del logo desde la URL
-        try:
-            with urllib.request.urlopen(IMAGE_URL) as u:
-                raw_data = u.read()
-
-            original_image = Image.open(io.BytesIO(raw_data))
-
-            width = 150
-            height = int(original_image.height * (width / original_image.width))
-            resized_image = original_image.resize((width, height), Image.Resampling.LANCZOS)
-
-            self.tk_logo_image = ImageTk.PhotoImage(resized_image)
-
-            self.logo_label = tk.Label(main_frame, image=self.tk_logo_image)
-            self.logo_label.pack(pady=(0, 10))
-
-        except urllib.error.URLError as e:
-            # Maneja errores de red o URLs inválidas al obtener la imagen
-            messagebox.showwarning("Error de Conexión", f"No se pudo cargar la imagen desde la URL. Problema de red o URL inválida: {e.reason}\nSe usará texto en su lugar.")
-            self.logo_label = tk.Label(main_frame, text="RRHH Corporation", font=("Segoe UI", 18, "bold"), fg="#000000")
-            self.logo_label.pack(pady=(0, 10))
-        except IOError as e:
-            # Maneja errores durante el procesamiento de la imagen (por ejemplo, datos de imagen corruptos)
-            messagebox.showwarning("Error de Imagen", f"No se pudo procesar la imagen de la URL: {e}\nSe usará texto en su lugar.")
-            self.logo_label = tk.Label(main_frame, text="RRHH Corporation", font=("Segoe UI", 18, "bold"), fg="#000000")
-            self.logo_label.pack(pady=(0, 10))
-        except Exception as e:
-            # Captura cualquier otro error inesperado durante la carga de la imagen
-            messagebox.showerror("Error Inesperado", f"Ocurrió un error inesperado al cargar la imagen: {e}\nSe usará texto en su lugar.")
-            self.logo_label = tk.Label(main_frame, text="RRHH Corporation", font=("Segoe UI", 18, "bold"), fg="#000000")
-            self.logo_label.pack(pady=(0, 10))
+        self.logo_label = tk.Label(main_frame, text="RRHH Corporation", font=("Segoe UI", 18, "bold"), fg="#000000")
+        self.logo_label.pack(pady=(0, 10))
+        png, meta_logo = leer_logo_cache()
+        if png is not None:
+            self.mostrar_logo(png)
 
         # Etiqueta de título para la pantalla de inicio de sesión
         self.title_label = tk.Label(main_frame, text="Bienvenido", font=("Segoe UI", 20, "bold"))
@@ -114,6 +2843,34 @@ class LoginApp:#Gestiona la interfaz de inicio de sesión del usuario y la auten
         # Vincula la tecla Enter al intento de inicio de sesión
         master.bind('<Return>', lambda event=None: self.attempt_login())
 
+        # Ejecuta la consulta de credenciales fuera del hilo de Tk; el cursor de espera indica que está en curso
+        self.ejecutor = EjecutorFondo(master, al_cambiar_ocupado=lambda ocupado: master.config(cursor="watch" if ocupado else ""))
+
+        # Revalida el logo en segundo plano; si falla se queda la copia en caché o el texto, sin avisos
+        self.ejecutor.enviar(revalidar_logo, meta_logo, al_terminar=self.mostrar_logo,
+                             al_fallar=lambda e: print(f"No se pudo actualizar el logo: {e}"))
+
+        # Mientras el usuario escribe se importa el conector y se abre la primera conexión del pool,
+        # que luego reutilizan la consulta de credenciales y la primera carga de la lista
+        self.conexion_lista = None  # Instante (perf_counter) en que quedó lista, para --medir-arranque
+        self.ejecutor.enviar(precalentar_conexion, al_terminar=self._conexion_precalentada, ocupa=False,
+                             al_fallar=lambda e: print(f"No se pudo abrir la conexión por adelantado: {e}"))
+
+    def _conexion_precalentada(self, resultado):
+        self.conexion_lista = time.perf_counter()
+
+    def mostrar_logo(self, png):#Sustituye el texto de respaldo por el logo a partir de los bytes del PNG.
+        #Si png es None (el logo no cambió) deja lo que ya se muestra.
+        if png is None:
+            return
+        try:
+            self.tk_logo_image = tk.PhotoImage(data=png)
+        except tk.TclError as e:
+            # Maneja datos de imagen corruptos: se mantiene lo que se mostraba
+            print(f"No se pudo mostrar el logo: {e}")
+            return
+        self.logo_label.config(image=self.tk_logo_image, text="")
+
     def center_window(self, window):#Centra la ventana de Tkinter dada en la pantalla.
 
         #Args:
@@ -167,37 +2924,31 @@ class LoginApp:#Gestiona la interfaz de inicio de sesión del usuario y la auten
             messagebox.showwarning("Campos Vacíos", "Por favor, ingrese su contraseña.")
             return
 
-        conexion = obtener_conexion()
-        if conexion is None:
-            return # Sale si la conexión a la base de datos falló
+        # La consulta va en segundo plano; mientras tanto se bloquea el botón para no repetirla
+        self.login_button.config(state='disabled')
+        self.ejecutor.enviar(AUTENTICACION.autenticar, username, password, al_terminar=self._verificar_credenciales,
+                             al_fallar=self._fallo_login)
 
-        cursor = None
-        user_info = None
-        try:
-            cursor = conexion.cursor(dictionary=True) # El cursor devuelve filas como diccionarios
-            sql = "SELECT id, nombre, apellido, puesto, salario, fecha_ingreso, username, password FROM empleados WHERE username = %s"
-            cursor.execute(sql, (username,)) # Ahora pasamos 'username' al execute
-            user_info = cursor.fetchone() # Obtiene una sola fila
-
-            # Comprueba si el usuario existe y si la contraseña coincide
-            if user_info and user_info['password'] == password: # Usa la columna 'password' de la DB
-                full_name_for_welcome = f"{user_info['nombre']} {user_info['apellido']}" if 'apellido' in user_info else user_info['nombre']
-                messagebox.showinfo("Bienvenido", f"¡Bienvenido, {full_name_for_welcome}!")
-                self.master.destroy()  # Cierra la ventana de inicio de sesión
-                root_main = tk.Tk()    # Crea una nueva raíz de Tkinter para la aplicación principal
-                MainApp(root_main, full_name_for_welcome) # Inicializa MainApp con el nombre adecuado
-                root_main.mainloop()   # Inicia el bucle de eventos de la aplicación principal
-            else:
-                messagebox.showerror("Error de Credenciales", "Nombre de usuario o contraseña incorrectos.")
+    def _fallo_login(self, error):#Muestra el error de la consulta de credenciales y reactiva el botón.
+        self.login_button.config(state='normal')
+        if isinstance(error, AccesoBloqueadoError):
+            messagebox.showwarning("Demasiados Intentos", f"Demasiados intentos fallidos. Espere {error.segundos:.0f} segundos "
+                                   "antes de volver a intentarlo.")
+            return
+        mostrar_error_bd("Error de Base de Datos", error, "Ocurrió un error al verificar credenciales")
 
-        except Exception as e:
-            messagebox.showerror("Error de Base de Datos", f"Ocurrió un error al verificar credenciales: {e}")
-        finally:
-            # Cierra el cursor y la conexión
-            if cursor:
-                cursor.close()
-            if conexion and conexion.is_connected():
-                conexion.close()
+    def _verificar_credenciales(self, user_info):#Si las credenciales fueron válidas, abre la aplicación principal.
+        self.login_button.config(state='normal')
+        if user_info:
+            full_name_for_welcome = f"{user_info['nombre']} {user_info['apellido']}" if 'apellido' in user_info else user_info['nombre']
+            messagebox.showinfo("Bienvenido", f"¡Bienvenido, {full_name_for_welcome}!")
+            self.ejecutor.cerrar()
+            self.master.destroy()  # Cierra la ventana de inicio de sesión
+            root_main = tk.Tk()    # Crea una nueva raíz de Tkinter para la aplicación principal
+            MainApp(root_main, full_name_for_welcome) # Inicializa MainApp con el nombre adecuado
+            root_main.mainloop()   # Inicia el bucle de eventos de la aplicación principal
+        else:
+            messagebox.showerror("Error de Credenciales", "Nombre de usuario o contraseña incorrectos.")
 
 
 class MainApp:#Representa la aplicación principal para la gestión de Recursos Humanos.
@@ -215,26 +2966,101 @@ class MainApp:#Representa la aplicación principal para la gestión de Recursos
         master.geometry("900x700")
         self.user_full_name = user_full_name
         self.selected_empleado_id = None  # Almacena el ID del empleado actualmente seleccionado
+        self.selected_version = None      # Versión del empleado seleccionado, para detectar ediciones simultáneas
+        self.modelo = ModeloEmpleados()  # Empleados ya traídos del servidor, indexados por ID
+        self.total_empleados = 0         # Total de empleados según el servidor
+        self.cache = CacheLRU(**CACHE_CONFIG)  # Registros leídos recientemente, para seleccionar sin consultar
+        self._cargando_paginas = False   # True mientras hay una petición de páginas en curso
+        self._paginas_pedidas = 0        # Mayor número de filas que ha pedido la lista
+        self.indice_busqueda = IndiceBusqueda()  # Búsqueda por nombre, apellido y puesto sobre las filas cargadas
+        self.resultados = None           # IDs que se muestran al buscar, ordenar o filtrar, o None si se muestra la lista tal cual
+        self.vista = VistaOrdenada(self.modelo)  # Orden por columnas y filtros sobre las filas cargadas
+        self._en_tanda = False           # True mientras se aplica una tanda de cambios; los resultados se recalculan al final
+        self.analitica = None            # AnaliticaNomina, se carga la primera vez que se abre el panel
+        self.ventana_analitica = None    # Ventana del panel de nómina, si está abierta
+        self._analitica_pendiente = False  # True si ya hay un refresco del panel programado
+        self.marca_sincronizacion = None   # Último cambio del servidor ya incorporado a la lista
+        self._sincronizacion_id = None     # Próxima sincronización programada con master.after
+        # Copia local de la lista: los cambios se acumulan aquí y se escriben en cada sincronización
+        self.instantanea = InstantaneaLocal(ruta_instantanea()) if INSTANTANEA_ACTIVA else None
+        self._por_guardar = {}             # ID -> registro (o None si salió de la lista) aún no escrito
+        self._reiniciar_instantanea = False  # True si la lista se recargó desde cero desde la última escritura
+        self._en_vuelo = ({}, False)       # Cambios y reinicio de la escritura en curso
+        self._guardando = False
+        self._marca_guardada = None
+        # Diario de escrituras que esperan a poder enviarse al servidor
+        self.diario = DiarioEscrituras(ruta_local("diario"))
+        self._pendientes_diario = 0        # Escrituras anotadas en el diario y aún no enviadas
+        self._ids_pendientes = set()       # Empleados con escrituras pendientes (la sincronización no los pisa)
+        self._reproduccion_id = None       # Próximo envío del diario programado con master.after
+        self._reproduciendo = False        # True mientras hay un envío del diario en curso
+        try:
+            self._pendientes_diario = len(self.diario)  # Lo que quedó de la sesión anterior va antes que lo nuevo
+        except sqlite3.Error as e:
+            print(f"No se pudo leer el diario de escrituras: {e}")
 
         # Mensaje de bienvenida para el usuario que ha iniciado sesión
         self.welcome_label = tk.Label(master, text=f"Bienvenido, {self.user_full_name}", font=("Arial", 14, "bold"), fg="#0078D4")
         self.welcome_label.pack(pady=(10, 5))
 
+        # Indicador de actividad: se muestra mientras hay consultas en segundo plano
+        self.estado_label = tk.Label(master, text="", font=("Arial", 9, "italic"), fg="#555555")
+        self.estado_label.pack()
+
+        # Aviso de cambios guardados localmente que aún no llegaron al servidor
+        self.diario_label = tk.Label(master, text="", font=("Arial", 9, "bold"), fg="#B35C00")
+        self.diario_label.pack()
+
+        # Todas las consultas se ejecutan fuera del hilo de Tk para que la ventana siga respondiendo
+        self.ejecutor = EjecutorFondo(master, al_cambiar_ocupado=self._mostrar_ocupado)
+
         # Marco para mostrar la lista de empleados
         frame_lista = tk.LabelFrame(master, text="Lista de Empleados", font=("Arial", 12, "bold"))
         frame_lista.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        # Listbox para mostrar los registros de empleados
-        self.lista = tk.Listbox(frame_lista, font=("Consolas", 10))
-        self.lista.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # Cuadro de búsqueda sobre la lista: filtra mientras se escribe, sin consultar al servidor
+        frame_busqueda = tk.Frame(frame_lista)
+        frame_busqueda.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
+        tk.Label(frame_busqueda, text="Buscar:", font=("Arial", 10)).pack(side=tk.LEFT, padx=(0, 5))
+        self.busqueda_var = tk.StringVar()
+        self.busqueda_var.trace_add("write", lambda *args: self.buscar_empleados())
+        self.entry_busqueda = tk.Entry(frame_busqueda, textvariable=self.busqueda_var, font=("Arial", 10))
+        self.entry_busqueda.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
-        # Barra de desplazamiento para el Listbox
-        self.scrollbar_lista = tk.Scrollbar(frame_lista, orient="vertical", command=self.lista.yview)
-        self.scrollbar_lista.pack(side=tk.RIGHT, fill=tk.Y)
-        self.lista.config(yscrollcommand=self.scrollbar_lista.set)
+        # Orden por columnas, también sin consultar al servidor: un clic ordena por la columna (otro
+        # clic invierte el sentido) y Mayús+clic la añade como criterio de desempate
+        frame_orden = tk.Frame(frame_lista)
+        frame_orden.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
+        tk.Label(frame_orden, text="Ordenar por:", font=("Arial", 10)).pack(side=tk.LEFT, padx=(0, 5))
+        self.botones_orden = {}
+        for columna, texto in COLUMNAS_ORDEN.items():
+            boton = tk.Button(frame_orden, text=texto, font=("Arial", 9), relief=tk.GROOVE,
+                              command=lambda columna=columna: self.ordenar_por(columna))
+            boton.bind("<Shift-Button-1>", lambda event, columna=columna: self.ordenar_por(columna, agregar=True))
+            boton.pack(side=tk.LEFT, padx=2)
+            self.botones_orden[columna] = boton
 
-        # Vincula el evento de selección del Listbox al método seleccionar_empleado
-        self.lista.bind('<<ListboxSelect>>', self.seleccionar_empleado)
+        # Filtros por rango de salario, rango de fecha de ingreso y puesto
+        frame_filtros = tk.Frame(frame_lista)
+        frame_filtros.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
+        self.filtros_entries = {}
+        for clave, texto, ancho in [("salario_min", "Salario de:", 9), ("salario_max", "a:", 9),
+                                    ("desde", "Ingreso de:", 11), ("hasta", "a:", 11), ("puesto", "Puesto:", 14)]:
+            tk.Label(frame_filtros, text=texto, font=("Arial", 10)).pack(side=tk.LEFT, padx=(5, 2))
+            entry = tk.Entry(frame_filtros, font=("Arial", 10), width=ancho)
+            entry.pack(side=tk.LEFT)
+            entry.bind("<Return>", lambda event: self.aplicar_filtros())
+            self.filtros_entries[clave] = entry
+        tk.Button(frame_filtros, text="Filtrar", font=("Arial", 9), command=self.aplicar_filtros).pack(side=tk.LEFT, padx=(8, 2))
+        tk.Button(frame_filtros, text="Quitar filtros", font=("Arial", 9), command=self.quitar_filtros).pack(side=tk.LEFT, padx=2)
+
+        # Lista virtual para mostrar los registros de empleados: solo dibuja las filas visibles
+        # y pide las páginas al servidor a medida que el usuario se desplaza.
+        # La selección de una fila llama al método seleccionar_empleado
+        self.lista_virtual = ListaVirtual(frame_lista, lambda indice: formatear_empleado(self._registro_en(indice)),
+                                          self.cargar_paginas, self.seleccionar_empleado, font=("Consolas", 10))
+        self.lista = self.lista_virtual.lista
+        self.scrollbar_lista = self.lista_virtual.scrollbar
 
         # Marco para los campos de entrada de datos del empleado
         frame_datos = tk.LabelFrame(master, text="Datos del Empleado", font=("Arial", 12, "bold"))
@@ -260,128 +3086,703 @@ class MainApp:#Representa la aplicación principal para la gestión de Recursos
                 # La clave para "Fecha Ingreso (YYYY-MM-DD):" será 'fecha_ingreso_yyyy-mm-dd'
                 self.entries[text.replace(":", "").replace(" ", "_").replace("(", "").replace(")", "").lower()] = entry
 
-        # Marco para los botones de acción
-        frame_botones = tk.Frame(master)
-        frame_botones.pack(pady=10)
+        # Marco para los botones de acción
+        frame_botones = tk.Frame(master)
+        frame_botones.pack(pady=10)
+
+        # Botones para gestionar empleados
+        self.btn_cargar = tk.Button(frame_botones, text="Cargar Empleados", font=("Arial", 10), command=self.cargar_empleados)
+        self.btn_cargar.pack(side=tk.LEFT, padx=5)
+
+        self.btn_agregar = tk.Button(frame_botones, text="Registrar Empleado", font=("Arial", 10), command=self.agregar_empleado)
+        self.btn_agregar.pack(side=tk.LEFT, padx=5)
+
+        self.btn_actualizar = tk.Button(frame_botones, text="Editar Empleado", font=("Arial", 10), command=self.actualizar_empleado)
+        self.btn_actualizar.pack(side=tk.LEFT, padx=5)
+
+        self.btn_eliminar = tk.Button(frame_botones, text="Borrar Empleado", font=("Arial", 10), command=self.eliminar_empleado)
+        self.btn_eliminar.pack(side=tk.LEFT, padx=5)
+
+        self.btn_limpiar = tk.Button(frame_botones, text="Limpiar Campos", font=("Arial", 10), command=self.limpiar_campos)
+        self.btn_limpiar.pack(side=tk.LEFT, padx=5)
+
+        self.btn_importar = tk.Button(frame_botones, text="Importar CSV", font=("Arial", 10), command=self.importar_empleados)
+        self.btn_importar.pack(side=tk.LEFT, padx=5)
+
+        self.btn_exportar = tk.Button(frame_botones, text="Exportar", font=("Arial", 10), command=self.abrir_exportacion)
+        self.btn_exportar.pack(side=tk.LEFT, padx=5)
+
+        self.btn_ajuste = tk.Button(frame_botones, text="Ajuste de Salarios", font=("Arial", 10), command=self.abrir_ajuste)
+        self.btn_ajuste.pack(side=tk.LEFT, padx=5)
+
+        self.btn_analitica = tk.Button(frame_botones, text="Análisis de Nómina", font=("Arial", 10), command=self.abrir_analitica)
+        self.btn_analitica.pack(side=tk.LEFT, padx=5)
+
+        # Panel de tiempos por operación, solo si se arrancó con RRHH_METRICAS=1
+        self.ventana_metricas = None
+        if METRICAS.activa:
+            self.btn_metricas = tk.Button(frame_botones, text="Métricas", font=("Arial", 10), command=self.abrir_metricas)
+            self.btn_metricas.pack(side=tk.LEFT, padx=5)
+
+        # Al cerrar la ventana se detienen los hilos de consulta
+        master.protocol("WM_DELETE_WINDOW", self.cerrar)
+
+        # Muestra los empleados de la copia local (o los carga del servidor si no hay copia)
+        self.restaurar_instantanea()
+
+        # A partir de ahí, los cambios de otros operadores se incorporan solos cada pocos segundos
+        self._programar_sincronizacion()
+        # y las anotaciones de cambios antiguas se borran cada hora
+        self.master.after(CAMBIOS_PODA_INTERVALO, self.podar_cambios)
+
+    def cerrar(self):#Cierra la ventana principal descartando las consultas pendientes.
+        self.ejecutor.cerrar()
+        if self.instantanea is not None:
+            if self.marca_sincronizacion is not None:
+                # Lo que quedaba por escribir se guarda ahora, sin pasar por los hilos
+                if self._reiniciar_instantanea:
+                    cambios, reiniciar = self._por_guardar, True
+                else:
+                    cambios, reiniciar = {**self._en_vuelo[0], **self._por_guardar}, self._en_vuelo[1]
+                try:
+                    self.instantanea.guardar(cambios, self.marca_sincronizacion, self.modelo.ultimo_id,
+                                             self.modelo.completo, self.total_empleados, reiniciar)
+                except sqlite3.Error as e:
+                    print(f"No se pudo guardar la copia local de empleados: {e}")
+            self.instantanea.cerrar()
+        self.diario.cerrar()
+        self.master.destroy()
+
+    def _mostrar_ocupado(self, ocupado):#Muestra u oculta el indicador de actividad mientras hay consultas en curso.
+        self.estado_label.config(text="Consultando la base de datos..." if ocupado else "")
+        self.master.config(cursor="watch" if ocupado else "")
+
+    def cargar_empleados(self):
+        """
+        Vuelve a cargar la lista de empleados desde el principio.
+        Solo se trae la primera página; el resto se pide al desplazarse por la lista.
+        La consulta se hace en segundo plano y sustituye a cualquier carga anterior aún en curso.
+        """
+        def consultar():
+            # La marca se lee antes que los datos: lo que cambie mientras tanto llegará en la próxima sincronización
+            return REPOSITORIO.marca_sincronizacion(), REPOSITORIO.contar(), REPOSITORIO.listar(0, TAMANO_PAGINA)
+
+        self._cargando_paginas = False
+        self.ejecutor.enviar(consultar, al_terminar=self._mostrar_primera_pagina,
+                             al_fallar=lambda e: mostrar_error_bd("Error al cargar empleados", e, "Ocurrió un error al cargar los datos"), clave="lista")
+
+    def _mostrar_primera_pagina(self, resultado):
+        marca, total, (filas, fin) = resultado
+        self.marca_sincronizacion = marca
+        self._por_guardar = {}
+        self._reiniciar_instantanea = True
+        self.modelo.vaciar()
+        self.cache.vaciar()
+        self.indice_busqueda.vaciar()
+        # La nómina se calculó sobre los datos anteriores a la recarga: se vuelve a leer ya si el
+        # panel está abierto, o al abrirlo
+        self.analitica = None
+        if self.ventana_analitica is not None:
+            self._cargar_analitica()
+        else:
+            self.ejecutor.cancelar("analitica") # Una lectura anterior aún en curso tampoco vale ya
+        self.total_empleados = total
+        self.lista_virtual.reiniciar()
+        self._agregar_filas(filas, fin)
+        self._reaplicar_diario()
+        if self.resultados is not None:
+            self.buscar_empleados()
+
+    def cargar_paginas(self, hasta):
+        """
+        Pide en segundo plano las páginas que faltan para tener al menos `hasta` filas en memoria.
+        Solo hay una petición de páginas en curso; si llega otra mientras tanto, se atiende al terminar.
+
+        Args:
+            hasta (int): Número de filas que deben quedar cargadas.
+        """
+        self._paginas_pedidas = max(self._paginas_pedidas, hasta)
+        if self._cargando_paginas or self.modelo.completo or len(self.modelo) >= min(hasta, self.total_empleados):
+            return
+
+        ultimo_id = self.modelo.ultimo_id
+
+        def mostrar(resultado):
+            self._cargando_paginas = False
+            if self.modelo.ultimo_id != ultimo_id:
+                return # La lista se recargó mientras tanto
+            self._agregar_filas(*resultado)
+            self.cargar_paginas(self._paginas_pedidas)
+
+        def fallar(error):
+            self._cargando_paginas = False
+            mostrar_error_bd("Error al cargar empleados", error, "Ocurrió un error al cargar los datos")
+
+        self._cargando_paginas = True
+        self.ejecutor.enviar(REPOSITORIO.listar, ultimo_id, min(hasta - len(self.modelo), CARGA_TANDA),
+                             al_terminar=mostrar, al_fallar=fallar, clave="lista")
+
+    def _agregar_filas(self, filas, fin, del_servidor=True):#Añade al modelo una tanda de filas y redibuja la lista.
+        #Las filas recién traídas del servidor van también a la caché y a la copia local.
+        self.modelo.agregar_pagina(filas)
+        self.indice_busqueda.agregar(filas)
+        if del_servidor:
+            leido = time.monotonic()
+            for fila in filas:
+                self.cache.guardar(fila, leido)
+                self._anotar_instantanea(fila['id'], fila)
+        if fin:
+            # Se llegó al final de la tabla: el total real es lo que hay cargado
+            self.modelo.completo = True
+            self.total_empleados = len(self.modelo)
+        self.total_empleados = max(self.total_empleados, len(self.modelo))
+        if self.resultados is not None:
+            self._actualizar_resultados()
+        else:
+            self.lista_virtual.actualizar(self.total_empleados, len(self.modelo))
+
+    def restaurar_instantanea(self):
+        """
+        Muestra la lista desde la copia local sin esperar al servidor. Después se reconcilia con
+        él pidiendo solo los cambios posteriores a la marca de la copia. Si no hay copia se hace
+        la carga normal desde el servidor.
+        """
+        if self.instantanea is None:
+            self.cargar_empleados()
+            return
+
+        def fallar(error):
+            print(f"No se pudo leer la copia local de empleados: {error}")
+            self.cargar_empleados()
+
+        self.ejecutor.enviar(self.instantanea.cargar, TAMANO_PAGINA, al_terminar=self._mostrar_instantanea,
+                             al_fallar=fallar, clave="lista", ocupa=False)
+
+    def _mostrar_instantanea(self, copia):
+        if copia is None:
+            self.cargar_empleados()
+            return
+        self.modelo.vaciar()
+        self.cache.vaciar()
+        self.indice_busqueda.vaciar()
+        self.total_empleados = copia['total']
+        self.lista_virtual.reiniciar()
+        # Mientras se lee el resto de la copia no se piden páginas al servidor; se atienden al terminar
+        self._cargando_paginas = True
+        self._agregar_filas(copia['filas'], False, del_servidor=False)
+        if self.resultados is not None:
+            self.buscar_empleados()
+        if len(copia['filas']) < TAMANO_PAGINA:
+            self._instantanea_absorbida(copia)
+        else:
+            self._absorber_instantanea(copia)
+
+    def _absorber_instantanea(self, copia):#Pasa a la lista el resto de la copia local por tandas, sin bloquear la ventana.
+        ultimo_id = self.modelo.ultimo_id
+
+        def mostrar(filas):
+            if self.modelo.ultimo_id != ultimo_id:
+                return # La lista se recargó mientras tanto
+            self._agregar_filas(filas, False, del_servidor=False)
+            if len(filas) < INSTANTANEA_TANDA:
+                self._instantanea_absorbida(copia)
+            else:
+                self._absorber_instantanea(copia)
+
+        def fallar(error):
+            print(f"No se pudo leer la copia local de empleados: {error}")
+            self.cargar_empleados()
+
+        self.ejecutor.enviar(self.instantanea.leer, ultimo_id, INSTANTANEA_TANDA, al_terminar=mostrar,
+                             al_fallar=fallar, clave="lista", ocupa=False)
+
+    def _instantanea_absorbida(self, copia):#Deja la lista como estaba al guardarse la copia y empieza a reconciliar.
+        self.modelo.ultimo_id = max(self.modelo.ultimo_id, copia['ultimo_id'])
+        if copia['completo']:
+            self.modelo.completo = True
+            self.total_empleados = len(self.modelo)
+        self.total_empleados = max(self.total_empleados, len(self.modelo))
+        if self.resultados is not None:
+            self._actualizar_resultados()
+        else:
+            self.lista_virtual.actualizar(self.total_empleados, len(self.modelo))
+        self.marca_sincronizacion = self._marca_guardada = copia['marca']
+        self._reaplicar_diario()
+        self._cargando_paginas = False
+        self._programar_sincronizacion(0)
+        self.cargar_paginas(self._paginas_pedidas)
+
+    def _anotar_instantanea(self, empleado_id, registro):#Apunta un cambio de la lista para la próxima escritura de la copia local.
+        #Los cambios que solo están en el diario no se guardan: la copia refleja el servidor y el diario se vuelve a aplicar al abrir.
+        if self.instantanea is not None and empleado_id > 0 and empleado_id not in self._ids_pendientes:
+            self._por_guardar[empleado_id] = registro
+
+    def guardar_instantanea(self):#Escribe en segundo plano en la copia local lo que cambió en la lista desde la última vez.
+        if self.instantanea is None or self._guardando or self.marca_sincronizacion is None:
+            return
+        if not self._por_guardar and not self._reiniciar_instantanea and self.marca_sincronizacion == self._marca_guardada:
+            return
+        cambios, reiniciar, marca = self._por_guardar, self._reiniciar_instantanea, self.marca_sincronizacion
+        self._por_guardar, self._reiniciar_instantanea = {}, False
+        self._en_vuelo = (cambios, reiniciar)
+        self._guardando = True
+
+        def terminado(resultado):
+            self._guardando = False
+            self._en_vuelo = ({}, False)
+            self._marca_guardada = marca
+
+        def fallar(error):
+            print(f"No se pudo guardar la copia local de empleados: {error}")
+            self._guardando = False
+            self._en_vuelo = ({}, False)
+            if self._reiniciar_instantanea:
+                return # Lo que no se escribió ya no cuenta: la lista se recargó después
+            self._por_guardar = {**cambios, **self._por_guardar}
+            self._reiniciar_instantanea = reiniciar
+
+        self.ejecutor.enviar(self.instantanea.guardar, cambios, marca, self.modelo.ultimo_id, self.modelo.completo,
+                             self.total_empleados, reiniciar, al_terminar=terminado, al_fallar=fallar, ocupa=False)
+
+    def _programar_sincronizacion(self, retraso=SINCRONIZACION_INTERVALO):#Programa la próxima sincronización, sustituyendo a la que hubiera.
+        if self._sincronizacion_id is not None:
+            self.master.after_cancel(self._sincronizacion_id)
+        self._sincronizacion_id = self.master.after(retraso, self.sincronizar)
+
+    def podar_cambios(self):#Borra en segundo plano las anotaciones de cambios más antiguas que la retención y se vuelve a programar.
+        self.ejecutor.enviar(REPOSITORIO.podar_cambios, ocupa=False,
+                             al_fallar=lambda error: print(f"No se pudieron podar las anotaciones de cambios: {error}"))
+        self.master.after(CAMBIOS_PODA_INTERVALO, self.podar_cambios)
+
+    def sincronizar(self):
+        """
+        Pide en segundo plano los cambios hechos desde la última marca por cualquier operador
+        y los incorpora a la lista, la búsqueda y el panel de nómina sin recargar nada.
+        Se vuelve a programar sola al terminar; los fallos no interrumpen al usuario.
+        """
+        self._sincronizacion_id = None
+        if self._pendientes_diario:
+            self.reproducir_diario() # Reintenta enviar lo que quedó pendiente
+        if self.marca_sincronizacion is None:
+            # Todavía no terminó la primera carga
+            self._programar_sincronizacion()
+            return
+
+        def terminado(resultado):
+            if resultado is None:
+                print("La marca de sincronización ya no sirve (otra base, una restauración o cambios podados); se recarga la lista.")
+                self.cargar_empleados()
+                self._programar_sincronizacion()
+                return
+            nueva_marca, cambios, total = resultado
+            self.marca_sincronizacion = max(self.marca_sincronizacion or 0, nueva_marca)
+            if cambios:
+                self._fusionar_cambios(cambios, total)
+            self.guardar_instantanea()
+            # Si quedaron cambios por traer (por ejemplo, tras mucho tiempo sin abrir la aplicación) se sigue enseguida
+            self._programar_sincronizacion(0 if len(cambios) >= SINCRONIZACION_LOTE else SINCRONIZACION_INTERVALO)
+
+        def fallar(error):
+            print(f"No se pudo sincronizar la lista de empleados: {error}")
+            self._programar_sincronizacion()
+
+        self.ejecutor.enviar(REPOSITORIO.novedades, self.marca_sincronizacion, al_terminar=terminado, al_fallar=fallar,
+                             clave="sincronizacion", ocupa=False)
+
+    def _fusionar_cambios(self, cambios, total):
+        """
+        Incorpora los cambios traídos por sincronizar. Aplicar dos veces el mismo cambio no tiene
+        efecto, así que la relectura del margen de solape es inofensiva.
+
+        Args:
+            cambios (list): Pares (empleado_id, registro); registro es None si el empleado fue borrado.
+            total (int): Número de empleados en el servidor después de los cambios.
+        """
+        leido = time.monotonic()
+        self._en_tanda = True
+        try:
+            self._fusionar_tanda(cambios, leido)
+        finally:
+            self._en_tanda = False
+        self._programar_analitica()
+
+        # Las altas y bajas ajustaron el total de una en una; el servidor da el número exacto
+        self.total_empleados = len(self.modelo) if self.modelo.completo else max(total, len(self.modelo))
+        if self.resultados is None:
+            self.lista_virtual.actualizar(self.total_empleados, len(self.modelo))
+        else:
+            self._actualizar_resultados()
+
+    def _fusionar_tanda(self, cambios, leido):#Aplica uno a uno los cambios de una sincronización.
+        for empleado_id, registro in cambios:
+            if empleado_id in self._ids_pendientes:
+                continue # Se mantiene el cambio local; el envío del diario decidirá si hay conflicto
+            cargado = self.modelo.obtener(empleado_id)
+            if registro is None:
+                if cargado is not None:
+                    self._aplicar_baja(empleado_id)
+                elif self.analitica is not None:
+                    self.analitica.baja(empleado_id)
+                if empleado_id == self.selected_empleado_id:
+                    # Otro operador borró al empleado que se estaba editando
+                    self.limpiar_campos()
+            elif cargado is not None:
+                if cargado.get('version') != registro['version']:
+                    self._aplicar_modificacion(registro)
+                    self.cache.guardar(registro, leido)
+            elif empleado_id < self.modelo.ultimo_id or self.modelo.completo:
+                self._aplicar_alta(registro)
+                self.cache.guardar(registro, leido)
+            elif self.analitica is not None:
+                # Aún no se cargó esa parte de la lista: llegará con su página
+                self.analitica.alta(registro)
+
+    def _diferir_escrituras(self):#Indica si las escrituras deben ir al diario en lugar de al servidor.
+        #Mientras quede algo pendiente todo pasa por el diario, para que se aplique en el orden en que se hizo.
+        return DIARIO_CONFIG["siempre"] or self._pendientes_diario > 0
+
+    def _escribir_en_diario(self, operacion, empleado_id, datos=None, version=None):
+        """
+        Anota una escritura en el diario de forma síncrona (queda en disco antes de confirmarla al
+        usuario) y la aplica en la lista como si el servidor ya la hubiera aceptado.
+
+        Returns:
+            bool: False si ni siquiera se pudo guardar localmente; en ese caso ya se avisó al usuario.
+        """
+        try:
+            anotado = self.diario.anotar(operacion, empleado_id, datos, version)
+        except sqlite3.Error as e:
+            messagebox.showerror("Error al guardar el cambio", f"No se pudo guardar el cambio en este equipo: {e}")
+            return False
+        if operacion == 'A':
+            empleado_id = anotado
+        # Se marca antes de aplicarla para que no pase a la copia local ni la pise la sincronización
+        self._ids_pendientes.update((empleado_id, anotado))
+        self._pendientes_diario += 1
+        self._aplicar_escritura_local(operacion, empleado_id, datos, version)
+        self._mostrar_pendientes()
+        self._programar_reproduccion()
+        return True
 
-        # Botones para gestionar empleados
-        self.btn_cargar = tk.Button(frame_botones, text="Cargar Empleados", font=("Arial", 10), command=self.cargar_empleados)
-        self.btn_cargar.pack(side=tk.LEFT, padx=5)
+    def _aplicar_escritura_local(self, operacion, empleado_id, datos, version):#Refleja en la lista una escritura del diario; aplicarla dos veces no cambia nada.
+        if operacion == 'A':
+            if self.modelo.obtener(empleado_id) is None:
+                self._aplicar_alta({**datos, 'id': empleado_id, 'version': 0})
+        elif operacion == 'M':
+            self._aplicar_modificacion({**datos, 'id': empleado_id, 'version': None if version is None else version + 1})
+        elif self.modelo.obtener(empleado_id) is not None:
+            self._aplicar_baja(empleado_id)
 
-        self.btn_agregar = tk.Button(frame_botones, text="Registrar Empleado", font=("Arial", 10), command=self.agregar_empleado)
-        self.btn_agregar.pack(side=tk.LEFT, padx=5)
+    def _reaplicar_diario(self):#Vuelve a aplicar en la lista recién cargada las escrituras que siguen en el diario.
+        try:
+            entradas = self.diario.pendientes()
+        except sqlite3.Error as e:
+            print(f"No se pudo leer el diario de escrituras: {e}")
+            return
+        self._pendientes_diario = len(entradas)
+        self._ids_pendientes = {entrada['empleado_id'] for entrada in entradas}
+        for entrada in entradas:
+            self._aplicar_escritura_local(entrada['operacion'], entrada['empleado_id'], entrada['datos'], entrada['version'])
+        self._mostrar_pendientes()
+        if entradas:
+            self._programar_reproduccion()
 
-        self.btn_actualizar = tk.Button(frame_botones, text="Editar Empleado", font=("Arial", 10), command=self.actualizar_empleado)
-        self.btn_actualizar.pack(side=tk.LEFT, padx=5)
+    def _avisar_guardado_local(self, mensaje):#Confirma al usuario una escritura que quedó en el diario.
+        if DIARIO_CONFIG["siempre"]:
+            messagebox.showinfo("Éxito", mensaje)
+        else:
+            messagebox.showwarning("Guardado sin conexión", f"{mensaje}\n\nEl cambio se guardó en este equipo y se enviará "
+                                                             "al servidor automáticamente en cuanto sea posible.")
 
-        self.btn_eliminar = tk.Button(frame_botones, text="Borrar Empleado", font=("Arial", 10), command=self.eliminar_empleado)
-        self.btn_eliminar.pack(side=tk.LEFT, padx=5)
+    def _mostrar_pendientes(self):
+        n = self._pendientes_diario
+        self.diario_label.config(text=f"{n} cambio{'s' if n != 1 else ''} pendiente{'s' if n != 1 else ''} de enviar al servidor" if n else "")
 
-        self.btn_limpiar = tk.Button(frame_botones, text="Limpiar Campos", font=("Arial", 10), command=self.limpiar_campos)
-        self.btn_limpiar.pack(side=tk.LEFT, padx=5)
+    def _programar_reproduccion(self, retraso=DIARIO_CONFIG["retardo"]):#Programa un envío del diario; las escrituras seguidas se agrupan en el mismo.
+        if self._reproduccion_id is None:
+            self._reproduccion_id = self.master.after(retraso, self.reproducir_diario)
+
+    def reproducir_diario(self):
+        """
+        Envía en segundo plano las escrituras del diario al servidor, por lotes de una transacción.
+        Si no hay conexión se reintenta en la siguiente sincronización.
+        """
+        if self._reproduccion_id is not None:
+            self.master.after_cancel(self._reproduccion_id)
+            self._reproduccion_id = None
+        if self._reproduciendo:
+            return
 
-        # Carga los empleados cuando se inicia la aplicación principal
-        self.cargar_empleados()
+        def fallar(error):
+            self._reproduciendo = False
+            print(f"No se pudo enviar el diario de escrituras: {error}")
 
-    def cargar_empleados(self):
+        self._reproduciendo = True
+        self.ejecutor.enviar(self.diario.reproducir, REPOSITORIO, al_terminar=self._diario_reproducido, al_fallar=fallar, ocupa=False)
+
+    def _diario_reproducido(self, resultado):#Incorpora a la lista el resultado de un envío del diario.
+        self._reproduciendo = False
+        for entrada in resultado["aplicadas"]:
+            if entrada['operacion'] == 'A':
+                self._asignar_id(entrada['empleado_id'], entrada['asignado'])
+        for entrada in resultado["rechazadas"]:
+            self._deshacer_escritura_local(entrada)
+        try:
+            pendientes = self.diario.pendientes()
+        except sqlite3.Error as e:
+            print(f"No se pudo leer el diario de escrituras: {e}")
+            pendientes = []
+        self._pendientes_diario = len(pendientes)
+        self._ids_pendientes = {entrada['empleado_id'] for entrada in pendientes}
+
+        # Lo que ya no tiene nada pendiente vuelve a guardarse en la copia local, tal como quedó en el servidor
+        for entrada in resultado["aplicadas"] + resultado["rechazadas"]:
+            empleado_id = entrada.get('asignado') or entrada['empleado_id']
+            if empleado_id > 0:
+                self._anotar_instantanea(empleado_id, self.modelo.obtener(empleado_id))
+        self._mostrar_pendientes()
+
+        if resultado["rechazadas"]:
+            operaciones = {'A': "Alta", 'M': "Modificación", 'B': "Baja"}
+            lineas = [f"- {operaciones[e['operacion']]} del empleado {e['empleado_id']}: {e['motivo']}" for e in resultado["rechazadas"][:10]]
+            if len(resultado["rechazadas"]) > 10:
+                lineas.append(f"... y {len(resultado['rechazadas']) - 10} más")
+            messagebox.showwarning("Cambios rechazados", "Algunos cambios hechos sin conexión no se aplicaron y se "
+                                   "muestran los datos actuales del servidor:\n\n" + "\n".join(lineas))
+        if resultado["error"] is None and self._pendientes_diario:
+            self._programar_reproduccion() # Llegaron escrituras nuevas mientras se enviaba
+
+    def _asignar_id(self, temporal, asignado):#Sustituye en la lista el ID temporal de un alta por el que asignó el servidor.
+        registro = self.modelo.obtener(temporal)
+        if registro is None:
+            return
+        self._aplicar_baja(temporal)
+        if self.modelo.obtener(asignado) is None:
+            self._aplicar_alta({**registro, 'id': asignado})
+        if self.selected_empleado_id == temporal:
+            self.selected_empleado_id = asignado
+            self.entries['id'].config(state='normal')
+            self.entries['id'].delete(0, tk.END)
+            self.entries['id'].insert(0, str(asignado))
+            self.entries['id'].config(state='readonly')
+
+    def _deshacer_escritura_local(self, entrada):#Devuelve a su estado en el servidor un empleado cuya escritura se rechazó.
+        empleado_id, actual = entrada['empleado_id'], entrada['actual']
+        if actual is None:
+            if self.modelo.obtener(empleado_id) is not None:
+                self._aplicar_baja(empleado_id)
+        elif self.modelo.obtener(actual['id']) is not None:
+            self._aplicar_modificacion(actual)
+        else:
+            self._aplicar_alta(actual)
+
+    def _registro_en(self, indice):#Devuelve el registro que se muestra en la posición `indice` de la lista.
+        if self.resultados is not None:
+            return self.modelo.obtener(self.resultados[indice])
+        return self.modelo.en(indice)
+
+    def buscar_empleados(self):
         """
-        Obtiene todos los registros de empleados de la base de datos y los muestra en el Listbox.
+        Filtra la lista con el texto del cuadro de búsqueda usando el índice en memoria, y la
+        ordena y filtra según la vista (columnas y filtros elegidos), sin consultar al servidor.
+        Si aún no están cargados todos los empleados, se piden en segundo plano y los
+        resultados se completan a medida que llegan.
         """
-        conexion = obtener_conexion()
-        if conexion is None:
+        consulta = self.busqueda_var.get().strip()
+        self.lista_virtual.reiniciar()
+        if not consulta and not self.vista.activa:
+            self.resultados = None
+            self.estado_label.config(text="")
+            self.lista_virtual.actualizar(self.total_empleados, len(self.modelo))
             return
+        if not self.modelo.completo:
+            self.cargar_paginas(self.total_empleados)
+        self._actualizar_resultados()
 
-        cursor = None
+    def _actualizar_resultados(self):#Vuelve a calcular los resultados de la búsqueda, el orden y los filtros conservando la posición.
+        if self._en_tanda:
+            return # Se recalculan una sola vez al terminar la tanda
+        consulta = self.busqueda_var.get().strip()
+        resultados = self.indice_busqueda.buscar(consulta) if consulta else None
+        if self.vista.activa:
+            with METRICAS.operacion("ordenar_filtrar"):
+                resultados = self.vista.ids(resultados)
+        self.resultados = resultados
+        cargados = "" if self.modelo.completo else f" (en {len(self.modelo)} de {self.total_empleados} empleados)"
+        if consulta or self.vista.filtros:
+            self.estado_label.config(text=f"{len(self.resultados)} coincidencias{cargados}")
+        else:
+            self.estado_label.config(text=cargados.strip(" ()"))
+        self.lista_virtual.actualizar(len(self.resultados), len(self.resultados))
+
+    def ordenar_por(self, columna, agregar=False):
+        """
+        Ordena la lista por una columna usando las claves precalculadas de la vista.
+
+        Args:
+            columna (str): Clave de COLUMNAS_ORDEN.
+            agregar (bool): Si es True (Mayús+clic), la columna se añade como desempate de las ya
+                elegidas en lugar de sustituirlas. Elegir de nuevo una columna invierte su sentido.
+        """
+        orden = self.vista.orden
+        posicion = next((i for i, (elegida, _) in enumerate(orden) if elegida == columna), None)
+        if posicion is not None and (agregar or posicion == 0):
+            orden[posicion] = (columna, not orden[posicion][1])
+        elif agregar:
+            orden.append((columna, False))
+        else:
+            self.vista.orden = [(columna, False)]
+        if self.vista.orden == [("id", False)]:
+            self.vista.orden = [] # Es el orden natural de la lista
+        for elegida, boton in self.botones_orden.items():
+            texto = COLUMNAS_ORDEN[elegida]
+            for i, (columna, descendente) in enumerate(self.vista.orden):
+                if columna == elegida:
+                    texto += (" ▼" if descendente else " ▲") + (f"{i + 1}" if len(self.vista.orden) > 1 else "")
+            boton.config(text=texto, relief=tk.SUNKEN if texto != COLUMNAS_ORDEN[elegida] else tk.GROOVE)
+        self.buscar_empleados()
+        return "break"
+
+    def aplicar_filtros(self):#Filtra la lista por los rangos de salario y fecha de ingreso y por puesto escritos bajo la búsqueda.
+        valores = {clave: entry.get().strip() for clave, entry in self.filtros_entries.items()}
         try:
-            cursor = conexion.cursor(dictionary=True) # Obtener filas como diccionarios
-            cursor.execute("SELECT id, nombre, apellido, puesto, salario, fecha_ingreso FROM empleados ORDER BY id ASC")
-            registros = cursor.fetchall()
+            salarios = tuple(float(valores[clave]) if valores[clave] else None for clave in ("salario_min", "salario_max"))
+            fechas = tuple(datetime.strptime(valores[clave], "%Y-%m-%d").date() if valores[clave] else None
+                           for clave in ("desde", "hasta"))
+        except ValueError:
+            messagebox.showerror("Error de Formato", "El salario debe ser un número y las fechas deben tener formato YYYY-MM-DD.")
+            return
+        filtros = {}
+        if salarios != (None, None):
+            filtros['salario'] = salarios
+        if fechas != (None, None):
+            filtros['fecha_ingreso'] = fechas
+        if valores['puesto']:
+            filtros['puesto'] = valores['puesto']
+        self.vista.filtros = filtros
+        self.buscar_empleados()
 
-            self.lista.delete(0, tk.END) # Borra las entradas existentes del listbox
+    def quitar_filtros(self):#Vacía los filtros y vuelve a mostrar todos los empleados (con el orden elegido).
+        for entry in self.filtros_entries.values():
+            entry.delete(0, tk.END)
+        self.vista.filtros = {}
+        self.buscar_empleados()
 
-            # Inserta cada registro de empleado en el Listbox
-            for emp in registros:
-                # Formatea la fecha a cadena para la visualización
-                fecha_str = emp['fecha_ingreso'].strftime("%Y-%m-%d") if isinstance(emp['fecha_ingreso'], date) else str(emp['fecha_ingreso'])
-                self.lista.insert(tk.END,
-                                  f"ID: {emp['id']:<4} | {emp['nombre']:<15} | {emp['apellido']:<15} | {emp['puesto']:<15} | ${emp['salario']:.2f} | {fecha_str}")
+    def _aplicar_alta(self, registro):#Incorpora a la lista un empleado recién creado sin recargarla.
+        if self.analitica is not None:
+            self.analitica.alta(registro)
+            self._programar_analitica()
+        indice = self.modelo.insertar(registro)
+        self.total_empleados += 1
+        if indice is not None:
+            self.indice_busqueda.agregar([registro])
+            self._anotar_instantanea(registro['id'], registro)
+        if self.resultados is not None:
+            self._actualizar_resultados()
+        else:
+            self.lista_virtual.fila_insertada(indice)
 
-        except Exception as e:
-            messagebox.showerror("Error al cargar empleados", f"Ocurrió un error al cargar los datos: {e}")
-        finally:
-            if cursor:
-                cursor.close()
-            if conexion and conexion.is_connected():
-                conexion.close()
+    def _aplicar_modificacion(self, registro):#Sustituye en la lista los datos de un empleado y reescribe solo su línea.
+        self.cache.invalidar(registro['id'])
+        if self.analitica is not None:
+            self.analitica.modificacion(registro)
+            self._programar_analitica()
+        indice = self.modelo.actualizar(registro)
+        if indice is None:
+            return
+        self.indice_busqueda.agregar([registro])
+        self._anotar_instantanea(registro['id'], registro)
+        if self.resultados is not None:
+            self._actualizar_resultados()
+        else:
+            self.lista_virtual.refrescar_fila(indice)
+
+    def _aplicar_baja(self, empleado_id):#Quita a un empleado de la lista sin recargarla.
+        self.cache.invalidar(empleado_id)
+        if self.analitica is not None:
+            self.analitica.baja(empleado_id)
+            self._programar_analitica()
+        indice = self.modelo.eliminar(empleado_id)
+        self.indice_busqueda.quitar(empleado_id)
+        self._anotar_instantanea(empleado_id, None)
+        self.total_empleados = max(0, self.total_empleados - 1)
+        if self.resultados is not None:
+            self._actualizar_resultados()
+        else:
+            self.lista_virtual.fila_eliminada(indice)
 
     def seleccionar_empleado(self, event):
         """
         Maneja la selección de un empleado del Listbox.
         Rellena los campos de entrada con los datos del empleado seleccionado.
 
+        El ID sale directamente de la posición seleccionada en el modelo. Solo se consulta
+        la base de datos si el registro no está en la caché o ya no está vigente; en ese caso
+        la consulta va en segundo plano y una nueva selección sustituye a la anterior.
+
         Args:
             event: El evento que activó la función (ListboxSelect).
         """
-        try:
-            selected_index = self.lista.curselection()[0] # Obtiene el índice del elemento seleccionado
-            selected_item_text = self.lista.get(selected_index) # Obtiene el texto del elemento seleccionado
+        indice = self.lista_virtual.seleccion
+        if indice is None:
+            # Maneja el caso en que no se selecciona ningún elemento (por ejemplo, al hacer clic en un espacio vacío)
+            self.ejecutor.cancelar("seleccion")
+            self.selected_empleado_id = None
+            self.selected_version = None
+            self.limpiar_campos() # Limpia los campos si no hay nada seleccionado
+            return
 
-            # Extrae el ID del empleado de la cadena formateada
-            id_start_idx = selected_item_text.find("ID: ") + 4
-            id_end_idx = selected_item_text.find(" |", id_start_idx)
-            empleado_id = int(selected_item_text[id_start_idx:id_end_idx])
+        empleado_id = self._registro_en(indice)['id']
+        empleado_data = self.cache.obtener(empleado_id)
+        if empleado_data is None and (empleado_id < 0 or empleado_id in self._ids_pendientes):
+            # Con cambios aún en el diario, lo vigente es lo que muestra la lista
+            empleado_data = self._registro_en(indice)
+        if empleado_data is not None:
+            self.ejecutor.cancelar("seleccion")
+            self._rellenar_campos(empleado_data)
+            self.selected_empleado_id = empleado_data['id'] # Almacena el ID del empleado seleccionado
+            self.selected_version = empleado_data.get('version')
+            return
 
-            conexion = obtener_conexion()
-            if conexion is None:
+        def mostrar(empleado_data):
+            if empleado_data is None:
+                # Otro usuario lo borró: se quita de la lista
+                self._aplicar_baja(empleado_id)
+                self.limpiar_campos()
                 return
+            self._aplicar_modificacion(empleado_data)
+            self.cache.guardar(empleado_data)
+            self._rellenar_campos(empleado_data)
+            self.selected_empleado_id = empleado_data['id']
+            self.selected_version = empleado_data.get('version')
 
-            cursor = None
-            try:
-                cursor = conexion.cursor(dictionary=True)
-                cursor.execute("SELECT id, nombre, apellido, puesto, salario, fecha_ingreso FROM empleados WHERE id = %s", (empleado_id,))
-                empleado_data = cursor.fetchone()
-
-                if empleado_data:
-                    # Habilita y rellena la entrada de ID
-                    self.entries['id'].config(state='normal')
-                    self.entries['id'].delete(0, tk.END)
-                    self.entries['id'].insert(0, str(empleado_data['id']))
-                    self.entries['id'].config(state='readonly') # Vuelve a dejarlo como solo lectura
-
-                    # Rellena otros campos de entrada
-                    self.entries['nombre'].delete(0, tk.END)
-                    self.entries['nombre'].insert(0, empleado_data['nombre'])
+        self.ejecutor.enviar(REPOSITORIO.obtener, empleado_id, al_terminar=mostrar,
+                             al_fallar=lambda e: mostrar_error_bd("Error al seleccionar empleado", e), clave="seleccion")
 
-                    self.entries['apellido'].delete(0, tk.END)
-                    self.entries['apellido'].insert(0, empleado_data['apellido'])
-
-                    self.entries['puesto'].delete(0, tk.END)
-                    self.entries['puesto'].insert(0, empleado_data['puesto'])
+    def _rellenar_campos(self, empleado_data):#Rellena los campos de entrada con los datos de un empleado.
+        # Habilita y rellena la entrada de ID
+        self.entries['id'].config(state='normal')
+        self.entries['id'].delete(0, tk.END)
+        self.entries['id'].insert(0, str(empleado_data['id']))
+        self.entries['id'].config(state='readonly') # Vuelve a dejarlo como solo lectura
 
-                    self.entries['salario'].delete(0, tk.END)
-                    self.entries['salario'].insert(0, str(empleado_data['salario']))
+        # Rellena otros campos de entrada
+        self.entries['nombre'].delete(0, tk.END)
+        self.entries['nombre'].insert(0, empleado_data['nombre'])
 
-                    # *** CORRECCIÓN AQUÍ: Usar la clave correcta para fecha_ingreso ***
-                    self.entries['fecha_ingreso_yyyy-mm-dd'].delete(0, tk.END)
-                    fecha_str = empleado_data['fecha_ingreso'].strftime("%Y-%m-%d") if isinstance(empleado_data['fecha_ingreso'], date) else str(empleado_data['fecha_ingreso'])
-                    self.entries['fecha_ingreso_yyyy-mm-dd'].insert(0, fecha_str)
+        self.entries['apellido'].delete(0, tk.END)
+        self.entries['apellido'].insert(0, empleado_data['apellido'])
 
-                    self.selected_empleado_id = empleado_data['id'] # Almacena el ID del empleado seleccionado
-                else:
-                    self.selected_empleado_id = None
+        self.entries['puesto'].delete(0, tk.END)
+        self.entries['puesto'].insert(0, empleado_data['puesto'])
 
-            except Exception as e:
-                messagebox.showerror("Error al seleccionar empleado", f"Ocurrió un error: {e}")
-            finally:
-                if cursor:
-                    cursor.close()
-                if conexion and conexion.is_connected():
-                    conexion.close()
+        self.entries['salario'].delete(0, tk.END)
+        self.entries['salario'].insert(0, str(empleado_data['salario']))
 
-        except IndexError:
-            # Maneja el caso en que no se selecciona ningún elemento (por ejemplo, al hacer clic en un espacio vacío)
-            self.selected_empleado_id = None
-            self.limpiar_campos() # Limpia los campos si no hay nada seleccionado
+        # *** CORRECCIÓN AQUÍ: Usar la clave correcta para fecha_ingreso ***
+        self.entries['fecha_ingreso_yyyy-mm-dd'].delete(0, tk.END)
+        fecha_str = empleado_data['fecha_ingreso'].strftime("%Y-%m-%d") if isinstance(empleado_data['fecha_ingreso'], date) else str(empleado_data['fecha_ingreso'])
+        self.entries['fecha_ingreso_yyyy-mm-dd'].insert(0, fecha_str)
 
     def agregar_empleado(self):#Añade un nuevo registro de empleado a la base de datos utilizando los datos de los campos de entrada.
         #Realiza la validación de entrada y maneja las operaciones de la base de datos.
@@ -399,33 +3800,36 @@ class MainApp:#Representa la aplicación principal para la gestión de Recursos
 
         # Validación del tipo de datos
         try:
-            salario = float(salario_str)
-            fecha_ingreso = datetime.strptime(fecha_ingreso_str, "%Y-%m-%d").date()
+            salario, fecha_ingreso = convertir_datos_empleado(salario_str, fecha_ingreso_str)
         except ValueError:
             messagebox.showerror("Error de Formato", "Salario debe ser un número y Fecha de Ingreso debe tener formato YYYY-MM-DD.")
             return
 
-        conexion = obtener_conexion()
-        if conexion is None:
+        datos = {'nombre': nombre, 'apellido': apellido, 'puesto': puesto, 'salario': salario, 'fecha_ingreso': fecha_ingreso}
+
+        def guardar_en_diario():
+            if self._escribir_en_diario('A', None, datos):
+                self._avisar_guardado_local("Empleado agregado correctamente.")
+                self.limpiar_campos()
+
+        if self._diferir_escrituras():
+            guardar_en_diario()
             return
 
-        cursor = None
-        try:
-            cursor = conexion.cursor()
-            sql = "INSERT INTO empleados (nombre, apellido, puesto, salario, fecha_ingreso) VALUES (%s, %s, %s, %s, %s)"
-            values = (nombre, apellido, puesto, salario, fecha_ingreso)
-            cursor.execute(sql, values)
-            conexion.commit() # Confirma los cambios en la base de datos
+        def terminado(nuevo_id):
             messagebox.showinfo("Éxito", "Empleado agregado correctamente.")
             self.limpiar_campos()    # Limpia los campos de entrada
-            self.cargar_empleados()  # Vuelve a cargar la lista de empleados
-        except Exception as e:
-            messagebox.showerror("Error al agregar empleado", f"Ocurrió un error: {e}")
-        finally:
-            if cursor:
-                cursor.close()
-            if conexion and conexion.is_connected():
-                conexion.close()
+            # Añade solo la fila nueva a la lista, con el ID que asignó la base de datos
+            self._aplicar_alta({**datos, 'id': nuevo_id, 'version': 0})
+
+        def fallar(error):
+            if isinstance(error, ErrorConexion):
+                guardar_en_diario() # Sin servidor no se pierde el alta: queda en el diario
+            else:
+                mostrar_error_bd("Error al agregar empleado", error)
+
+        self.ejecutor.enviar(REPOSITORIO.insertar, nombre, apellido, puesto, salario, fecha_ingreso, al_terminar=terminado,
+                             al_fallar=fallar)
 
     def actualizar_empleado(self):#Actualiza un registro de empleado existente en la base de datos utilizando los datos de los campos de entrada.
         #Requiere que un empleado esté seleccionado de la lista.
@@ -434,6 +3838,7 @@ class MainApp:#Representa la aplicación principal para la gestión de Recursos
             return
 
         id_empleado = self.selected_empleado_id
+        version = self.selected_version
         nombre = self.entries['nombre'].get()
         apellido = self.entries['apellido'].get()
         puesto = self.entries['puesto'].get()
@@ -448,38 +3853,56 @@ class MainApp:#Representa la aplicación principal para la gestión de Recursos
 
         # Validación del tipo de datos
         try:
-            salario = float(salario_str)
-            fecha_ingreso = datetime.strptime(fecha_ingreso_str, "%Y-%m-%d").date()
+            salario, fecha_ingreso = convertir_datos_empleado(salario_str, fecha_ingreso_str)
         except ValueError:
             messagebox.showerror("Error de Formato", "Salario debe ser un número y Fecha de Ingreso debe tener formato YYYY-MM-DD.")
             return
 
-        conexion = obtener_conexion()
-        if conexion is None:
+        datos = {'nombre': nombre, 'apellido': apellido, 'puesto': puesto, 'salario': salario, 'fecha_ingreso': fecha_ingreso}
+
+        def guardar_en_diario():
+            if self._escribir_en_diario('M', id_empleado, datos, version):
+                self._avisar_guardado_local("Empleado actualizado correctamente.")
+                self.limpiar_campos()
+                self.lista_virtual.deseleccionar()
+
+        if self._diferir_escrituras():
+            guardar_en_diario()
             return
 
-        cursor = None
-        try:
-            cursor = conexion.cursor()
-            sql = """
-            UPDATE empleados
-            SET nombre = %s, apellido = %s, puesto = %s, salario = %s, fecha_ingreso = %s
-            WHERE id = %s
-            """
-            values = (nombre, apellido, puesto, salario, fecha_ingreso, id_empleado)
-            cursor.execute(sql, values)
-            conexion.commit()
+        def terminado(nueva_version):
             messagebox.showinfo("Éxito", "Empleado actualizado correctamente.")
             self.limpiar_campos()    # Limpia los campos de entrada
-            self.cargar_empleados()  # Vuelve a cargar la lista de empleados
+            # Reescribe solo la línea del empleado modificado con los valores ya conocidos
+            self._aplicar_modificacion({**datos, 'id': id_empleado, 'version': nueva_version})
+            self.lista_virtual.deseleccionar()
             self.selected_empleado_id = None # Deselecciona el empleado después de la actualización
-        except Exception as e:
-            messagebox.showerror("Error al actualizar empleado", f"Ocurrió un error: {e}")
-        finally:
-            if cursor:
-                cursor.close()
-            if conexion and conexion.is_connected():
-                conexion.close()
+            self.selected_version = None
+
+        def fallar(error):
+            if isinstance(error, ErrorConexion):
+                guardar_en_diario()
+                return
+            if not isinstance(error, ConflictoVersionError):
+                mostrar_error_bd("Error al actualizar empleado", error)
+                return
+            # Otro operador lo cambió antes: no se pisan sus datos, se muestran los vigentes
+            if error.actual is None:
+                messagebox.showwarning("Empleado borrado", "Otro usuario eliminó este empleado; no se guardaron los cambios.")
+                self._aplicar_baja(id_empleado)
+                self.limpiar_campos()
+                return
+            messagebox.showwarning("Empleado modificado",
+                                   "Otro usuario modificó este empleado mientras lo editaba.\n"
+                                   "Se muestran sus datos actuales; revise y vuelva a guardar.")
+            self._aplicar_modificacion(error.actual)
+            self.cache.guardar(error.actual)
+            self._rellenar_campos(error.actual)
+            self.selected_empleado_id = id_empleado
+            self.selected_version = error.actual['version']
+
+        self.ejecutor.enviar(REPOSITORIO.actualizar, id_empleado, nombre, apellido, puesto, salario, fecha_ingreso, version,
+                             al_terminar=terminado, al_fallar=fallar)
 
 
     def eliminar_empleado(self): #Elimina un registro de empleado seleccionado de la base de datos.
@@ -489,30 +3912,345 @@ class MainApp:#Representa la aplicación principal para la gestión de Recursos
             return
 
         id_empleado = self.selected_empleado_id
+        version = self.selected_version
 
         # Pide confirmación antes de eliminar
         if messagebox.askyesno("Confirmar Eliminación", f"¿Está seguro de que desea eliminar al empleado con ID {id_empleado}?"):
-            conexion = obtener_conexion()
-            if conexion is None:
+            def guardar_en_diario():
+                if self._escribir_en_diario('B', id_empleado, version=version):
+                    self._avisar_guardado_local("Empleado eliminado correctamente.")
+                    self.limpiar_campos()
+
+            if self._diferir_escrituras():
+                guardar_en_diario()
                 return
 
-            cursor = None
-            try:
-                cursor = conexion.cursor()
-                sql = "DELETE FROM empleados WHERE id = %s"
-                cursor.execute(sql, (id_empleado,))
-                conexion.commit()
+            def terminado(resultado):
                 messagebox.showinfo("Éxito", "Empleado eliminado correctamente.")
                 self.limpiar_campos()    # Limpia los campos de entrada
-                self.cargar_empleados()  # Vuelve a cargar la lista de empleados
+                self._aplicar_baja(id_empleado)  # Quita solo esa fila de la lista
                 self.selected_empleado_id = None # Deselecciona el empleado después de la eliminación
-            except Exception as e:
-                messagebox.showerror("Error al eliminar empleado", f"Ocurrió un error: {e}")
-            finally:
-                if cursor:
-                    cursor.close()
-                if conexion and conexion.is_connected():
-                    conexion.close()
+                self.selected_version = None
+
+            def fallar(error):
+                if isinstance(error, ErrorConexion):
+                    guardar_en_diario()
+                    return
+                if not isinstance(error, ConflictoVersionError):
+                    mostrar_error_bd("Error al eliminar empleado", error)
+                    return
+                # Otro operador lo cambió antes: no se borra sin que se vean sus datos actuales
+                messagebox.showwarning("Empleado modificado",
+                                       "Otro usuario modificó este empleado después de seleccionarlo; no se eliminó.\n"
+                                       "Se muestran sus datos actuales; revise y vuelva a eliminar.")
+                self._aplicar_modificacion(error.actual)
+                self.cache.guardar(error.actual)
+                self._rellenar_campos(error.actual)
+                self.selected_empleado_id = id_empleado
+                self.selected_version = error.actual['version']
+
+            self.ejecutor.enviar(REPOSITORIO.eliminar, id_empleado, version, al_terminar=terminado, al_fallar=fallar)
+
+    def importar_empleados(self):#Importa empleados desde un archivo CSV elegido por el usuario.
+        #La importación se hace en segundo plano por lotes y el progreso se muestra bajo el saludo.
+        ruta = filedialog.askopenfilename(title="Importar empleados", filetypes=[("Archivos CSV", "*.csv"), ("Todos los archivos", "*.*")])
+        if not ruta:
+            return
+
+        def progreso(importadas, rechazadas):
+            self.estado_label.config(text=f"Importando... {importadas} empleados importados, {rechazadas} rechazados")
+
+        def terminado(resumen):
+            self.btn_importar.config(state='normal')
+            mensaje = f"Se importaron {resumen['importadas']} empleados."
+            if resumen['rechazadas']:
+                mensaje += f"\n{resumen['rechazadas']} filas rechazadas; el detalle está en:\n{resumen['archivo_rechazos']}"
+            messagebox.showinfo("Importación terminada", mensaje)
+            self.cargar_empleados()  # Vuelve a cargar la lista desde la primera página
+
+        def fallar(error):
+            self.btn_importar.config(state='normal')
+            mostrar_error_bd("Error al importar empleados", error)
+            self.cargar_empleados()  # Los lotes ya confirmados sí quedaron guardados
+
+        self.btn_importar.config(state='disabled')
+        self.ejecutor.enviar(importar_csv, ruta, lambda *cuentas: self.ejecutor.en_hilo_principal(progreso, *cuentas),
+                             al_terminar=terminado, al_fallar=fallar)
+
+    def abrir_exportacion(self):#Abre una ventana para elegir los filtros de la exportación.
+        ventana = tk.Toplevel(self.master)
+        ventana.title("Exportar Empleados")
+        ventana.resizable(False, False)
+        ventana.transient(self.master)
+
+        filtros = {}
+        for i, (clave, texto) in enumerate([("puesto", "Puesto (opcional):"),
+                                            ("desde", "Ingreso desde (YYYY-MM-DD):"),
+                                            ("hasta", "Ingreso hasta (YYYY-MM-DD):")]):
+            tk.Label(ventana, text=texto, font=("Arial", 10)).grid(row=i, column=0, sticky="w", padx=5, pady=2)
+            filtros[clave] = tk.Entry(ventana, font=("Arial", 10), width=25)
+            filtros[clave].grid(row=i, column=1, padx=5, pady=2)
+
+        def exportar():
+            puesto = filtros['puesto'].get().strip() or None
+            try:
+                desde = datetime.strptime(filtros['desde'].get(), "%Y-%m-%d").date() if filtros['desde'].get() else None
+                hasta = datetime.strptime(filtros['hasta'].get(), "%Y-%m-%d").date() if filtros['hasta'].get() else None
+            except ValueError:
+                messagebox.showerror("Error de Formato", "Las fechas deben tener formato YYYY-MM-DD.", parent=ventana)
+                return
+            ruta = filedialog.asksaveasfilename(parent=ventana, title="Exportar empleados", defaultextension=".csv",
+                                                filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")])
+            if not ruta:
+                return
+            ventana.destroy()
+            self.exportar_empleados(ruta, "jsonl" if ruta.lower().endswith(".jsonl") else "csv", puesto, desde, hasta)
+
+        tk.Button(ventana, text="Exportar...", font=("Arial", 10), command=exportar).grid(row=3, column=0, columnspan=2, pady=8)
+
+    def exportar_empleados(self, ruta, formato, puesto, desde, hasta):#Exporta en segundo plano y muestra el progreso bajo el saludo.
+        def progreso(filas):
+            self.estado_label.config(text=f"Exportando... {filas} empleados")
+
+        def terminado(filas):
+            self.btn_exportar.config(state='normal')
+            messagebox.showinfo("Exportación terminada", f"Se exportaron {filas} empleados a:\n{ruta}")
+
+        def fallar(error):
+            self.btn_exportar.config(state='normal')
+            mostrar_error_bd("Error al exportar empleados", error)
+
+        self.btn_exportar.config(state='disabled')
+        self.ejecutor.enviar(exportar_empleados, ruta, formato, puesto, desde, hasta,
+                             lambda filas: self.ejecutor.en_hilo_principal(progreso, filas),
+                             al_terminar=terminado, al_fallar=fallar)
+
+    def abrir_ajuste(self):
+        """
+        Abre la ventana de ajuste masivo de salarios: un porcentaje y/o un importe fijo para los
+        empleados de un puesto o de una cohorte de fecha de ingreso. Antes de aplicarlo se muestra
+        cuántos empleados cambian, algunos de ellos y el impacto en la nómina total.
+        """
+        if self._pendientes_diario:
+            messagebox.showwarning("Cambios sin enviar", "Hay cambios guardados en este equipo que aún no llegaron al servidor. "
+                                   "Espere a que se envíen antes de hacer un ajuste masivo.")
+            return
+        ventana = tk.Toplevel(self.master)
+        ventana.title("Ajuste de Salarios")
+        ventana.resizable(False, False)
+        ventana.transient(self.master)
+
+        campos = {}
+        for i, (clave, texto) in enumerate([("porcentaje", "Porcentaje (%):"),
+                                            ("importe", "Importe fijo:"),
+                                            ("puesto", "Puesto (opcional):"),
+                                            ("desde", "Ingreso desde (YYYY-MM-DD):"),
+                                            ("hasta", "Ingreso hasta (YYYY-MM-DD):")]):
+            tk.Label(ventana, text=texto, font=("Arial", 10)).grid(row=i, column=0, sticky="w", padx=5, pady=2)
+            campos[clave] = tk.Entry(ventana, font=("Arial", 10), width=25)
+            campos[clave].grid(row=i, column=1, padx=5, pady=2)
+
+        texto = tk.Text(ventana, width=72, height=16, font=("Consolas", 9), state='disabled')
+        texto.grid(row=6, column=0, columnspan=2, padx=5, pady=5)
+        previsto = {}  # Ajuste de la última vista previa; solo ese se puede aplicar
+
+        def leer_ajuste():
+            try:
+                ajuste = {"porcentaje": float(campos['porcentaje'].get() or 0), "importe": float(campos['importe'].get() or 0),
+                          "puesto": campos['puesto'].get().strip() or None,
+                          "desde": datetime.strptime(campos['desde'].get(), "%Y-%m-%d").date() if campos['desde'].get() else None,
+                          "hasta": datetime.strptime(campos['hasta'].get(), "%Y-%m-%d").date() if campos['hasta'].get() else None}
+            except ValueError:
+                messagebox.showerror("Error de Formato", "El porcentaje y el importe deben ser números y las fechas "
+                                     "deben tener formato YYYY-MM-DD.", parent=ventana)
+                return None
+            if not ajuste['porcentaje'] and not ajuste['importe']:
+                messagebox.showwarning("Ajuste vacío", "Indique un porcentaje o un importe fijo.", parent=ventana)
+                return None
+            return ajuste
+
+        def mostrar(ajuste, vista):
+            lineas = [f"Empleados afectados: {vista['empleados']}"]
+            if vista['empleados']:
+                diferencia = vista['nomina_nueva'] - vista['nomina_actual']
+                relativa = f" ({diferencia / vista['nomina_actual']:+.2%})" if vista['nomina_actual'] else ""
+                lineas += [f"Nómina actual:       ${vista['nomina_actual']:,.2f}",
+                           f"Nómina ajustada:     ${vista['nomina_nueva']:,.2f}",
+                           f"Diferencia:          ${diferencia:+,.2f}{relativa}", ""]
+                lineas += [f"ID: {fila['id']:<6} {fila['nombre'] + ' ' + fila['apellido']:<28.28} "
+                           f"${float(fila['salario']):>10,.2f} -> ${float(fila['salario_nuevo']):>10,.2f}" for fila in vista['muestra']]
+                if vista['empleados'] > len(vista['muestra']):
+                    lineas.append(f"... y {vista['empleados'] - len(vista['muestra'])} más")
+            texto.config(state='normal')
+            texto.delete("1.0", tk.END)
+            texto.insert("1.0", "\n".join(lineas))
+            texto.config(state='disabled')
+            previsto.clear()
+            if vista['empleados'] and vista['minimo_nuevo'] >= 0:
+                previsto.update(ajuste, empleados=vista['empleados'])
+                btn_aplicar.config(state='normal')
+            elif vista['empleados']:
+                messagebox.showerror("Ajuste no válido", "El ajuste dejaría algún salario por debajo de cero.", parent=ventana)
+
+        def previsualizar():
+            ajuste = leer_ajuste()
+            if ajuste is None:
+                return
+            btn_aplicar.config(state='disabled')
+            self.ejecutor.enviar(lambda: REPOSITORIO.previsualizar_ajuste(**ajuste), al_terminar=lambda vista: mostrar(ajuste, vista),
+                                 al_fallar=lambda e: mostrar_error_bd("Error al calcular el ajuste", e), clave="ajuste")
+
+        def aplicar():
+            ajuste = leer_ajuste()
+            if ajuste is None:
+                return
+            if any(previsto.get(clave) != valor for clave, valor in ajuste.items()):
+                messagebox.showwarning("Vista previa", "Los datos cambiaron desde la vista previa; vuelva a calcularla.", parent=ventana)
+                btn_aplicar.config(state='disabled')
+                return
+            if messagebox.askyesno("Confirmar Ajuste", f"¿Aplicar el ajuste a {previsto['empleados']} empleados?", parent=ventana):
+                ventana.destroy()
+                self.ajustar_salarios(ajuste)
+
+        botones = tk.Frame(ventana)
+        botones.grid(row=5, column=0, columnspan=2, pady=8)
+        tk.Button(botones, text="Vista previa", font=("Arial", 10), command=previsualizar).pack(side=tk.LEFT, padx=5)
+        btn_aplicar = tk.Button(botones, text="Aplicar", font=("Arial", 10), command=aplicar, state='disabled')
+        btn_aplicar.pack(side=tk.LEFT, padx=5)
+
+    def ajustar_salarios(self, ajuste, desde_id=None):#Aplica en segundo plano un ajuste masivo y muestra el progreso bajo el saludo.
+        #La lista se actualiza con la sincronización, que trae los empleados ajustados desde empleados_cambios.
+        def progreso(ajustados, fraccion):
+            self.estado_label.config(text=f"Ajustando salarios... {ajustados} empleados ({fraccion:.0%})")
+
+        def terminado(ajustados):
+            self.btn_ajuste.config(state='normal')
+            messagebox.showinfo("Ajuste terminado", f"Se ajustó el salario de {ajustados} empleados.")
+            self._programar_sincronizacion(0)
+
+        def fallar(error):
+            self.btn_ajuste.config(state='normal')
+            self._programar_sincronizacion(0)
+            if not isinstance(error, AjusteInterrumpidoError):
+                mostrar_error_bd("Error al ajustar salarios", error)
+            elif messagebox.askyesno("Ajuste interrumpido", f"{error}\n\nLos {error.ajustados} empleados ya ajustados "
+                                     "conservan el cambio. ¿Reintentar con los que faltan?"):
+                self.ajustar_salarios(ajuste, error.siguiente_id)
+
+        self.btn_ajuste.config(state='disabled')
+        avisar = lambda *avance: self.ejecutor.en_hilo_principal(progreso, *avance)
+        self.ejecutor.enviar(lambda: REPOSITORIO.ajustar_salarios(**ajuste, desde_id=desde_id, al_progresar=avisar),
+                             al_terminar=terminado, al_fallar=fallar)
+
+    def abrir_analitica(self):#Abre el panel de análisis de nómina, cargando las columnas la primera vez.
+        if self.ventana_analitica is not None:
+            self.ventana_analitica.lift()
+            return
+
+        self.ventana_analitica = tk.Toplevel(self.master)
+        self.ventana_analitica.title("Análisis de Nómina")
+        self.ventana_analitica.geometry("620x520")
+        self.ventana_analitica.protocol("WM_DELETE_WINDOW", self._cerrar_analitica)
+
+        self.texto_analitica = tk.Text(self.ventana_analitica, font=("Consolas", 10), wrap="none")
+        self.texto_analitica.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+        tk.Button(self.ventana_analitica, text="Recargar", font=("Arial", 10), command=self._cargar_analitica).pack(pady=(0, 10))
+
+        if self.analitica is None:
+            self._cargar_analitica()
+        else:
+            self._refrescar_analitica()
+
+    def _cargar_analitica(self):#Lee de nuevo las columnas de nómina del servidor en segundo plano.
+        def mostrar(analitica):
+            self.analitica = analitica
+            self._refrescar_analitica()
+
+        if self.ventana_analitica is not None:
+            self._escribir_analitica("Cargando datos de nómina...")
+        self.ejecutor.enviar(bd_columnas_nomina, al_terminar=mostrar, clave="analitica",
+                             al_fallar=lambda e: mostrar_error_bd("Error al cargar la nómina", e))
+
+    def _cerrar_analitica(self):
+        self.ventana_analitica.destroy()
+        self.ventana_analitica = None
+
+    def _escribir_analitica(self, texto):
+        self.texto_analitica.config(state='normal')
+        self.texto_analitica.delete("1.0", tk.END)
+        self.texto_analitica.insert("1.0", texto)
+        self.texto_analitica.config(state='disabled')
+
+    def _programar_analitica(self):#Agrupa en un solo refresco del panel los cambios aplicados en la misma tanda.
+        if self._analitica_pendiente or self.ventana_analitica is None:
+            return
+        self._analitica_pendiente = True
+
+        def refrescar():
+            self._analitica_pendiente = False
+            self._refrescar_analitica()
+
+        self.master.after_idle(refrescar)
+
+    def _refrescar_analitica(self):#Vuelve a calcular y mostrar los indicadores si el panel está abierto.
+        if self.ventana_analitica is None or self.analitica is None:
+            return
+        r = self.analitica.resumen()
+        lineas = [f"Empleados:        {r['empleados']:,}",
+                  f"Nómina total:     ${r['nomina_total']:,.2f}",
+                  f"Salario medio:    ${r['salario_medio']:,.2f}",
+                  f"Salario mediano:  ${r['salario_mediano']:,.2f}",
+                  "",
+                  "Por puesto:"]
+        for puesto, datos in sorted(r['por_puesto'].items()):
+            p = datos['percentiles']
+            lineas.append(f"  {puesto:<20} {datos['empleados']:>7,}  media ${datos['media']:,.2f}")
+            lineas.append("  " + " " * 20 + "  " + "  ".join(f"P{k} ${v:,.2f}" for k, v in p.items()))
+        lineas += ["", "Ingresos por año:"]
+        lineas += [f"  {anio}: {altas:,}" for anio, altas in r['ingresos_por_anio'].items()]
+        lineas += ["", "Antigüedad:"]
+        lineas += [f"  {tramo:<12} {empleados:,}" for tramo, empleados in r['antiguedad'].items()]
+        self._escribir_analitica("\n".join(lineas))
+
+    def abrir_metricas(self):#Abre el panel con los percentiles de cada operación y fase; se actualiza cada segundo.
+        if self.ventana_metricas is not None:
+            self.ventana_metricas.lift()
+            return
+
+        self.ventana_metricas = tk.Toplevel(self.master)
+        self.ventana_metricas.title("Métricas de Rendimiento")
+        self.ventana_metricas.geometry("760x480")
+        self.ventana_metricas.protocol("WM_DELETE_WINDOW", self._cerrar_metricas)
+
+        self.texto_metricas = tk.Text(self.ventana_metricas, font=("Consolas", 10), wrap="none")
+        self.texto_metricas.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+        tk.Button(self.ventana_metricas, text="Exportar", font=("Arial", 10), command=self._exportar_metricas).pack(pady=(0, 10))
+        self._refrescar_metricas()
+
+    def _refrescar_metricas(self):
+        if self.ventana_metricas is None:
+            return
+        self.texto_metricas.config(state='normal')
+        self.texto_metricas.delete("1.0", tk.END)
+        self.texto_metricas.insert("1.0", METRICAS.texto())
+        self.texto_metricas.config(state='disabled')
+        self.ventana_metricas.after(1000, self._refrescar_metricas)
+
+    def _cerrar_metricas(self):
+        self.ventana_metricas.destroy()
+        self.ventana_metricas = None
+
+    def _exportar_metricas(self):
+        ruta = filedialog.asksaveasfilename(parent=self.ventana_metricas, title="Exportar métricas", defaultextension=".json",
+                                            initialfile=os.path.basename(METRICAS.archivo), filetypes=[("JSON", "*.json")])
+        if not ruta:
+            return
+        try:
+            METRICAS.exportar(ruta)
+        except OSError as e:
+            messagebox.showerror("Error al exportar métricas", str(e), parent=self.ventana_metricas)
+            return
+        messagebox.showinfo("Métricas exportadas", f"Se guardaron las métricas en:\n{ruta}", parent=self.ventana_metricas)
 
     def limpiar_campos(self):#Limpia todos los campos de entrada en la sección de datos del empleado y deselecciona cualquier empleado
         # Habilita la entrada de ID temporalmente para borrar, luego vuelve a establecerla como solo lectura
@@ -527,12 +4265,665 @@ class MainApp:#Representa la aplicación principal para la gestión de Recursos
         # *** CORRECCIÓN AQUÍ: Usar la clave correcta para fecha_ingreso ***
         self.entries['fecha_ingreso_yyyy-mm-dd'].delete(0, tk.END)
         self.selected_empleado_id = None # Reinicia el ID del empleado seleccionado
+        self.selected_version = None
+
+# Esquema y migraciones
+# `python Proyecto_final.py --migrar` crea o completa el esquema de la base configurada: la tabla
+# empleados con su clave primaria, el índice único de username, los índices de puesto y fecha_ingreso
+# (filtros, exportación, ajustes y nómina), la columna version y la tabla empleados_cambios. Las
+# migraciones aplicadas se anotan en esquema_version y cada una comprueba lo que ya existe, así que
+# se puede ejecutar sobre una base creada a mano. En la base de prueba, las tablas las crea
+# _ConexionPrueba al abrirse (ESQUEMA_PRUEBA) y solo faltan los índices.
+# `--verificar-indices` ejecuta EXPLAIN (EXPLAIN QUERY PLAN en SQLite) sobre cada consulta que la
+# aplicación hace al servidor y señala las que recorren una tabla entera sin que se espere.
+
+def _es_sqlite(conexion):#Indica si la conexión (medida o no) es de la base SQLite de prueba.
+    if isinstance(conexion, _ConexionMedida):
+        conexion = conexion._conexion
+    return isinstance(conexion, _ConexionPrueba)
+
+def _columnas_de(cursor, sqlite, tabla):#Devuelve los nombres de las columnas de una tabla.
+    if sqlite:
+        cursor.execute(f"PRAGMA table_info({tabla})")
+        return [fila[1] for fila in cursor.fetchall()]
+    cursor.execute("SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                   (tabla,))
+    return [fila[0] for fila in cursor.fetchall()]
+
+def _indices_de(cursor, sqlite, tabla):#Devuelve {nombre del índice: (es_único, [columnas en orden])} de una tabla.
+    indices = {}
+    if sqlite:
+        cursor.execute(f"PRAGMA index_list({tabla})")
+        for fila in cursor.fetchall():
+            cursor.execute(f"PRAGMA index_info({fila[1]})")
+            indices[fila[1]] = (bool(fila[2]), [columna[2] for columna in cursor.fetchall()])
+        return indices
+    cursor.execute("SELECT INDEX_NAME, NON_UNIQUE, COLUMN_NAME FROM information_schema.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY INDEX_NAME, SEQ_IN_INDEX", (tabla,))
+    for nombre, no_unico, columna in cursor.fetchall():
+        indices.setdefault(nombre, (not no_unico, []))[1].append(columna)
+    return indices
+
+def _crear_indice(cursor, sqlite, nombre, columnas, unico=False, tabla="empleados"):#Crea un índice salvo que ya haya uno equivalente.
+    #Uno equivalente empieza por las mismas columnas (y es único, si se pide único).
+    for existente, (es_unico, columnas_existentes) in _indices_de(cursor, sqlite, tabla).items():
+        if columnas_existentes[:len(columnas)] == list(columnas) and (es_unico or not unico):
+            print(f"    {nombre}: ya cubierto por {existente}")
+            return
+    if unico:
+        cursor.execute(f"SELECT {', '.join(columnas)}, COUNT(*) FROM {tabla} WHERE {columnas[0]} IS NOT NULL "
+                       f"GROUP BY {', '.join(columnas)} HAVING COUNT(*) > 1 LIMIT 5")
+        repetidos = cursor.fetchall()
+        if repetidos:
+            raise ValueError(f"No se puede crear {nombre}: hay valores repetidos, por ejemplo "
+                             + ", ".join(str(fila[0]) for fila in repetidos))
+    # En MySQL el índice se construye sin bloquear las escrituras de los demás operadores
+    en_linea = "" if sqlite else " ALGORITHM=INPLACE LOCK=NONE"
+    cursor.execute(f"CREATE {'UNIQUE ' if unico else ''}INDEX {nombre} ON {tabla} ({', '.join(columnas)}){en_linea}")
+    print(f"    {nombre}: creado")
+
+def _migracion_empleados(cursor, sqlite):
+    if sqlite:
+        return
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS empleados (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        nombre VARCHAR(100) NOT NULL,
+        apellido VARCHAR(100) NOT NULL,
+        puesto VARCHAR(100) NOT NULL,
+        salario DECIMAL(12, 2) NOT NULL,
+        fecha_ingreso DATE NOT NULL,
+        username VARCHAR(50) NULL,
+        password VARCHAR(255) NULL
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+def _migracion_version(cursor, sqlite):
+    if sqlite or "version" in _columnas_de(cursor, sqlite, "empleados"):
+        return
+    cursor.execute("ALTER TABLE empleados ADD COLUMN version INT NOT NULL DEFAULT 0")
+
+def _migracion_cambios(cursor, sqlite):
+    if sqlite:
+        return
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS empleados_cambios (
+        seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+        empleado_id INT NOT NULL,
+        operacion CHAR(1) NOT NULL,
+        momento TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+    """)
+
+def _migracion_ancho_password(cursor, sqlite):
+    # Las bases creadas antes de los hashes pueden tener una columna password más estrecha que un hash
+    if sqlite:
+        return
+    cursor.execute("SELECT CHARACTER_MAXIMUM_LENGTH, IS_NULLABLE, COLUMN_DEFAULT, COLLATION_NAME FROM information_schema.COLUMNS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'empleados' AND COLUMN_NAME = 'password'")
+    fila = cursor.fetchone()
+    if fila and fila[0] is not None and fila[0] < 255:
+        ancho, admite_nulos, por_defecto, intercalacion = fila
+        # MODIFY redefine la columna entera: se conserva todo lo que tenía salvo el ancho
+        sql = "ALTER TABLE empleados MODIFY password VARCHAR(255)"
+        if intercalacion:
+            sql += f" COLLATE {intercalacion}"
+        sql += " NULL" if admite_nulos == "YES" else " NOT NULL"
+        if por_defecto is not None:
+            cursor.execute(sql + " DEFAULT %s", (por_defecto,))
+        else:
+            cursor.execute(sql)
+        print(f"    password: de {ancho} a 255 caracteres")
+
+def _migracion_indices_filtros(cursor, sqlite):
+    _crear_indice(cursor, sqlite, "ix_empleados_puesto", ("puesto",))
+    _crear_indice(cursor, sqlite, "ix_empleados_fecha_ingreso", ("fecha_ingreso",))
+
+# (versión, descripción, función que la aplica sobre un cursor); se aplican en orden y una sola vez
+MIGRACIONES = [
+    (1, "Tabla empleados", _migracion_empleados),
+    (2, "Columna version de empleados", _migracion_version),
+    (3, "Tabla empleados_cambios", _migracion_cambios),
+    (4, "Índice único de username", lambda cursor, sqlite: _crear_indice(cursor, sqlite, "ux_empleados_username", ("username",), unico=True)),
+    (5, "Índices de puesto y fecha_ingreso", _migracion_indices_filtros),
+    (6, "Índice de momento en empleados_cambios (poda)",
+     lambda cursor, sqlite: _crear_indice(cursor, sqlite, "ix_empleados_cambios_momento", ("momento",), tabla="empleados_cambios")),
+    (7, "Columna password de 255 caracteres (hashes)", _migracion_ancho_password),
+]
+
+def migrar(repositorio=None):#Aplica las migraciones pendientes a la base del repositorio y devuelve las versiones aplicadas.
+    repositorio = repositorio or REPOSITORIO
+    aplicadas = []
+    with repositorio.conexion() as conexion:
+        sqlite = _es_sqlite(conexion)
+        cursor = conexion.cursor()
+        try:
+            cursor.execute("CREATE TABLE IF NOT EXISTS esquema_version (version INT PRIMARY KEY, descripcion VARCHAR(200) NOT NULL, "
+                           "aplicada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)")
+            cursor.execute("SELECT version FROM esquema_version")
+            hechas = {fila[0] for fila in cursor.fetchall()}
+            for version, descripcion, aplicar in MIGRACIONES:
+                if version in hechas:
+                    continue
+                print(f"  [{version}] {descripcion}")
+                aplicar(cursor, sqlite)
+                cursor.execute("INSERT INTO esquema_version (version, descripcion) VALUES (%s, %s)", (version, descripcion))
+                conexion.commit()
+                aplicadas.append(version)
+        finally:
+            cursor.close()
+    ultima = MIGRACIONES[-1][0]
+    print(f"Esquema en la versión {ultima}" + (f" ({len(aplicadas)} migraciones aplicadas)." if aplicadas else "; no había nada que aplicar."))
+    borradas = repositorio.podar_cambios()
+    if borradas:
+        print(f"Borradas {borradas} anotaciones de empleados_cambios con más de {CAMBIOS_RETENCION_DIAS} días.")
+    return aplicadas
+
+# Consultas que la aplicación hace al servidor (las constantes SQL_ que ejecuta el repositorio),
+# con parámetros de ejemplo. Las altas con VALUES no leen la tabla y no se incluyen. Las marcadas
+# como recorrido esperado leen la tabla entera a propósito (contar, exportar, cargar la nómina
+# completa o ajustar a toda la plantilla) o la recorren en orden de ID hasta su LIMIT. Al añadir
+# una consulta, añadirla aquí.
+_EJEMPLO_DATOS = ("A", "B", "C", 1, date(2020, 1, 1), 1)
+_EJEMPLO_AJUSTE = [1.05, 0]
+CONSULTAS_APLICACION = [
+    ("contar", SQL_CONTAR, (), True),
+    ("listar", SQL_LISTAR, (0, TAMANO_PAGINA), False),
+    ("obtener", SQL_OBTENER, (1,), False),
+    ("credenciales", SQL_CREDENCIALES, ("admin",), False),
+    ("nombre_de", SQL_NOMBRE_DE, (1,), False),
+    ("guardar_contrasena", SQL_GUARDAR_CONTRASENA, ("x", 1, "admin"), False),
+    ("actualizar", SQL_ACTUALIZAR, _EJEMPLO_DATOS, False),
+    ("actualizar/version", SQL_ACTUALIZAR + SQL_SI_VERSION, _EJEMPLO_DATOS + (0,), False),
+    ("eliminar", SQL_ELIMINAR, (1,), False),
+    ("eliminar/version", SQL_ELIMINAR + SQL_SI_VERSION, (1, 0), False),
+    ("aplicar_lote/modificar", SQL_ACTUALIZAR + SQL_SI_VERSION, _EJEMPLO_DATOS + (0,), False),
+    ("aplicar_lote/eliminar", SQL_ELIMINAR + SQL_SI_VERSION, (1, 0), False),
+    ("marca_sincronizacion", SQL_MARCA, (), False),
+    ("primera_marca", SQL_PRIMERA_MARCA, (), False),
+    ("cambios_desde", SQL_CAMBIOS_DESDE, (0, SINCRONIZACION_LOTE), False),
+    ("cambios_desde/empleados", SQL_EMPLEADOS_EN.format(marcas="%s, %s, %s"), (1, 2, 3), False),
+    ("podar_cambios/limites", SQL_PODA_LIMITES, ("2020-01-01 00:00:00",), False),
+    ("podar_cambios/tramo", SQL_PODA_TRAMO, (1, 1 + CAMBIOS_PODA_TRAMO), False),
+    ("recorrer", SQL_RECORRER.format(donde=""), (), True),
+    ("previsualizar_ajuste", SQL_AJUSTE_RESUMEN.format(donde=""), _EJEMPLO_AJUSTE * 2, True),
+    ("previsualizar_ajuste/muestra", SQL_AJUSTE_MUESTRA.format(donde=""), _EJEMPLO_AJUSTE + [50], True),
+    ("ajustar_salarios/limites", SQL_AJUSTE_LIMITES.format(y_filtro=""), (0,), False),
+    ("ajustar_salarios/tramo", SQL_AJUSTE_TRAMO.format(y_filtro=""), _EJEMPLO_AJUSTE + [1, 1 + AJUSTE_TRAMO], False),
+    ("ajustar_salarios/anotar", SQL_AJUSTE_ANOTAR.format(y_filtro=""), (1, 1 + AJUSTE_TRAMO), False),
+    ("bd_columnas_nomina", SQL_COLUMNAS_NOMINA, (), True),
+]
+
+def _consultas_filtradas():#Variantes de CONSULTAS_APLICACION con cada filtro de exportación y ajuste (puesto, fechas o ambos).
+    consultas = []
+    for variante, filtro in (("puesto", {"puesto": "Gerente"}),
+                             ("fechas", {"desde": date(2020, 1, 1), "hasta": date(2020, 12, 31)}),
+                             ("puesto+fechas", {"puesto": "Gerente", "desde": date(2020, 1, 1), "hasta": date(2020, 12, 31)})):
+        condiciones, parametros = RepositorioEmpleados._filtro(**filtro)
+        donde = " WHERE " + " AND ".join(condiciones)
+        y_filtro = "".join(f" AND {condicion}" for condicion in condiciones)
+        consultas += [
+            (f"recorrer/{variante}", SQL_RECORRER.format(donde=donde), parametros, False),
+            (f"previsualizar_ajuste/{variante}", SQL_AJUSTE_RESUMEN.format(donde=donde), _EJEMPLO_AJUSTE * 2 + parametros, False),
+            (f"previsualizar_ajuste/muestra/{variante}", SQL_AJUSTE_MUESTRA.format(donde=donde),
+             _EJEMPLO_AJUSTE + parametros + [50], False),
+            (f"ajustar_salarios/limites/{variante}", SQL_AJUSTE_LIMITES.format(y_filtro=y_filtro), [0] + parametros, False),
+            (f"ajustar_salarios/tramo/{variante}", SQL_AJUSTE_TRAMO.format(y_filtro=y_filtro),
+             _EJEMPLO_AJUSTE + [1, 1 + AJUSTE_TRAMO] + parametros, False),
+            (f"ajustar_salarios/anotar/{variante}", SQL_AJUSTE_ANOTAR.format(y_filtro=y_filtro),
+             [1, 1 + AJUSTE_TRAMO] + parametros, False),
+        ]
+    return consultas
+
+CONSULTAS_APLICACION += _consultas_filtradas()
+
+def _plan(cursor, sqlite, sql, parametros):#Devuelve [(tabla o detalle, recorre_entera, ordena_aparte, texto)] del plan de una consulta.
+    if sqlite:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, parametros)
+        pasos = []
+        for fila in cursor.fetchall():
+            detalle = fila[-1]
+            pasos.append((detalle, detalle.startswith("SCAN ") and "empleados" in detalle, "TEMP B-TREE" in detalle, detalle))
+        return pasos
+    cursor.execute("EXPLAIN " + sql, parametros)
+    columnas = [columna[0] for columna in cursor.description]
+    pasos = []
+    for fila in cursor.fetchall():
+        fila = dict(zip(columnas, fila))
+        if fila.get('select_type') == "INSERT":
+            continue # La tabla en la que se inserta no se lee
+        extra = fila.get('Extra') or ""
+        texto = f"{fila.get('table')}: type={fila.get('type')} key={fila.get('key')} rows={fila.get('rows')} {extra}".strip()
+        pasos.append((fila.get('table'), fila.get('type') in ("ALL", "index"), "filesort" in extra, texto))
+    return pasos
+
+def verificar_indices(repositorio=None):#Muestra el plan de cada consulta de la aplicación y devuelve cuántas recorren una tabla entera sin esperarse.
+    repositorio = repositorio or REPOSITORIO
+    problemas = 0
+    with repositorio.conexion() as conexion:
+        sqlite = _es_sqlite(conexion)
+        cursor = conexion.cursor()
+        try:
+            ancho = max(len(consulta[0]) for consulta in CONSULTAS_APLICACION) + 2
+            for nombre, sql, parametros, recorrido_esperado in CONSULTAS_APLICACION:
+                pasos = _plan(cursor, sqlite, sql, parametros)
+                recorre = any(paso[1] for paso in pasos)
+                if recorre and not recorrido_esperado:
+                    estado = "RECORRIDO COMPLETO"
+                    problemas += 1
+                elif recorre:
+                    estado = "recorrido esperado"
+                else:
+                    estado = "ok"
+                if any(paso[2] for paso in pasos):
+                    estado += ", ordena aparte"
+                print(f"{nombre:<{ancho}}{estado}")
+                for paso in pasos:
+                    print(f"{'':<4}{paso[3]}")
+        finally:
+            cursor.close()
+            conexion.rollback()
+    print(f"\n{problemas} consultas recorren una tabla entera sin que se espere." if problemas else
+          "\nNinguna consulta recorre una tabla entera sin que se espere.")
+    return problemas
+
+
+# Modo benchmark
+# Mide las operaciones del repositorio sobre una base SQLite en memoria con empleados sintéticos.
+# Uso: python Proyecto_final.py --benchmark [N ...] [--salida resultados.jsonl]
+
+_NOMBRES_SINTETICOS = ["Ana", "Luis", "María", "José", "Carmen", "Javier", "Lucía", "Andrés", "Sofía", "Íñigo"]
+_APELLIDOS_SINTETICOS = ["García", "Pérez", "López", "Martínez", "Sánchez", "Núñez", "Gómez", "Díaz", "Peña", "Ruiz"]
+_PUESTOS_SINTETICOS = ["Analista", "Desarrollador", "Gerente", "Contador", "Técnico", "Recepcionista", "Vendedor"]
+
+def sembrar_empleados(repositorio, cantidad, semilla=0, lote=10000):#Inserta `cantidad` empleados sintéticos con usuario y contraseña.
+    #Los usuarios se llaman usuario0, usuario1, ... y sus contraseñas clave0, clave1, ... (en claro, como las
+    #de antes de los hashes: se convierten en el primer inicio de sesión de cada uno).
+    azar = random.Random(semilla)
+    inicio = date(2000, 1, 1).toordinal()
+    sql = ("INSERT INTO empleados (nombre, apellido, puesto, salario, fecha_ingreso, username, password) "
+           "VALUES (%s, %s, %s, %s, %s, %s, %s)")
+    with repositorio.conexion() as conexion:
+        cursor = conexion.cursor()
+        try:
+            for desde in range(0, cantidad, lote):
+                filas = [(azar.choice(_NOMBRES_SINTETICOS), azar.choice(_APELLIDOS_SINTETICOS), azar.choice(_PUESTOS_SINTETICOS),
+                          round(azar.uniform(800, 9000), 2), date.fromordinal(inicio + azar.randrange(9000)),
+                          f"usuario{i}", f"clave{i}")
+                         for i in range(desde, min(desde + lote, cantidad))]
+                cursor.executemany(sql, filas)
+                conexion.commit()
+        finally:
+            cursor.close()
+
+def _medir(operacion, repeticiones):#Ejecuta `operacion(i)` varias veces y devuelve las duraciones en segundos.
+    duraciones = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        operacion(i)
+        duraciones.append(time.perf_counter() - inicio)
+    return duraciones
+
+def _estadisticas(duraciones, filas_por_operacion=1):#Resume una lista de duraciones (en segundos).
+    ordenadas = sorted(duraciones)
+    total = sum(ordenadas)
+    return {
+        "repeticiones": len(ordenadas),
+        "p50_ms": ordenadas[len(ordenadas) // 2] * 1000,
+        "p95_ms": ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))] * 1000,
+        "media_ms": total / len(ordenadas) * 1000,
+        "operaciones_s": len(ordenadas) / total if total else float("inf"),
+        "filas_s": len(ordenadas) * filas_por_operacion / total if total else float("inf")
+    }
+
+def benchmark_repositorio(cantidad, repeticiones=200, visibles=30):#Mide cada operación del repositorio con `cantidad` empleados.
+    #Devuelve un diccionario operación -> estadísticas.
+    repositorio = RepositorioEmpleados.en_memoria(f"benchmark_{cantidad}_{os.getpid()}")
+    try:
+        inicio = time.perf_counter()
+        sembrar_empleados(repositorio, cantidad)
+        resultados = {"sembrar": _estadisticas([time.perf_counter() - inicio], cantidad)}
+
+        azar = random.Random(1)
+        maximo = repositorio.contar()  # Los IDs van de 1 a maximo (incluye el usuario inicial)
+        ids = [azar.randint(1, maximo) for _ in range(repeticiones)]
+
+        resultados["contar"] = _estadisticas(_medir(lambda i: repositorio.contar(), min(repeticiones, 20)))
+        resultados["listar"] = _estadisticas(_medir(lambda i: repositorio.listar(ids[i] - 1, TAMANO_PAGINA), repeticiones), TAMANO_PAGINA)
+        resultados["obtener"] = _estadisticas(_medir(lambda i: repositorio.obtener(ids[i]), repeticiones))
+        resultados["credenciales"] = _estadisticas(_medir(lambda i: repositorio.credenciales(f"usuario{ids[i] % cantidad}"), repeticiones))
+
+        nuevos = []
+        resultados["insertar"] = _estadisticas(_medir(
+            lambda i: nuevos.append(repositorio.insertar("Bench", "Prueba", "Analista", 1000.0, date(2024, 1, 1))), repeticiones))
+        resultados["actualizar"] = _estadisticas(_medir(
+            lambda i: repositorio.actualizar(ids[i], "Bench", "Prueba", "Gerente", 2000.0, date(2024, 1, 2)), repeticiones))
+        resultados["eliminar"] = _estadisticas(_medir(lambda i: repositorio.eliminar(nuevos[i]), repeticiones))
+
+        # Dibujar la lista: lo que hace la lista virtual al desplazarse (formatear las filas visibles)
+        modelo = ModeloEmpleados()
+        filas, fin = repositorio.listar(0, min(cantidad, 50 * TAMANO_PAGINA))
+        modelo.agregar_pagina(filas)
+        posiciones = [azar.randrange(max(1, len(modelo) - visibles)) for _ in range(repeticiones)]
+        resultados["formatear_visibles"] = _estadisticas(_medir(
+            lambda i: [formatear_empleado(modelo.en(j)) for j in range(posiciones[i], min(posiciones[i] + visibles, len(modelo)))],
+            repeticiones), visibles)
+
+        # Ordenar y filtrar todos los empleados cargados, como la vista al pulsar una columna o filtrar
+        completo = ModeloEmpleados()
+        while True:
+            filas, fin = repositorio.listar(completo.ultimo_id, 50 * TAMANO_PAGINA)
+            completo.agregar_pagina(filas)
+            if fin or not filas:
+                break
+        ordenes = [[(columna, False)] for columna in COLUMNAS_ORDEN if columna != "id"] + \
+                  [[("puesto", False), ("salario", True)], [("apellido", False), ("nombre", False), ("fecha_ingreso", True)]]
+        vista = VistaOrdenada(completo)
+        np.zeros(0)  # numpy se importa al primer uso: que no cuente en la primera medición
+
+        def ordenar(i, vista=vista):
+            vista.orden = ordenes[i % len(ordenes)]
+            vista.ids()
+
+        # La primera vez se calculan las claves; después se reutilizan las permutaciones guardadas
+        resultados["ordenar_primera"] = _estadisticas(_medir(
+            lambda i: ordenar(i, VistaOrdenada(completo)), min(repeticiones, 2 * len(ordenes))), len(completo))
+        resultados["ordenar_cacheado"] = _estadisticas(_medir(ordenar, repeticiones), len(completo))
+        salarios = [azar.uniform(800, 9000) for _ in range(repeticiones)]
+
+        def filtrar(i):
+            vista.filtros = {"salario": (salarios[i], salarios[i] + 2000), "puesto": _PUESTOS_SINTETICOS[i % len(_PUESTOS_SINTETICOS)]}
+            vista.ids()
+
+        resultados["filtrar_ordenado"] = _estadisticas(_medir(filtrar, repeticiones), len(completo))
+
+        # Y, si hay pantalla, además escribirlas en un Listbox real
+        try:
+            raiz = tk.Tk()
+        except tk.TclError:
+            raiz = None
+        if raiz is not None:
+            raiz.withdraw()
+            lista = tk.Listbox(raiz, height=visibles)
+
+            def dibujar(i):
+                lista.delete(0, tk.END)
+                lista.insert(0, *[formatear_empleado(modelo.en(j)) for j in range(posiciones[i], min(posiciones[i] + visibles, len(modelo)))])
+                raiz.update_idletasks()
+
+            resultados["dibujar_lista_tk"] = _estadisticas(_medir(dibujar, repeticiones), visibles)
+            raiz.destroy()
+        return resultados
+    finally:
+        repositorio.pool.cerrar_todo()
+
+def ejecutar_benchmark(tamanos, salida=None, repeticiones=200):#Ejecuta el benchmark para cada tamaño, lo muestra y opcionalmente lo añade a un archivo JSON Lines.
+    fecha = datetime.now().isoformat(timespec="seconds")
+    for cantidad in tamanos:
+        print(f"\n== {cantidad:,} empleados ==")
+        print(f"{'operación':<20}{'p50 ms':>10}{'p95 ms':>10}{'ops/s':>12}{'filas/s':>14}")
+        resultados = benchmark_repositorio(cantidad, repeticiones)
+        for operacion, datos in resultados.items():
+            print(f"{operacion:<20}{datos['p50_ms']:>10.3f}{datos['p95_ms']:>10.3f}{datos['operaciones_s']:>12,.0f}{datos['filas_s']:>14,.0f}")
+        if salida:
+            with open(salida, "a", encoding="utf-8") as f:
+                for operacion, datos in resultados.items():
+                    f.write(json.dumps({"fecha": fecha, "backend": "sqlite-memoria", "empleados": cantidad,
+                                        "operacion": operacion, **datos}) + "\n")
+
+
+# Benchmark de inicio de sesión
+# Simula un cambio de turno: muchos operadores inician sesión a la vez contra una base SQLite local.
+# Uso: python Proyecto_final.py --benchmark-login [N] [--salida resultados.jsonl]
+# N es el número de inicios de sesión de cada ronda; RRHH_HASH y RRHH_HASH_COSTE cambian el coste del hash.
+
+def benchmark_login(usuarios=100, hilos=8, salida=None):#Mide el rendimiento del inicio de sesión con `usuarios` intentos simultáneos por ronda.
+    import shutil
+    import tempfile
+    # Base en un archivo y no en memoria: con caché compartida las escrituras simultáneas fallarían
+    # en lugar de esperar, y los hashes que se rehacen en el primer acceso son escrituras simultáneas
+    carpeta = tempfile.mkdtemp(prefix="rrhh_login_")
+    ruta = os.path.join(carpeta, "login.db")
+    repositorio = RepositorioEmpleados(PoolConexiones(lambda: _ConexionPrueba(ruta), tamano_maximo=POOL_CONFIG["tamano_maximo"]))
+    servicio = ServicioAutenticacion(repositorio, **AUTENTICACION_CONFIG)
+    bloqueados = min(10, usuarios)
+
+    def ronda(intentos):
+        def intentar(credenciales):
+            inicio = time.perf_counter()
+            try:
+                aceptado = servicio.autenticar(*credenciales) is not None
+            except AccesoBloqueadoError:
+                aceptado = False
+            return time.perf_counter() - inicio, aceptado
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(hilos) as hilos_login:
+            medidas = list(hilos_login.map(intentar, intentos))
+        total = time.perf_counter() - inicio
+        datos = _estadisticas([duracion for duracion, _ in medidas])
+        datos.update(inicios_s=len(intentos) / total, aceptados=sum(aceptado for _, aceptado in medidas))
+        return datos
+
+    try:
+        sembrar_empleados(repositorio, usuarios)
+        resultados = {
+            "primer_acceso": ronda([(f"usuario{i}", f"clave{i}") for i in range(usuarios)]),      # En claro: se rehace el hash
+            "acceso_con_hash": ronda([(f"usuario{i}", f"clave{i}") for i in range(usuarios)]),
+            "contrasena_erronea": ronda([(f"usuario{i}", "incorrecta") for i in range(usuarios)]),
+            "usuario_inexistente": ronda([(f"nadie{i}", "incorrecta") for i in range(usuarios)]),
+        }
+        for i in range(bloqueados):
+            for _ in range(servicio.intentos):
+                servicio._anotar_fallo(f"usuario{i}", time.monotonic())
+        resultados["usuario_bloqueado"] = ronda([(f"usuario{i % bloqueados}", f"clave{i % bloqueados}") for i in range(usuarios)])
+
+        with repositorio.conexion() as conexion:
+            cursor = conexion.cursor()
+            try:
+                cursor.execute("SELECT COUNT(*) FROM empleados WHERE password LIKE %s", (f"{servicio.algoritmo}$%",))
+                con_hash = cursor.fetchone()[0]
+            finally:
+                cursor.close()
+    finally:
+        repositorio.pool.cerrar_todo()
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+    print(f"\n== {usuarios} inicios de sesión por ronda, {hilos} hilos, {servicio.algoritmo} con coste {servicio.coste} ==")
+    print(f"{'ronda':<22}{'p50 ms':>10}{'p95 ms':>10}{'inicios/s':>12}{'aceptados':>11}")
+    for nombre, datos in resultados.items():
+        print(f"{nombre:<22}{datos['p50_ms']:>10.2f}{datos['p95_ms']:>10.2f}{datos['inicios_s']:>12,.1f}{datos['aceptados']:>11}")
+    print(f"Contraseñas guardadas con hash tras la primera ronda: {con_hash} de {usuarios}")
+    if salida:
+        fecha = datetime.now().isoformat(timespec="seconds")
+        with open(salida, "a", encoding="utf-8") as f:
+            for nombre, datos in resultados.items():
+                f.write(json.dumps({"fecha": fecha, "backend": "sqlite-archivo", "usuarios": usuarios, "hilos": hilos,
+                                    "algoritmo": servicio.algoritmo, "coste": servicio.coste, "operacion": nombre, **datos}) + "\n")
+    return resultados
+
+
+# Informe de memoria
+# Compara cuánto ocupan los empleados cargados como diccionarios (como los entrega el cursor) y en
+# ModeloEmpleados, medido con tracemalloc. Uso: python Proyecto_final.py --informe-memoria [N] [--salida archivo.jsonl]
+# Sin N se cargan los empleados de la base configurada; con N, N empleados sintéticos en memoria.
+
+def _memoria_de(construir):#Ejecuta construir() y devuelve (resultado, bytes que siguen ocupados por lo que construyó).
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    try:
+        resultado = construir()
+        gc.collect()
+        return resultado, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+def informe_memoria(cantidad=None, salida=None):#Mide la memoria por empleado de cada representación, la muestra y opcionalmente la añade a un archivo JSON Lines.
+    repositorio = REPOSITORIO
+    if cantidad is not None:
+        repositorio = RepositorioEmpleados.en_memoria(f"memoria_{cantidad}_{os.getpid()}")
+        sembrar_empleados(repositorio, cantidad)
+
+    def paginas():
+        ultimo_id, fin = 0, False
+        while not fin:
+            filas, fin = repositorio.listar(ultimo_id, 50 * TAMANO_PAGINA)
+            if not filas:
+                break
+            ultimo_id = filas[-1]['id']
+            yield filas
+
+    def diccionarios(formatear=False):
+        registros, ids, lineas = {}, [], []
+        for filas in paginas():
+            for fila in filas:
+                registros[fila['id']] = fila
+                ids.append(fila['id'])
+                if formatear:
+                    lineas.append(formatear_empleado(fila))
+        return registros, ids, lineas
+
+    def columnas():
+        modelo = ModeloEmpleados()
+        for filas in paginas():
+            modelo.agregar_pagina(filas)
+        return modelo
+
+    def indice():
+        indice_busqueda = IndiceBusqueda()
+        for filas in paginas():
+            indice_busqueda.agregar(filas)
+        return indice_busqueda
+
+    try:
+        (registros, _, _), bytes_diccionarios = _memoria_de(diccionarios)
+        empleados = len(registros)
+        del registros
+        _, bytes_lineas = _memoria_de(lambda: diccionarios(formatear=True))
+        modelo, bytes_columnas = _memoria_de(columnas)
+        _, bytes_indice = _memoria_de(indice)
+    finally:
+        if cantidad is not None:
+            repositorio.pool.cerrar_todo()
+
+    if not empleados:
+        print("No hay empleados que medir.")
+        return
+    medidas = {"diccionarios": bytes_diccionarios, "diccionarios_y_lineas": bytes_lineas,
+               "columnas": bytes_columnas, "indice_busqueda": bytes_indice}
+    print(f"\n== {empleados:,} empleados ({len(modelo.puestos)} puestos, {len(modelo.textos) / empleados:.1f} bytes de nombre y apellido por empleado) ==")
+    print(f"{'representación':<40}{'MB':>10}{'bytes/empleado':>16}")
+    for nombre, texto in (("diccionarios", "Diccionarios del cursor (modelo anterior)"),
+                          ("diccionarios_y_lineas", "Diccionarios + línea formateada por fila"),
+                          ("columnas", "Columnas (ModeloEmpleados)"),
+                          ("indice_busqueda", "Índice de búsqueda (aparte)")):
+        print(f"{texto:<40}{medidas[nombre] / 1e6:>10.1f}{medidas[nombre] / empleados:>16.1f}")
+    print(f"Reducción diccionarios -> columnas: {bytes_diccionarios / bytes_columnas:.1f}x")
+    if salida:
+        with open(salida, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"fecha": datetime.now().isoformat(timespec="seconds"), "empleados": empleados,
+                                "origen": "sintetico" if cantidad is not None else ("prueba" if MODO_PRUEBA else "mysql"),
+                                **{f"{nombre}_bytes": valor for nombre, valor in medidas.items()}}) + "\n")
+
+
+# Modo de medición del arranque
+# Abre la ventana de inicio de sesión como un arranque normal, anota cuándo está visible y cuándo
+# quedó lista la conexión precalentada, y sale. Uso: python Proyecto_final.py --medir-arranque [--salida archivo.jsonl]
+
+MODULOS_PESADOS = ("mysql.connector", "numpy", "PIL.Image", "urllib.request")
+
+def medir_arranque(salida=None, espera_maxima=15.0):#Mide los tiempos de arranque desde el inicio del proceso, los muestra y opcionalmente los añade a un archivo JSON Lines.
+    tiempos = {"modulo_importado": time.perf_counter() - _INICIO_PROCESO}
+    root = tk.Tk()
+    login_app = LoginApp(root)
+    tiempos["login_construido"] = time.perf_counter() - _INICIO_PROCESO
+    resultado = {}
+
+    def ventana_visible():
+        root.update_idletasks()
+        tiempos["ventana_visible"] = time.perf_counter() - _INICIO_PROCESO
+        resultado["modulos_pesados_al_mostrar"] = [m for m in MODULOS_PESADOS if m in sys.modules]
+        esperar_conexion()
+
+    def esperar_conexion():
+        if login_app.conexion_lista is None and time.perf_counter() - _INICIO_PROCESO < espera_maxima:
+            root.after(5, esperar_conexion)
+            return
+        if login_app.conexion_lista is not None:
+            tiempos["conexion_lista"] = login_app.conexion_lista - _INICIO_PROCESO
+        login_app.ejecutor.cerrar()
+        root.destroy()
+
+    root.after(0, ventana_visible)
+    root.mainloop()
+
+    print(f"{'fase':<24}{'ms desde el inicio':>20}")
+    for fase, segundos in tiempos.items():
+        print(f"{fase:<24}{segundos * 1000:>20.1f}")
+    if "conexion_lista" not in tiempos:
+        print(f"La conexión no quedó lista en {espera_maxima:.0f} s")
+    print("Módulos pesados cargados al mostrar la ventana: " + (", ".join(resultado["modulos_pesados_al_mostrar"]) or "ninguno"))
+    if salida:
+        with open(salida, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"fecha": datetime.now().isoformat(timespec="seconds"), "modo": "prueba" if MODO_PRUEBA else "mysql",
+                                **{f"{fase}_ms": round(segundos * 1000, 1) for fase, segundos in tiempos.items()},
+                                **resultado}, ensure_ascii=False) + "\n")
+
 
 # Bloque de ejecución principal
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sistema de Gestión de Recursos Humanos")
+    parser.add_argument("--benchmark", nargs="*", type=int, metavar="N",
+                        help="Mide las operaciones con N empleados sintéticos (por defecto 1000 100000 1000000) y sale")
+    parser.add_argument("--medir-arranque", action="store_true",
+                        help="Abre la ventana de inicio de sesión, mide cuánto tarda en estar lista y sale")
+    parser.add_argument("--informe-memoria", nargs="?", const=0, type=int, metavar="N",
+                        help="Mide la memoria por empleado de la lista cargada (de la base configurada o de N empleados sintéticos) y sale")
+    parser.add_argument("--benchmark-login", nargs="?", const=100, type=int, metavar="N",
+                        help="Mide el inicio de sesión con N intentos simultáneos por ronda (100 por defecto) y sale")
+    parser.add_argument("--migrar", action="store_true",
+                        help="Crea o completa las tablas e índices de la base configurada y sale")
+    parser.add_argument("--verificar-indices", action="store_true",
+                        help="Muestra el plan (EXPLAIN) de cada consulta de la aplicación, señala los recorridos completos y sale")
+    parser.add_argument("--salida", help="Archivo JSON Lines al que se añaden los resultados del benchmark, --benchmark-login, --medir-arranque o --informe-memoria")
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        ejecutar_benchmark(args.benchmark or [1000, 100000, 1000000], args.salida)
+        raise SystemExit
+
+    if args.benchmark_login is not None:
+        benchmark_login(args.benchmark_login, salida=args.salida)
+        raise SystemExit
+
+    if args.migrar or args.verificar_indices:
+        try:
+            if args.migrar:
+                migrar()
+            problemas = verificar_indices() if args.verificar_indices else 0
+        finally:
+            POOL.cerrar_todo()
+        raise SystemExit(1 if problemas else 0)
+
+    if args.informe_memoria is not None:
+        informe_memoria(args.informe_memoria or None, args.salida)
+        POOL.cerrar_todo()
+        raise SystemExit
+
+    if args.medir_arranque:
+        medir_arranque(args.salida)
+        POOL.cerrar_todo()
+        raise SystemExit
+
     # Crea la ventana raíz de Tkinter para la aplicación de inicio de sesión
     root_login = tk.Tk()
     # Inicializa la aplicación de inicio de sesión
     login_app = LoginApp(root_login)
     # Inicia el bucle de eventos de Tkinter para la ventana de inicio de sesión
-    root_login.mainloop()
\ No newline at end of file
+    root_login.mainloop()
+    # Cierra las conexiones que quedan en el pool al salir de la aplicación
+    POOL.cerrar_todo()
+    if METRICAS.activa:
+        print(f"Métricas guardadas en {METRICAS.exportar()}")
\ No newline at end of file
@@ -0,0 +1,527 @@
+# Pruebas de Proyecto_final sobre bases SQLite en memoria (no necesitan MySQL ni pantalla).
+# Uso: python -m pytest -q
+from datetime import date
+import itertools
+
+import pytest
+
+import Proyecto_final as rrhh
+
+_BASES = itertools.count()
+
+def repositorio(cantidad=0):#Devuelve un repositorio sobre una base en memoria nueva con `cantidad` empleados sintéticos.
+    repo = rrhh.RepositorioEmpleados.en_memoria(f"pruebas{next(_BASES)}")
+    if cantidad:
+        rrhh.sembrar_empleados(repo, cantidad)
+    return repo
+
+def datos(nombre, apellido="Pérez", puesto="Analista", salario=1500.0):
+    return {'nombre': nombre, 'apellido': apellido, 'puesto': puesto, 'salario': salario,
+            'fecha_ingreso': date(2024, 3, 1)}
+
+def envejecer_cambios(repo, hasta_seq, dias):#Hace que las anotaciones hasta `hasta_seq` parezcan de hace `dias` días.
+    with repo.conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("UPDATE empleados_cambios SET momento = datetime('now', %s) WHERE seq <= %s", (f"-{dias} days", hasta_seq))
+        conexion.commit()
+        cursor.close()
+
+
+def test_podar_cambios_borra_por_tramos_solo_lo_anterior_a_la_retencion():
+    repo = repositorio(30)
+    for empleado_id in range(1, 26):
+        repo.actualizar(empleado_id, f"Nombre{empleado_id}", "Pérez", "Analista", 1000, date(2020, 1, 1))
+    envejecer_cambios(repo, 20, rrhh.CAMBIOS_RETENCION_DIAS + 1)
+
+    assert repo.podar_cambios(tramo=7) == 20
+    assert repo.primera_marca() == 21
+    assert repo.marca_sincronizacion() == 25
+    assert repo.podar_cambios() == 0
+
+
+def test_podar_cambios_conserva_siempre_la_ultima_anotacion():
+    repo = repositorio(5)
+    for empleado_id in range(1, 6):
+        repo.eliminar(empleado_id)
+    envejecer_cambios(repo, 5, 30)
+
+    assert repo.podar_cambios() == 4
+    assert repo.primera_marca() == repo.marca_sincronizacion() == 5
+
+
+def test_novedades_pide_recargar_si_se_podaron_cambios_sin_leer():
+    repo = repositorio(10)
+    for empleado_id in range(1, 11):
+        repo.actualizar(empleado_id, "Ana", "Pérez", "Analista", 1000, date(2020, 1, 1))
+    marca_al_dia, marca_atrasada = repo.marca_sincronizacion(), 3
+    envejecer_cambios(repo, 8, 30)
+    repo.podar_cambios()
+
+    assert repo.novedades(marca_atrasada) is None
+    assert repo.novedades(marca_al_dia) == (marca_al_dia, [], None)
+    assert repo.novedades(marca_al_dia + 100) is None # La base se restauró desde una copia anterior
+    repo.actualizar(1, "Eva", "Pérez", "Analista", 1000, date(2020, 1, 1))
+    nueva_marca, cambios, total = repo.novedades(marca_al_dia)
+    assert nueva_marca == marca_al_dia + 1 and total == repo.contar()
+    assert [empleado_id for empleado_id, _ in cambios][-1] == 1
+
+
+def test_aplicar_lote_alta_y_modificacion_con_id_temporal():
+    # Con empleados ya sembrados, el ID asignado al alta y el seq de su anotación no coinciden
+    repo = repositorio(50)
+    resultados = repo.aplicar_lote([('A', -1, datos("Ana"), 0), ('M', -1, datos("Ana María"), 0)])
+
+    (alta_ok, nuevo_id, _), (modificacion_ok, modificado_id, version) = resultados
+    assert alta_ok and modificacion_ok
+    assert nuevo_id == modificado_id
+    assert version == 1
+    assert repo.obtener(nuevo_id)['nombre'] == "Ana María"
+    assert repo.obtener(1)['version'] == 0 # El empleado con ID igual al seq no se toca
+
+
+def test_reproducir_diario_alta_y_modificacion_sobre_el_id_temporal(tmp_path):
+    repo = repositorio(50)
+    diario = rrhh.DiarioEscrituras(str(tmp_path / "diario.db"))
+    temporal = diario.anotar('A', None, datos("Ana"))
+    assert diario.anotar('M', temporal, datos("Ana María"), version=0) == temporal
+
+    resultado = diario.reproducir(repo)
+    assert resultado["error"] is None and not resultado["rechazadas"] and len(diario) == 0
+    alta, modificacion = resultado["aplicadas"]
+    assert alta["asignado"] == modificacion["asignado"] > 50
+    assert repo.obtener(alta["asignado"])['nombre'] == "Ana María"
+    diario.cerrar()
+
+
+def test_reproducir_diario_rechaza_una_modificacion_con_version_antigua(tmp_path):
+    repo = repositorio(10)
+    diario = rrhh.DiarioEscrituras(str(tmp_path / "diario.db"))
+    diario.anotar('M', 5, datos("Sin conexión"), version=0)
+    repo.actualizar(5, "Otro", "Operador", "Gerente", 3000, date(2021, 1, 1), version=0)
+
+    resultado = diario.reproducir(repo)
+    assert not resultado["aplicadas"] and len(diario) == 0
+    [rechazada] = resultado["rechazadas"]
+    assert rechazada["motivo"] == "Otro usuario lo modificó"
+    assert rechazada["actual"]['version'] == 1
+    assert repo.obtener(5)['nombre'] == "Otro" # No se pisa el cambio del otro operador
+    diario.cerrar()
+
+
+def test_reproducir_diario_baja_de_un_empleado_ya_borrado(tmp_path):
+    repo = repositorio(10)
+    diario = rrhh.DiarioEscrituras(str(tmp_path / "diario.db"))
+    diario.anotar('B', 6, version=0)
+    repo.eliminar(6)
+
+    resultado = diario.reproducir(repo)
+    assert [entrada["asignado"] for entrada in resultado["aplicadas"]] == [6] and not resultado["rechazadas"]
+    with repo.conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("SELECT COUNT(*) FROM empleados_cambios WHERE empleado_id = %s AND operacion = 'B'", (6,))
+        assert cursor.fetchone()[0] == 1 # La baja repetida no se vuelve a anotar
+        cursor.close()
+    diario.cerrar()
+
+
+def test_modelo_actualizar_repetidamente_compacta_sin_perder_textos():
+    modelo = rrhh.ModeloEmpleados()
+    modelo.agregar_pagina([dict(datos(f"Nombre{i}"), id=i, version=0) for i in range(1, 11)])
+    compactaciones = 0
+    for vuelta in range(200):
+        antes = len(modelo.textos)
+        modelo.actualizar(dict(datos(f"Cambio{vuelta}", f"Apellido{vuelta}"), id=3, version=vuelta))
+        compactaciones += len(modelo.textos) < antes
+        assert modelo.obtener(3)['nombre'] == f"Cambio{vuelta}"
+        assert modelo.obtener(3)['apellido'] == f"Apellido{vuelta}"
+        # Todo lo que hay en el búfer y no usa ninguna fila está contado como basura
+        assert modelo._basura == len(modelo.textos) - sum(modelo.longitudes)
+    assert compactaciones > 0
+    assert [modelo.en(i)['nombre'] for i in (0, 1, 3, 9)] == ["Nombre1", "Nombre2", "Nombre4", "Nombre10"]
+
+
+def test_modelo_eliminar_cuenta_como_basura_el_texto_de_la_fila_borrada():
+    modelo = rrhh.ModeloEmpleados()
+    modelo.agregar_pagina([dict(datos(f"Nombre{i}"), id=i, version=0) for i in range(1, 21)])
+    for empleado_id in range(1, 20):
+        modelo.eliminar(empleado_id)
+        assert modelo._basura == len(modelo.textos) - sum(modelo.longitudes)
+    assert modelo.obtener(20)['nombre'] == "Nombre20"
+
+
+def test_vista_ordenada_mantiene_las_claves_al_cambiar_filas():
+    import random
+    azar = random.Random(1)
+    nombres = ["Ana", "Íñigo", "luis", "Óscar", "Zoe", "ana"]
+    modelo = rrhh.ModeloEmpleados()
+    modelo.agregar_pagina([dict(datos(azar.choice(nombres), puesto=azar.choice(["Gerente", "Analista"]),
+                                      salario=azar.randrange(800, 9000)), id=i, version=0) for i in range(1, 201)])
+    modelo.completo = True
+    vista = rrhh.VistaOrdenada(modelo)
+    vista.orden = [("nombre", False), ("salario", True)]
+    vista.ids()
+    siguiente = 201
+    for vuelta in range(300):
+        operacion = azar.choice("AMB")
+        registro = dict(datos(azar.choice(nombres + [f"Nuevo{vuelta}"]), puesto=azar.choice(["Gerente", "Técnico"]),
+                              salario=azar.randrange(800, 9000)), version=vuelta)
+        if operacion == "A":
+            modelo.insertar(dict(registro, id=siguiente))
+            siguiente += 1
+        elif operacion == "M":
+            modelo.actualizar(dict(registro, id=azar.choice(modelo.ids)))
+        else:
+            modelo.eliminar(azar.choice(modelo.ids))
+        for orden in ([("nombre", False), ("salario", True)], [("puesto", True), ("id", False)]):
+            vista.orden = orden
+            nueva = rrhh.VistaOrdenada(modelo)
+            nueva.orden = orden
+            assert vista.ids() == nueva.ids()
+    assert "nombre" in vista._claves # Los textos nuevos se intercalan sin recalcular la columna
+
+
+def test_vista_ordenada_descartada_deja_de_observar_el_modelo():
+    modelo = rrhh.ModeloEmpleados()
+    modelo.agregar_pagina([dict(datos(f"Nombre{i}"), id=i, version=0) for i in range(1, 6)])
+    vista = rrhh.VistaOrdenada(modelo)
+    for _ in range(50):
+        rrhh.VistaOrdenada(modelo)
+    modelo.actualizar(dict(datos("Otro"), id=2, version=1))
+    assert len(modelo.observadores) == 1 and modelo.observadores[0]() == vista._al_cambiar
+
+
+def test_consultas_aplicacion_cubre_lo_que_ejecuta_el_repositorio(monkeypatch):
+    import re
+    ejecutadas = []
+    original = rrhh._CursorPrueba.execute
+    def registrar(cursor, sql, params=()):
+        ejecutadas.append(sql)
+        return original(cursor, sql, params)
+    monkeypatch.setattr(rrhh._CursorPrueba, "execute", registrar)
+
+    repo = repositorio(20)
+    repo.contar()
+    repo.listar(0, 5)
+    repo.obtener(1)
+    version = repo.actualizar(1, "Ana", "Pérez", "Gerente", 2000, date(2020, 5, 1), version=0)
+    repo.actualizar(2, "Luis", "Gómez", "Gerente", 2000, date(2020, 5, 1))
+    repo.eliminar(3)
+    repo.aplicar_lote([('A', -1, datos("Eva"), 0), ('M', 1, datos("Ana"), version), ('B', 4, None, 0)])
+    repo.cambios_desde(0)
+    repo.credenciales("usuario5")
+    repo.nombre_de(5)
+    repo.guardar_contrasena(5, "clave5", "otra")
+    for filtro in ({}, {"puesto": "Gerente"}, {"desde": date(2020, 1, 1), "hasta": date(2020, 12, 31)},
+                   {"puesto": "Gerente", "desde": date(2020, 1, 1), "hasta": date(2020, 12, 31)}):
+        list(repo.recorrer(**filtro))
+        repo.previsualizar_ajuste(5, 0, **filtro)
+        repo.ajustar_salarios(5, 0, pausa=0, **filtro)
+    repo.podar_cambios()
+
+    catalogo = {sql for _, sql, _, _ in rrhh.CONSULTAS_APLICACION}
+    faltan = {sql for sql in ejecutadas
+              if re.sub(r"IN \((%s, )*%s\)", "IN (%s, %s, %s)", sql) not in catalogo
+              and " VALUES " not in sql and sql != "SELECT CURRENT_TIMESTAMP"}
+    assert not faltan
+
+
+def test_autenticar_no_rehace_el_hash_si_no_cabe_en_la_columna():
+    repo = repositorio(10)
+    servicio = rrhh.ServicioAutenticacion(repo, coste=1000)
+    repo.ancho_contrasena = lambda: 20 # Columna de antes de los hashes
+    assert servicio.autenticar("usuario3", "clave3")['id'] == repo.credenciales("usuario3")[0]
+    assert repo.credenciales("usuario3")[1] == "clave3"
+
+    repo.ancho_contrasena = lambda: 255
+    assert servicio.autenticar("usuario3", "clave3") is not None
+    assert repo.credenciales("usuario3")[1].startswith("pbkdf2_sha256$1000$")
+
+
+class _VentanaFalsa:#Sustituye a la ventana de Tk: guarda lo programado con after en lugar de ejecutarlo.
+    def __init__(self):
+        self.programadas = []
+
+    def after(self, milisegundos, funcion):
+        self.programadas.append(funcion)
+
+
+def test_ejecutor_sigue_entregando_y_revisando_si_falla_una_respuesta(capsys):
+    ventana = _VentanaFalsa()
+    ejecutor = rrhh.EjecutorFondo(ventana, hilos=1)
+    entregados = []
+    ejecutor.en_hilo_principal(lambda: 1 / 0)
+    ejecutor.en_hilo_principal(entregados.append, "siguiente")
+    ventana.programadas.clear()
+
+    ejecutor._revisar()
+    assert entregados == ["siguiente"]
+    assert ventana.programadas == [ejecutor._revisar]
+    assert "ZeroDivisionError" in capsys.readouterr().err
+    ejecutor.cerrar()
+
+
+def contar_anotaciones(repo, empleado_id, operacion):
+    with repo.conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("SELECT COUNT(*) FROM empleados_cambios WHERE empleado_id = %s AND operacion = %s", (empleado_id, operacion))
+        cantidad = cursor.fetchone()[0]
+        cursor.close()
+    return cantidad
+
+
+def test_eliminar_con_version_antigua_no_borra_y_avisa_del_conflicto():
+    repo = repositorio(10)
+    repo.actualizar(4, "Otro", "Operador", "Gerente", 3000, date(2021, 1, 1), version=0)
+
+    with pytest.raises(rrhh.ConflictoVersionError) as error:
+        repo.eliminar(4, version=0)
+    assert error.value.actual['version'] == 1 and error.value.actual['nombre'] == "Otro"
+    assert repo.obtener(4) is not None
+    assert contar_anotaciones(repo, 4, 'B') == 0
+    assert repo.eliminar(4, version=1) is True
+    assert repo.obtener(4) is None and contar_anotaciones(repo, 4, 'B') == 1
+
+
+def test_eliminar_un_empleado_ya_borrado_no_anota_otra_baja():
+    repo = repositorio(10)
+    assert repo.eliminar(7, version=0) is True
+    assert repo.eliminar(7, version=0) is False
+    assert repo.eliminar(7) is False
+    assert contar_anotaciones(repo, 7, 'B') == 1
+
+
+def test_importar_csv_anota_solo_las_altas_del_propio_lote(tmp_path, monkeypatch):
+    repo = repositorio(5)
+    monkeypatch.setattr(rrhh, "POOL", repo.pool)
+    ruta = tmp_path / "empleados.csv"
+    ruta.write_text("nombre,apellido,puesto,salario,fecha_ingreso\n"
+                    + "".join(f"Nombre{i},Pérez,Analista,1500,2024-03-01\n" for i in range(7)), encoding="utf-8")
+    ajenos = []
+    original = rrhh._CursorPrueba.executemany
+    def con_otra_sesion(cursor, sql, filas):
+        if sql == rrhh.SQL_INSERTAR:
+            # Otro operador da un alta justo antes de que entre cada lote
+            ajenos.append(repo.insertar("Ajeno", "López", "Gerente", 2000, date(2024, 1, 1)))
+        return original(cursor, sql, filas)
+    monkeypatch.setattr(rrhh._CursorPrueba, "executemany", con_otra_sesion)
+
+    assert rrhh.importar_csv(str(ruta), tamano_lote=3)["importadas"] == 7
+    with repo.conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("SELECT empleado_id FROM empleados_cambios WHERE operacion = 'A' ORDER BY empleado_id")
+        anotados = [fila[0] for fila in cursor.fetchall()]
+        cursor.execute("SELECT id FROM empleados WHERE nombre LIKE 'Nombre%' ORDER BY id")
+        importados = [fila[0] for fila in cursor.fetchall()]
+        cursor.close()
+    assert len(ajenos) == 3 and len(importados) == 7
+    assert anotados == sorted(ajenos + importados) # Cada alta, una sola vez
+
+
+def test_instantanea_guarda_y_devuelve_la_version_desconocida(tmp_path):
+    instantanea = rrhh.InstantaneaLocal(str(tmp_path / "empleados.db"))
+    instantanea.guardar({1: dict(datos("Ana"), id=1, version=3), 2: dict(datos("Luis"), id=2, version=None),
+                         3: dict(datos("Eva"), id=3)}, marca=10, ultimo_id=3, completo=True, total=3)
+
+    copia = instantanea.cargar(10)
+    assert [fila['version'] for fila in copia["filas"]] == [3, None, None]
+    assert copia["marca"] == 10 and copia["completo"]
+    instantanea.cerrar()
+
+
+def test_credenciales_suelta_el_cursor_preparado_al_cerrar_la_conexion():
+    repo = repositorio(3)
+    assert repo.credenciales("admin")[0] > 0
+    [propia] = [conexion for conexion, _ in repo.pool._libres]
+    assert list(repo._preparados) == [id(propia)]
+
+    repo.pool.descartar(repo.pool.obtener())
+    assert repo._preparados == {}
+    assert repo.credenciales("admin") is not None and len(repo._preparados) == 1
+    repo.pool.cerrar_todo()
+    assert repo._preparados == {}
+
+
+class _ConexionContada:#Conexión falsa que cuenta los rollback y los cierres que le pide el pool.
+    def __init__(self):
+        self.in_transaction = False
+        self.rollbacks = 0
+        self.cerrada = False
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def is_connected(self):
+        return not self.cerrada
+
+    def close(self):
+        self.cerrada = True
+
+
+def test_pool_reutiliza_y_cuenta_aciertos_y_fallos():
+    pool = rrhh.PoolConexiones(_ConexionContada, tamano_maximo=2)
+    primera = pool.obtener()
+    pool.liberar(primera)
+    assert pool.obtener() is primera
+    segunda = pool.obtener()
+    assert segunda is not primera
+    pool.liberar(primera)
+    pool.liberar(segunda)
+    assert pool.obtener() is segunda # La usada más recientemente sale primero
+    assert pool.estadisticas() == {"aciertos": 2, "fallos": 2, "descartadas": 0, "abiertas": 2, "libres": 1}
+
+
+def test_pool_solo_deshace_si_hay_una_transaccion_abierta():
+    pool = rrhh.PoolConexiones(_ConexionContada)
+    conexion = pool.obtener()
+    pool.liberar(conexion)
+    assert conexion.rollbacks == 0
+    conexion = pool.obtener()
+    conexion.in_transaction = True
+    pool.liberar(conexion)
+    assert conexion.rollbacks == 1 and not conexion.in_transaction
+
+
+def test_pool_expulsa_las_inactivas_y_espera_como_mucho_tiempo_espera():
+    import time
+    pool = rrhh.PoolConexiones(_ConexionContada, tamano_maximo=1, tiempo_espera=0.05, inactividad_maxima=0.01)
+    vieja = pool.obtener()
+    pool.liberar(vieja)
+    time.sleep(0.02)
+    nueva = pool.obtener()
+    assert nueva is not vieja and vieja.cerrada
+    assert pool.estadisticas()["descartadas"] == 1 and pool.estadisticas()["abiertas"] == 1
+    with pytest.raises(rrhh.PoolAgotadoError):
+        pool.obtener()
+    pool.descartar(nueva)
+    assert pool.obtener() is not nueva
+
+
+def test_pool_en_modo_prueba_deshace_lo_no_confirmado(tmp_path):
+    pool = rrhh.PoolConexiones(lambda: rrhh._ConexionPrueba(str(tmp_path / "prueba.db")), tamano_maximo=1)
+    repo = rrhh.RepositorioEmpleados(pool)
+    with repo.conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("UPDATE empleados SET nombre = %s WHERE username = %s", ("Sin confirmar", "admin"))
+        assert conexion.in_transaction
+        cursor.close()
+    with repo.conexion() as conexion:
+        assert not conexion.in_transaction
+    assert repo.credenciales("admin") is not None
+    assert repo.nombre_de(repo.credenciales("admin")[0])['nombre'] == "Admin"
+    assert pool.estadisticas()["fallos"] == 1 # Siempre la misma conexión de SQLite
+
+
+def test_ajustar_salarios_reanuda_tras_un_tramo_sin_ajustar_dos_veces(monkeypatch):
+    import sqlite3
+    repo = repositorio(30)
+    antes = {fila['id']: fila['salario'] for fila in repo.listar(0, 100)[0]}
+    anotaciones = 0
+    original = rrhh._CursorPrueba.execute
+    def caer_en_el_segundo_tramo(cursor, sql, params=()):
+        nonlocal anotaciones
+        if sql == rrhh.SQL_AJUSTE_ANOTAR.format(y_filtro=""):
+            anotaciones += 1
+            if anotaciones == 2:
+                # Después del UPDATE del tramo y antes de su commit
+                raise sqlite3.OperationalError("conexión perdida")
+        return original(cursor, sql, params)
+    monkeypatch.setattr(rrhh._CursorPrueba, "execute", caer_en_el_segundo_tramo)
+
+    with pytest.raises(rrhh.AjusteInterrumpidoError) as interrupcion:
+        repo.ajustar_salarios(10, tramo=10, pausa=0)
+    assert interrupcion.value.ajustados == 10 and interrupcion.value.siguiente_id == 11
+    monkeypatch.setattr(rrhh._CursorPrueba, "execute", original)
+
+    assert repo.ajustar_salarios(10, tramo=10, pausa=0, desde_id=interrupcion.value.siguiente_id) == len(antes) - 10
+    for fila in repo.listar(0, 100)[0]:
+        assert fila['version'] == 1
+        assert fila['salario'] == pytest.approx(antes[fila['id']] * 1.1, abs=0.006)
+    with repo.conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("SELECT COUNT(*), COUNT(DISTINCT empleado_id) FROM empleados_cambios WHERE operacion = 'M'")
+        assert cursor.fetchone() == (len(antes), len(antes))
+        cursor.close()
+
+
+def test_exportar_empleados_filtra_por_puesto_y_fechas_incluidas(tmp_path, monkeypatch):
+    import csv
+    import json
+    repo = repositorio(300)
+    monkeypatch.setattr(rrhh, "REPOSITORIO", repo)
+    filas = repo.listar(0, 1000)[0]
+    puesto = "Gerente"
+    fechas = sorted(fila['fecha_ingreso'] for fila in filas)
+    desde, hasta = fechas[50], fechas[250] # Fechas que existen: los extremos se incluyen
+    esperados = [fila['id'] for fila in filas if fila['puesto'] == puesto and desde <= fila['fecha_ingreso'] <= hasta]
+    assert 0 < len(esperados) < len(filas)
+
+    ruta_csv = str(tmp_path / "empleados.csv")
+    assert rrhh.exportar_empleados(ruta_csv, "csv", puesto, desde, hasta) == len(esperados)
+    with open(ruta_csv, newline="", encoding="utf-8") as archivo:
+        exportadas = list(csv.DictReader(archivo))
+    assert [int(fila['id']) for fila in exportadas] == esperados
+    assert {fila['puesto'] for fila in exportadas} == {puesto}
+
+    ruta_jsonl = str(tmp_path / "empleados.jsonl")
+    assert rrhh.exportar_empleados(ruta_jsonl, "jsonl", desde=desde, hasta=hasta) == sum(
+        desde <= fila['fecha_ingreso'] <= hasta for fila in filas)
+    with open(ruta_jsonl, encoding="utf-8") as archivo:
+        exportadas = [json.loads(linea) for linea in archivo]
+    assert all(str(desde) <= fila['fecha_ingreso'] <= str(hasta) for fila in exportadas)
+    assert [fila['id'] for fila in exportadas] == sorted(fila['id'] for fila in exportadas)
+    assert rrhh.exportar_empleados(ruta_csv, "csv", puesto="Puesto que no existe") == 0
+
+
+def test_revalidar_logo_descarga_solo_si_cambio(tmp_path, monkeypatch):
+    import io
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from PIL import Image
+
+    def png(color):
+        salida = io.BytesIO()
+        Image.new("RGB", (300, 200), color).save(salida, format="PNG")
+        return salida.getvalue()
+
+    servidor_estado = {"etag": '"v1"', "png": png("red"), "peticiones": []}
+
+    class Logo(BaseHTTPRequestHandler):
+        def do_GET(self):
+            servidor_estado["peticiones"].append(self.headers.get("If-None-Match"))
+            if self.headers.get("If-None-Match") == servidor_estado["etag"]:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("ETag", servidor_estado["etag"])
+            self.send_header("Content-Length", str(len(servidor_estado["png"])))
+            self.end_headers()
+            self.wfile.write(servidor_estado["png"])
+
+        def log_message(self, *args):
+            pass
+
+    servidor = HTTPServer(("127.0.0.1", 0), Logo)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    monkeypatch.setattr(rrhh, "IMAGE_URL", f"http://127.0.0.1:{servidor.server_port}/logo.png")
+    monkeypatch.setattr(rrhh, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("no_proxy", "127.0.0.1") # Que un proxy del entorno no se interponga
+    try:
+        assert rrhh.leer_logo_cache() == (None, {})
+        primero = rrhh.revalidar_logo({})
+        guardado, meta = rrhh.leer_logo_cache()
+        assert guardado == primero and meta["etag"] == '"v1"'
+        assert Image.open(io.BytesIO(primero)).size == (rrhh.LOGO_ANCHO, 100)
+
+        assert rrhh.revalidar_logo(meta) is None # 304: la copia sigue vigente
+        assert rrhh.leer_logo_cache()[0] == primero
+
+        servidor_estado.update(etag='"v2"', png=png("blue"))
+        segundo = rrhh.revalidar_logo(meta)
+        assert segundo != primero and rrhh.leer_logo_cache() == (segundo, dict(meta, etag='"v2"'))
+        assert servidor_estado["peticiones"] == [None, '"v1"', '"v1"']
+    finally:
+        servidor.shutdown()
+        servidor.server_close()